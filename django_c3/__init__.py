@@ -0,0 +1 @@
+default_app_config = 'django_c3.apps.DjangoC3Config'
@@ -0,0 +1,105 @@
+"""Adapters of NumPy and pandas objects to data of chart tags.
+
+Chart tags accept a pandas DataFrame as the whole 'data' argument and
+NumPy arrays or pandas Series as 'values' of records. Arrays are not
+converted to Python lists, numeric columns of pandas objects are taken
+as arrays without copy and serialization formats them at once. (see
+serialization.values)
+
+Both libraries are optional, nothing is changed if they aren't installed.
+"""
+from collections.abc import Iterator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+def is_array(values):
+    """Returns True if values is a NumPy array."""
+    return numpy is not None and isinstance(values, numpy.ndarray)
+
+
+def _to_array(values):
+    if pandas is not None and isinstance(values, (pandas.Series,
+                                                  pandas.Index)):
+        return values.to_numpy()
+    return values
+
+
+def _has_labels(index):
+    return not isinstance(index, pandas.RangeIndex)
+
+
+def values_data(values):
+    """Converts pandas Series (or Index) of values to a NumPy array."""
+    if pandas is None:
+        return values
+    return _to_array(values)
+
+
+def chart_data(data):
+    """Converts data of line, step and bar charts to the dictionary format.
+
+        A DataFrame makes a record of each column and its index (if it's not
+        the default index) makes 'x' labels. A Series makes one record that
+        is named by name of the Series. pandas 'values' of records are
+        replaced with NumPy arrays.
+
+        Returns:
+            data itself if it has nothing to convert, else a new dictionary.
+    """
+    if pandas is None:
+        return data
+
+    if isinstance(data, pandas.DataFrame):
+        converted = {'data': [
+            {'title': str(title), 'values': column.to_numpy()}
+            for title, column in data.items()
+        ]}
+        if _has_labels(data.index):
+            converted['x'] = list(data.index)
+        return converted
+
+    if isinstance(data, pandas.Series):
+        converted = {'data': [
+            {'title': str(data.name), 'values': data.to_numpy()}]}
+        if _has_labels(data.index):
+            converted['x'] = list(data.index)
+        return converted
+
+    # an iterator of records can be read once, it's not checked.
+    if isinstance(data['data'], Iterator) or not any(
+            isinstance(item.get('values'), pandas.Series)
+            for item in data['data']):
+        return data
+    converted = dict(data)
+    converted['data'] = [
+        dict(item, values=_to_array(item['values'])) for item in data['data']
+    ]
+    return converted
+
+
+def xy_chart_data(data):
+    """Converts data of line_xy chart to the dictionary format.
+
+        Each column of a DataFrame makes a record, its index makes X values.
+        Values of records become arrays with two columns (X and Y).
+
+        Returns:
+            data itself if it has nothing to convert, else a new dictionary.
+    """
+    if pandas is None or not isinstance(data, pandas.DataFrame):
+        return data
+    x = data.index.to_numpy()
+    return {'data': [
+        {'title': str(title),
+         'values': numpy.column_stack((x, column.to_numpy()))}
+        for title, column in data.items()
+    ]}
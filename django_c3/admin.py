@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from django_c3.models import ChartSnapshot
+
+
+@admin.register(ChartSnapshot)
+class ChartSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('name', 'watermark', 'updated')
+    search_fields = ('name', )
+    readonly_fields = ('updated', )
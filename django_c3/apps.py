@@ -3,3 +3,16 @@ from django.apps import AppConfig
 
 class DjangoC3Config(AppConfig):
     name = 'django_c3'
+
+    def ready(self):
+        from django_c3 import assets, instrumentation
+
+        instrumentation.connect_receivers()
+
+        # URLs and SRI hashes of C3 files are computed once, not in renders.
+        try:
+            assets.c3_files()
+        except (ValueError, OSError):
+            # static files are not collected yet (eg: missing manifest of
+            #   ManifestStaticFilesStorage), they are computed on first use.
+            pass
@@ -0,0 +1,200 @@
+"""Registry of C3 static files of a page.
+
+C3 files must be imported once in a page, no matter how many charts are in
+it or in which included template they are. The registry of a page is kept
+on the request (so it's shared by all templates that render a response),
+or on the Context object if there is no request.
+
+Without any configuration, the first chart of a page imports C3 files. To
+choose the place of imports, put '{% c3_assets %}' in 'head' of the base
+template, or add django_c3.middleware.C3AssetsMiddleware to MIDDLEWARE and
+imports are inserted into the response once. (at the end of 'head', or
+before '</body>' with 'defer' if C3_ASSETS_POSITION = 'body')
+
+'c3_bundle' management command concatenates C3 files into one file with a
+content hash in its name (and gzip and brotli copies of it). If C3_BUNDLE
+setting is True (or path of a manifest that the command wrote), the bundle
+is imported instead of separate files.
+
+URLs and SRI hashes of files are computed once (when the app is ready, see
+apps.py) and '{% c3_preload %}' tag writes preload hints of them.
+"""
+import base64
+import functools
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+CONTEXT_NAME = 'c3_assets'
+
+CSS_FILES = ('django_c3/css/c3.min.css', )
+JS_FILES = (
+    'django_c3/js/d3.v3.min.js',
+    'django_c3/js/c3.min.js',
+    'django_c3/js/django-c3.js',
+)
+
+BUNDLE_DIR = 'django_c3/dist'
+MANIFEST_NAME = 'manifest.json'
+
+
+class Assets:
+    """C3 static files of a page.
+
+        Attributes:
+            managed: True if imports are inserted by C3AssetsMiddleware, so
+                charts must not import files.
+            needed: True if a chart is rendered in the page.
+            emitted: True if files are imported in the page.
+            defer: True if files are imported with 'defer', so charts must
+                wait until the page is parsed.
+            charts: Charts that are collected to be created by
+                'c3_render_all' tag. (see serialization.collected)
+            sparklines: True if the script that creates sparklines is
+                written in the page.
+    """
+
+    def __init__(self, managed=False, defer=False):
+        self.managed = managed
+        self.needed = False
+        self.emitted = False
+        self.defer = defer
+        self.charts = list()
+        self.sparklines = False
+
+
+@functools.lru_cache(maxsize=None)
+def read_manifest(path):
+    """Returns names of bundle files from a manifest (read once).
+
+        Returns:
+            A dictionary like:
+            {'js': 'django_c3/dist/c3.1a2b.js', 'css': 'django_c3/dist/...'}
+    """
+    with open(path) as manifest:
+        return json.load(manifest)
+
+
+def bundle_manifest():
+    """Returns the manifest of bundle if C3_BUNDLE setting is set, or None."""
+    try:
+        path = settings.C3_BUNDLE
+    except AttributeError:
+        return None
+    if not path:
+        return None
+    if path is True:
+        path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'static',
+            BUNDLE_DIR, MANIFEST_NAME)
+    return read_manifest(path)
+
+
+def _integrity(path):
+    """Returns SRI hash of a static file, or None if it's not found."""
+    absolute_path = finders.find(path)
+    if absolute_path is None:
+        return None
+    with open(absolute_path, 'rb') as static_file:
+        digest = hashlib.sha384(static_file.read()).digest()
+    return 'sha384-%s' % base64.b64encode(digest).decode('ascii')
+
+
+@functools.lru_cache(maxsize=None)
+def static_files(css_files, js_files):
+    """Returns URLs and SRI hashes of static files (computed once).
+
+        Args:
+            css_files: A tuple of paths of CSS files.
+            js_files: A tuple of paths of JavaScript files.
+
+        Returns:
+            A tuple of (kind, url, integrity) tuples, kind is 'css' or 'js'
+            and integrity is None if the file is not found.
+    """
+    return tuple(
+        (kind, static(path), _integrity(path))
+        for kind, paths in (('css', css_files), ('js', js_files))
+        for path in paths
+    )
+
+
+def c3_files():
+    """Returns URLs and SRI hashes of C3 files or the bundle."""
+    manifest = bundle_manifest()
+    if manifest is None:
+        return static_files(CSS_FILES, JS_FILES)
+    return static_files((manifest['css'], ), (manifest['js'], ))
+
+
+def _integrity_attributes(integrity):
+    if integrity is None:
+        return ''
+    return ' integrity="%s" crossorigin="anonymous"' % integrity
+
+
+def import_html(defer=False):
+    """Generates 'script' and 'link' tags to import C3 files.
+
+        Args:
+            defer: If true, scripts have 'defer' attribute.
+
+        Returns:
+            A string that contains one link and three script HTML elements
+            (or one script element of the bundle).
+    """
+    elements = list()
+    for kind, url, integrity in c3_files():
+        if kind == 'css':
+            elements.append(
+                '<link type="text/css" rel="stylesheet" href="%s"%s/>' % (
+                    url, _integrity_attributes(integrity)))
+        else:
+            elements.append(
+                '<script type="text/javascript" src="%s"%s%s></script>' % (
+                    url, _integrity_attributes(integrity),
+                    ' defer' if defer else ''))
+    return '\n'.join(elements)
+
+
+def preload_html():
+    """Generates 'link' tags that tell browser to download C3 files early.
+    """
+    return '\n'.join(
+        '<link rel="preload" href="%s" as="%s"%s/>' % (
+            url, 'style' if kind == 'css' else 'script',
+            _integrity_attributes(integrity))
+        for kind, url, integrity in c3_files()
+    )
+
+
+def request_assets(request):
+    """Returns registry of a request, creates it if it doesn't exist."""
+    assets = getattr(request, CONTEXT_NAME, None)
+    if assets is None:
+        assets = Assets()
+        setattr(request, CONTEXT_NAME, assets)
+    return assets
+
+
+def get_assets(context):
+    """Returns registry of the page that context is rendering.
+
+        It's found in context (from the context processor), on the request
+        of a RequestContext or is kept in the lowest layer of context, so it
+        is shared between 'include' and 'with' layers.
+    """
+    assets = context.get(CONTEXT_NAME)
+    if isinstance(assets, Assets):
+        return assets
+    request = getattr(context, 'request', None)
+    if request is not None:
+        assets = request_assets(request)
+    else:
+        assets = Assets()
+    context.dicts[0][CONTEXT_NAME] = assets
+    return assets
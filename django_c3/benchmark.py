@@ -0,0 +1,214 @@
+"""Benchmark of chart data serialization and chart tags.
+
+Compares functions of django_c3.serialization with the accumulator style
+(growing a string inside a loop) that chart tags used before, on growing
+numbers of series and grid lines. Run it with:
+
+    python -m django_c3.benchmark
+
+'run_tags' renders each chart tag with different numbers of points and
+series and records time, peak memory and size of output; 'c3_benchmark'
+management command runs it and compares results with a baseline file:
+
+    python manage.py c3_benchmark --save baseline.json
+    python manage.py c3_benchmark --baseline baseline.json
+"""
+import timeit
+import tracemalloc
+
+from django_c3 import serialization
+
+SIZES = (100, 1000, 10000, 50000)
+
+
+def _accumulated_lines(points):
+    lines = str()
+    for point in points:
+        lines = ''.join([lines, '{ value: %s}' % point, ','])
+    return lines
+
+
+def _accumulated_columns(series):
+    chart_data = str()
+    for item in series:
+        values = ','.join([str(v) for v in item['values']])
+        item_data = '["%s", %s], ' % (item['title'], values)
+        chart_data = ' '.join([chart_data, item_data])
+    return chart_data
+
+
+def _series(size):
+    return [
+        {'title': 'series-%s' % i, 'values': [i, i + 1, i + 2]}
+        for i in range(size)
+    ]
+
+
+def _time(function, argument, repeat=3):
+    return min(timeit.repeat(lambda: function(argument), number=1,
+                             repeat=repeat))
+
+
+def run(sizes=SIZES):
+    """Returns timing rows as (section, size, accumulated, single pass)."""
+    rows = list()
+    for size in sizes:
+        points = list(range(size))
+        series = _series(size)
+        rows.append((
+            'lines', size,
+            _time(_accumulated_lines, points),
+            _time(serialization.lines, points)))
+        rows.append((
+            'columns', size,
+            _time(_accumulated_columns, series),
+            _time(serialization.columns, series)))
+    return rows
+
+
+TAGS = ('step', 'line', 'line_xy', 'bar', 'pie', 'donut')
+# total number of points of a chart, they are divided between series.
+POINTS = (10, 1000, 100000, 1000000)
+SERIES = (1, 50, 500)
+
+
+def tag_data(tag, points, series):
+    """Creates data of a chart tag with points in series.
+
+        Pie and donut charts have a value for each series, points are not
+        used for them.
+    """
+    if tag in ('pie', 'donut'):
+        return [
+            {'title': 'series-%s' % i, 'value': i + 1} for i in range(series)
+        ]
+    length = max(1, points // series)
+    if tag == 'line_xy':
+        return {'data': [
+            {'title': 'series-%s' % i,
+             'values': [(x, (x * 7 + i) % 100) for x in range(length)]}
+            for i in range(series)
+        ]}
+    return {
+        'x': ['label-%s' % x for x in range(length)],
+        'data': [
+            {'title': 'series-%s' % i,
+             'values': [(x * 7 + i) % 100 for x in range(length)]}
+            for i in range(series)
+        ],
+    }
+
+
+def measure(tag, points, series, as_json=False, repeat=3):
+    """Renders a chart tag and measures it.
+
+        Returns:
+            A dictionary of 'time' (best of repeat, in seconds),
+            'peak_memory' (bytes that are allocated while rendering) and
+            'bytes' (size of output).
+    """
+    from django.template import Context
+    from django_c3.templatetags import c3
+
+    render = c3.chart_functions[tag]
+    data = tag_data(tag, points, series)
+    options = {'as_json': as_json}
+    if tag not in ('pie', 'donut', 'line_xy'):
+        options['x_is_category'] = True
+
+    def run():
+        return render(Context(), '#chart', data, **options)
+
+    time = min(timeit.repeat(run, number=1, repeat=repeat))
+    tracemalloc.start()
+    try:
+        chart = run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'time': time,
+        'peak_memory': peak_memory,
+        'bytes': len(chart.encode('utf-8')),
+    }
+
+
+def result_name(tag, points, series, as_json=False):
+    """Returns name of a result in results of 'run_tags'."""
+    return '%s/%s/%s/%s' % (tag, points, series, 'json' if as_json else 'js')
+
+
+def run_tags(tags=TAGS, points=POINTS, series=SERIES, as_json=False,
+             repeat=3, progress=None):
+    """Measures chart tags with each number of points and series.
+
+        Args:
+            progress: A function, it's called with name and result of each
+                measurement.
+
+        Returns:
+            A dictionary of result name (see 'result_name') to result of
+            'measure'.
+    """
+    results = dict()
+    for tag in tags:
+        for point_count in points:
+            if tag in ('pie', 'donut') and point_count != points[0]:
+                # points are not used for these charts.
+                continue
+            for series_count in series:
+                name = result_name(tag, point_count, series_count, as_json)
+                results[name] = measure(
+                    tag, point_count, series_count, as_json, repeat)
+                if progress is not None:
+                    progress(name, results[name])
+    return results
+
+
+# differences that are smaller than these are noise, not regressions.
+MIN_DIFFERENCES = {
+    'time': 0.001,
+    'peak_memory': 64 * 1024,
+}
+
+
+def compare(results, baseline, threshold=1.25):
+    """Finds results that are worse than baseline.
+
+        Args:
+            results: Results of 'run_tags'.
+            baseline: Results of a previous run.
+            threshold: A result regresses if its time or peak memory is more
+                than threshold times of baseline (and the difference is not
+                smaller than MIN_DIFFERENCES), or size of output changes.
+
+        Returns:
+            A list of messages, one for each regression.
+    """
+    regressions = list()
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        for key in ('time', 'peak_memory'):
+            if (result[key] > base[key] * threshold and
+                    result[key] - base[key] >= MIN_DIFFERENCES[key]):
+                regressions.append('%s: %s is %.2f times of baseline' % (
+                    name, key, result[key] / base[key]))
+        if result['bytes'] != base['bytes']:
+            regressions.append('%s: output is %s bytes, baseline is %s' % (
+                name, result['bytes'], base['bytes']))
+    return regressions
+
+
+def main():
+    print('%-8s %8s %14s %14s %12s' % (
+        'section', 'size', 'accumulated', 'single pass', 'us/item'))
+    for section, size, accumulated, single_pass in run():
+        print('%-8s %8s %13.4fs %13.4fs %12.3f' % (
+            section, size, accumulated, single_pass,
+            single_pass / size * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Binary format of chart data, for charts with very large series.
+
+Numeric columns are sent as little-endian float buffers (like JavaScript
+Float64Array or Float32Array) instead of JSON numbers, they are smaller and
+browser reads them without parsing. NumPy arrays (and array.array objects)
+that already have the same type are used without copy.
+
+Format:
+    4 bytes: Length of header (an unsigned little-endian integer).
+    Header: JSON, like:
+        {"dtype": "f8", "columns": [["A", 1000], ["B", 1000]],
+         "labels": {"2d20...": ["2017-5-19", ...]}}
+        'columns' are names and lengths of buffers, 'labels' are columns
+        that are not numbers. (like X axis labels)
+    Buffers of columns, each one starts at a multiple of 8 bytes.
+
+NaN values are missing values (None), 'djangoC3.binaryColumns' function
+(static/django_c3/js/django-c3.js) converts a response to C3 columns.
+"""
+import array
+import json
+import math
+import numbers
+import sys
+
+from django_c3.adapters import is_array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# format names to typecodes of 'array' module.
+DTYPES = {
+    'f8': 'd',
+    'f4': 'f',
+}
+
+CONTENT_TYPE = 'application/octet-stream'
+
+_ALIGNMENT = 8
+
+
+def _padding(length):
+    return b'\0' * (-length % _ALIGNMENT)
+
+
+def _is_numeric(values):
+    if is_array(values):
+        return values.dtype.kind in 'biuf'
+    if isinstance(values, array.array):
+        return True
+    return all(
+        value is None or isinstance(value, numbers.Real) for value in values)
+
+
+def column_buffer(values, dtype='f8'):
+    """Returns values of a column as a buffer of little-endian floats.
+
+        Args:
+            values: A list, array.array or NumPy array of numbers. None
+                becomes NaN.
+            dtype: 'f8' (double) or 'f4' (float).
+
+        Returns:
+            A memoryview, it's not copied if values has the same type.
+    """
+    if is_array(values):
+        return memoryview(numpy.ascontiguousarray(
+            values, dtype='<' + dtype)).cast('B')
+
+    typecode = DTYPES[dtype]
+    if not (isinstance(values, array.array) and values.typecode == typecode):
+        values = array.array(typecode, [
+            math.nan if value is None else value for value in values])
+    elif sys.byteorder != 'little':
+        values = array.array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return memoryview(values).cast('B')
+
+
+def encode(columns, dtype='f8'):
+    """Encodes columns of a chart to the binary format.
+
+        Args:
+            columns: A dictionary of column name to values, like result of
+                serialization.column_map.
+            dtype: 'f8' (double) or 'f4' (float).
+
+        Returns:
+            A list of bytes and memoryview objects, response is their
+            concatenation.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(
+            'dtype must be one of: %s' % ', '.join(sorted(DTYPES)))
+
+    header = {'dtype': dtype, 'columns': [], 'labels': {}}
+    buffers = list()
+    for name, values in columns.items():
+        if not _is_numeric(values):
+            header['labels'][name] = list(values)
+            continue
+        buffer = column_buffer(values, dtype)
+        header['columns'].append([name, len(values)])
+        buffers.append(buffer)
+        buffers.append(_padding(len(buffer)))
+
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # buffers start at a multiple of 8 bytes, header is padded with spaces.
+    header += b' ' * (-(4 + len(header)) % _ALIGNMENT)
+    return [len(header).to_bytes(4, 'little'), header] + buffers
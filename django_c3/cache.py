@@ -0,0 +1,109 @@
+"""Cache of rendered charts.
+
+Rendering a chart with the same arguments and data always gives the same
+code, so rendered charts can be stored with Django's cache framework. It's
+disabled by default, add C3_CACHE to setting.py to enable it:
+
+    C3_CACHE = {
+        'ALIAS': 'default',     # cache of CACHES setting that is used
+        'TIMEOUT': 300,         # seconds, None means forever
+        'KEY_PREFIX': 'c3',
+    }
+
+Eviction is done by the cache backend (eg: MAX_ENTRIES and CULL_FREQUENCY
+options of CACHES), use a separate alias to limit memory of charts.
+
+Key of a chart is a hash of the tag name and all its arguments (including
+data). Arguments that can't be pickled (like generators) are not cached.
+"""
+import hashlib
+import pickle
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache_settings():
+    try:
+        return settings.C3_CACHE
+    except AttributeError:
+        return None
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_info():
+    """Returns number of cache hits and misses of this process.
+
+        Returns:
+            A dictionary like: {'hits': 10, 'misses': 2}
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_info():
+    """Sets number of cache hits and misses to zero."""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def make_key(name, args, kwargs, prefix='c3'):
+    """Returns cache key of a chart.
+
+        Args:
+            name: Name of the chart tag.
+            args: Positional arguments of tag, except context.
+            kwargs: Keyword arguments of tag.
+            prefix: Prefix of the key.
+
+        Raises:
+            TypeError, AttributeError or pickle.PicklingError: If an argument
+                can't be pickled.
+    """
+    content = pickle.dumps(
+        (name, args, sorted(kwargs.items())), pickle.HIGHEST_PROTOCOL)
+    return '%s:%s:%s' % (
+        prefix, name, hashlib.blake2b(content, digest_size=20).hexdigest())
+
+
+def cached_render(name, args, kwargs, render):
+    """Returns a chart from cache, or renders and caches it.
+
+        Args:
+            name: Name of the chart tag.
+            args: Positional arguments of tag, except context.
+            kwargs: Keyword arguments of tag.
+            render: A function without arguments that renders the chart.
+
+        Returns:
+            Code of the chart, a string.
+    """
+    config = _cache_settings()
+    if config is None:
+        return render()
+
+    try:
+        key = make_key(name, args, kwargs, config.get('KEY_PREFIX', 'c3'))
+    except (TypeError, AttributeError, pickle.PicklingError):
+        return render()
+
+    cache = caches[config.get('ALIAS', 'default')]
+    chart = cache.get(key)
+    if chart is not None:
+        _count('hits')
+        return chart
+
+    _count('misses')
+    chart = render()
+    cache.set(key, chart, config.get('TIMEOUT', DEFAULT_TIMEOUT))
+    return chart
@@ -0,0 +1,10 @@
+from django_c3 import assets
+
+
+def c3_assets(request):
+    """Adds registry of C3 static files of the request to context.
+
+        Useful when templates are rendered with a request but not with a
+        RequestContext. (like 'render_to_string(..., request=request)')
+    """
+    return {assets.CONTEXT_NAME: assets.request_assets(request)}
@@ -0,0 +1,411 @@
+"""Downsampling of chart data before serialization.
+
+Browsers can't usefully draw more points than a chart has pixels, so big
+series are reduced on the server with Largest-Triangle-Three-Buckets
+(LTTB). It keeps the visual shape of a series by choosing, in each bucket,
+the point that forms the largest triangle with the previously chosen point
+and the average of the next bucket.
+
+NumPy is used to compute triangle areas of a bucket at once, if it's
+installed; otherwise a pure Python implementation is used.
+
+Bar and step charts must keep their spikes, so they are reduced by
+aggregating consecutive points into buckets instead, by default into the
+min and max of each bucket (an envelope), so dips survive too. (see
+'bucket')
+"""
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _is_array(values):
+    return numpy is not None and isinstance(values, numpy.ndarray)
+
+
+def _is_sequence(items):
+    return hasattr(items, '__len__') and hasattr(items, '__getitem__')
+
+
+def _listed(data):
+    """Reads records, values and 'x' labels of data into lists, if they are
+        iterators (or other iterables that can't be indexed). Downsampling
+        needs all points.
+    """
+    records = data['data']
+    if _is_sequence(records) and _is_sequence(data.get('x', ())) and all(
+            _is_sequence(item['values']) for item in records):
+        return data
+    listed = dict(data)
+    listed['data'] = [
+        item if _is_sequence(item['values'])
+        else dict(item, values=list(item['values']))
+        for item in records
+    ]
+    if 'x' in data and not _is_sequence(data['x']):
+        listed['x'] = list(data['x'])
+    return listed
+
+
+def _check_threshold(threshold):
+    if threshold < 3:
+        raise ValueError("max_points must be at least 3!")
+
+
+def _lttb_python(x, y, threshold):
+    length = len(y)
+    every = (length - 2) / (threshold - 2)
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # average point of the next bucket
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, length)
+        count = avg_end - avg_start
+        avg_x = sum(x[avg_start:avg_end]) / count
+        avg_y = sum(y[avg_start:avg_end]) / count
+
+        # choose the point of this bucket with the largest triangle
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax = x[a]
+        ay = y[a]
+        max_area = -1
+        for j in range(range_start, range_end):
+            area = abs(
+                (ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                a = j
+        indices.append(a)
+    indices.append(length - 1)
+    return indices
+
+
+def _lttb_numpy(x, y, threshold):
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    length = len(y)
+    every = (length - 2) / (threshold - 2)
+    bounds = (numpy.arange(threshold) * every).astype(int) + 1
+    bounds[-1] = length
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start, avg_end = bounds[i + 1], bounds[i + 2]
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        range_start, range_end = bounds[i], bounds[i + 1]
+        ax = x[a]
+        ay = y[a]
+        areas = numpy.abs(
+            (ax - avg_x) * (y[range_start:range_end] - ay) -
+            (ax - x[range_start:range_end]) * (avg_y - ay))
+        a = int(range_start + areas.argmax())
+        indices.append(a)
+    indices.append(length - 1)
+    return indices
+
+
+def _missing(values):
+    """Returns a sorted list of positions of values that are None or NaN."""
+    if numpy is not None:
+        return numpy.flatnonzero(numpy.isnan(
+            numpy.asarray(values, dtype=float))).tolist()
+    return [i for i, v in enumerate(values) if v is None or v != v]
+
+
+def lttb_indices(x, y, threshold):
+    """Returns indices of the points that LTTB keeps.
+
+        Missing values (None or NaN) are skipped, LTTB runs on the other
+        points.
+
+        Args:
+            x: A sequence of numbers, X of points. (sorted)
+            y: A sequence of numbers, Y of points.
+            threshold: Number of points to keep, at least 3.
+
+        Returns:
+            A sorted list of indices, all indices of values if there are
+            not more than threshold of them.
+    """
+    _check_threshold(threshold)
+    missing = _missing(y)
+    if missing:
+        skipped = set(missing)
+        present = [i for i in range(len(y)) if i not in skipped]
+        if numpy is not None:
+            chosen = lttb_indices(
+                numpy.asarray(x, dtype=float)[present],
+                numpy.asarray(y, dtype=float)[present], threshold)
+        else:
+            chosen = lttb_indices(
+                [x[i] for i in present], [y[i] for i in present], threshold)
+        return [present[i] for i in chosen]
+    if len(y) <= threshold:
+        return list(range(len(y)))
+    if numpy is not None:
+        return _lttb_numpy(x, y, threshold)
+    return _lttb_python(x, y, threshold)
+
+
+def _record_indices(values, threshold):
+    """Returns positions of a record that are kept, at most threshold.
+
+        First position of each gap (run of missing values) is kept too, if
+        there is room, so lines are still broken at gaps.
+    """
+    if len(values) <= threshold:
+        return range(len(values))
+    missing = _missing(values)
+    gaps = [
+        i for k, i in enumerate(missing)
+        if k == 0 or missing[k - 1] != i - 1
+    ]
+    if threshold - len(gaps) < 3:
+        gaps = list()
+    return gaps + lttb_indices(
+        range(len(values)), values, threshold - len(gaps))
+
+
+def lttb(points, threshold):
+    """Downsamples (X, Y) pairs with LTTB.
+
+        Returns:
+            A list of chosen pairs, pairs are not changed.
+    """
+    if _is_array(points):
+        if len(points) <= threshold:
+            _check_threshold(threshold)
+            return points
+        return points[lttb_indices(points[:, 0], points[:, 1], threshold)]
+
+    points = list(points)
+    if len(points) <= threshold:
+        _check_threshold(threshold)
+        return points
+    indices = lttb_indices(
+        [p[0] for p in points], [p[1] for p in points], threshold)
+    return [points[i] for i in indices]
+
+
+def downsample(data, max_points):
+    """Downsamples data of line and step charts.
+
+        All records of a chart share X axis labels, so LTTB runs on each
+        record (over position of points) with an equal share of max_points
+        and the union of chosen positions is kept in all records and in
+        'x' labels. If there are so many records that the union is still
+        larger (each record keeps at least 3 points), it's thinned evenly
+        to max_points.
+
+        Args:
+            data: Data of a line or step chart.
+            max_points: Number of points to keep in each record.
+
+        Returns:
+            A new data dictionary, data is not changed.
+    """
+    data = _listed(data)
+    series = data['data']
+    if all(len(item['values']) <= max_points for item in series):
+        _check_threshold(max_points)
+        return data
+
+    share = max(max_points // len(series), 3)
+    selected = set()
+    for item in series:
+        selected.update(_record_indices(item['values'], share))
+    indices = sorted(selected)
+    if len(indices) > max_points:
+        last = len(indices) - 1
+        indices = sorted({
+            indices[round(k * last / (max_points - 1))]
+            for k in range(max_points)
+        })
+
+    downsampled = dict(data)
+    downsampled['data'] = [
+        dict(item, values=_take(item['values'], indices)) for item in series
+    ]
+    if 'x' in data:
+        downsampled['x'] = _take(data['x'], indices)
+    return downsampled
+
+
+def downsample_xy(data, max_points):
+    """Downsamples data of line_xy chart, each record separately.
+
+        Returns:
+            A new data dictionary, data is not changed.
+    """
+    downsampled = dict(data)
+    downsampled['data'] = [
+        dict(item, values=lttb(item['values'], max_points))
+        for item in data['data']
+    ]
+    return downsampled
+
+
+def _take(items, indices):
+    length = len(items)
+    if _is_array(items):
+        return items[[i for i in indices if i < length]]
+    return [items[i] for i in indices if i < length]
+
+###############################################################################
+
+
+def _envelope(accumulated, value):
+    """Combines (min, its index, max, its index) tuples of points."""
+    low = accumulated[:2] if accumulated[0] <= value[0] else value[:2]
+    high = accumulated[2:] if accumulated[2] >= value[2] else value[2:]
+    return low + high
+
+
+# how values of a bucket are combined, mean is a sum divided by count and
+#   envelope keeps both min and max (and their positions).
+AGGREGATES = {
+    'min': min,
+    'max': max,
+    'sum': operator.add,
+    'mean': operator.add,
+    'last': lambda accumulated, value: value,
+    'envelope': _envelope,
+}
+
+# seconds of time units of bucket width. (like: '30s', '5m', '1h')
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def _bucket_width(size):
+    """Returns bucket width in seconds, or None if size is a count."""
+    if isinstance(size, str) and size[-1:] in _UNITS:
+        return float(size[:-1]) * _UNITS[size[-1]]
+    return None
+
+
+def _offset(label, first_label):
+    try:
+        offset = label - first_label
+    except TypeError:
+        raise ValueError(
+            "Bucket width needs 'x' labels that are dates, datetimes or "
+            "numbers!")
+    if hasattr(offset, 'total_seconds'):
+        return offset.total_seconds()
+    return offset
+
+
+def bucket(data, size, aggregate='envelope'):
+    """Aggregates consecutive points of bar and step charts into buckets.
+
+        Points of all records are read in a single pass, each bucket gets
+        the first 'x' label of its points. With 'envelope' aggregate (the
+        default), each bucket has two points, its min and max in the order
+        they happened (with the same label), so both spikes and dips are
+        kept. It suits step charts; bar charts with category labels would
+        show each label twice, so bar tags use 'max' by default.
+
+        Args:
+            data: Data of a bar or step chart.
+            size: Number of points in each bucket, or width of each bucket as
+                a string with a time unit (s, m, h, d or w. like: '15m').
+                Width needs 'x' labels that are dates, datetimes or numbers
+                (like timestamps, in seconds).
+            aggregate: How points of a bucket are combined, one of
+                'envelope', 'min', 'max', 'mean', 'sum' and 'last'.
+
+        Returns:
+            A new data dictionary, data is not changed.
+
+        Raises:
+            ValueError: If aggregate is unknown, size is not positive or
+                width is used without 'x' labels, or with labels that are
+                not dates, datetimes or numbers.
+    """
+    if aggregate not in AGGREGATES:
+        raise ValueError("%s is not a known aggregate!" % aggregate)
+    combine = AGGREGATES[aggregate]
+    envelope = aggregate == 'envelope'
+    data = _listed(data)
+
+    labels = data.get('x')
+    width = _bucket_width(size)
+    if width is not None:
+        if labels is None:
+            raise ValueError("Bucket width needs 'x' labels in data!")
+        size = width
+        length = len(labels)
+    else:
+        size = int(size)
+        length = max([len(item['values']) for item in data['data']] + [0])
+    if size <= 0:
+        raise ValueError("Bucket size must be positive!")
+
+    columns = [
+        item['values'].tolist() if _is_array(item['values'])
+        else item['values']
+        for item in data['data']
+    ]
+    bucketed_labels = list()
+    bucketed_columns = [list() for column in columns]
+    accumulated = [None] * len(columns)
+    counts = [0] * len(columns)
+    current = None
+    start = 0
+
+    def flush():
+        for k, column in enumerate(columns):
+            if counts[k] and envelope:
+                low, low_index, high, high_index = accumulated[k]
+                bucketed_columns[k].extend(
+                    (low, high) if low_index <= high_index else (high, low))
+            elif counts[k]:
+                value = accumulated[k]
+                if aggregate == 'mean':
+                    value = value / counts[k]
+                bucketed_columns[k].append(value)
+            elif start < len(column):
+                bucketed_columns[k].extend([None] * (1 + envelope))
+
+    for i in range(length):
+        if width is not None:
+            key = _offset(labels[i], labels[0]) // width
+        else:
+            key = i // size
+        if key != current:
+            if current is not None:
+                flush()
+            current = key
+            start = i
+            accumulated = [None] * len(columns)
+            counts = [0] * len(columns)
+            if labels is not None and i < len(labels):
+                bucketed_labels.extend([labels[i]] * (1 + envelope))
+        for k, column in enumerate(columns):
+            if i < len(column) and column[i] is not None:
+                value = column[i]
+                if envelope:
+                    value = (value, i, value, i)
+                if counts[k]:
+                    accumulated[k] = combine(accumulated[k], value)
+                else:
+                    accumulated[k] = value
+                counts[k] += 1
+    if current is not None:
+        flush()
+
+    bucketed = dict(data)
+    bucketed['data'] = [
+        dict(item, values=values)
+        for item, values in zip(data['data'], bucketed_columns)
+    ]
+    if labels is not None:
+        bucketed['x'] = bucketed_labels
+    return bucketed
@@ -0,0 +1,225 @@
+"""Export of charts to SVG and PNG files, without a browser.
+
+Each chart is described like a call of its tag, as a dictionary:
+
+    {
+        'name': 'daily-sales',      # name of the file, without extension
+        'tag': 'bar',               # bar, line, step, pie or donut
+        'data': {...},              # like 'data' argument of the tag
+        'options': {'title': 'Sales', 'x_is_category': True},
+    }
+
+and it's drawn by django_c3.svg, like 'static=True' argument of tags.
+'c3_export' management command reads charts from a JSON file (a list of
+them) or from a function that returns (or yields) them:
+
+    python manage.py c3_export reports.charts.daily --output reports/
+
+Charts are drawn in parallel by a pool of processes. Each worker sets up
+Django and imports chart tags once and draws many charts, in chunks. Only
+a few chunks are sent to workers at once, so charts are read from the
+source while others are drawn. A chart that fails doesn't stop the others,
+its error is collected and reported at the end.
+
+PNG files need 'cairosvg' package.
+"""
+import concurrent.futures
+import importlib
+import inspect
+import itertools
+import json
+import os
+
+import django
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+FORMATS = ('svg', 'png')
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+def load_charts(source):
+    """Returns charts from a JSON file, or from a function.
+
+        Args:
+            source: Path of a JSON file that contains a list of charts, or
+                dotted path of a function (like: 'reports.charts.daily')
+                that returns an iterable of charts.
+    """
+    if os.path.isfile(source):
+        with open(source) as charts:
+            return json.load(charts)
+    module_name, _, function_name = source.rpartition('.')
+    if not module_name:
+        raise ValueError(
+            '%r is not a file or dotted path of a function.' % source)
+    return getattr(importlib.import_module(module_name), function_name)()
+
+
+def _tag_options(chart):
+    """Returns all arguments of tag of a chart, with default values."""
+    # imported here, tags are imported after Django is set up.
+    from django_c3.templatetags import c3
+
+    function = c3.chart_functions.get(chart['tag'])
+    if function is None or 'static' not in inspect.signature(
+            function).parameters:
+        raise ValueError(
+            "Chart %r: '%s' tag can't be drawn." % (
+                chart.get('name'), chart['tag']))
+    options = inspect.signature(function).bind(
+        None, '#chart', chart['data'], **chart.get('options', {}))
+    options.apply_defaults()
+    return options.arguments
+
+
+def draw(chart):
+    """Draws a chart as a standalone SVG document.
+
+        Returns:
+            A string of the SVG document.
+    """
+    from django_c3.templatetags import c3
+
+    drawing = c3.draw_chart(chart['tag'], _tag_options(chart), fluid=False)
+    if not drawing:
+        raise ValueError(
+            "Chart %r: data can't be drawn." % chart.get('name'))
+    return XML_DECLARATION + drawing
+
+
+def write_chart(chart, output, file_format='svg'):
+    """Draws a chart and writes it to a file in output directory.
+
+        Returns:
+            Path of the file.
+    """
+    path = os.path.join(output, '%s.%s' % (chart['name'], file_format))
+    document = draw(chart).encode('utf-8')
+    if file_format == 'png':
+        cairosvg.svg2png(bytestring=document, write_to=path)
+    else:
+        with open(path, 'wb') as chart_file:
+            chart_file.write(document)
+    return path
+
+
+def _write_chunk(charts, output, file_format):
+    """Writes a chunk of charts, in a worker.
+
+        Returns:
+            A list of (name of chart, path of file or None, error message or
+            None) tuples.
+    """
+    results = list()
+    for chart in charts:
+        name = chart.get('name') if isinstance(chart, dict) else None
+        try:
+            path = write_chart(chart, output, file_format)
+        except Exception as error:
+            # errors are sent as text, some exceptions can't be pickled.
+            results.append((name, None, '%s: %s' % (
+                type(error).__name__, error)))
+        else:
+            results.append((name, path, None))
+    return results
+
+
+def _chunks(charts, chunk_size):
+    charts = iter(charts)
+    while True:
+        chunk = list(itertools.islice(charts, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _start_worker():
+    """Sets up Django in a worker process (if it's not a fork of a set up
+        process) and imports chart tags once.
+    """
+    django.setup()
+    importlib.import_module('django_c3.templatetags.c3')
+
+
+def export_charts(
+        charts, output, file_format='svg', workers=None, chunk_size=20,
+        progress=None
+        ):
+    """Writes charts to files in output directory.
+
+        Args:
+            charts: An iterable of charts. (see top of the module)
+            output: Path of output directory, it's created if it doesn't
+                exist.
+            file_format: 'svg' or 'png'.
+            workers: Number of worker processes, default is number of CPUs.
+                If it's 1, charts are drawn in this process.
+            chunk_size: Number of charts that are sent to a worker at once.
+                At most two chunks for each worker are sent at once.
+            progress: A function that is called with path of each file.
+
+        Returns:
+            A tuple of (number of written files, errors), errors is a list
+            of (name of chart, error message) tuples of charts that are not
+            written.
+
+        Raises:
+            ValueError: If file_format is unknown, or PNG format is used
+                and 'cairosvg' is not installed.
+    """
+    if file_format not in FORMATS:
+        raise ValueError('Unknown format: %r' % file_format)
+    if file_format == 'png' and cairosvg is None:
+        raise ValueError("PNG format needs 'cairosvg' package.")
+    os.makedirs(output, exist_ok=True)
+
+    chunks = _chunks(charts, chunk_size)
+    if workers == 1:
+        return _collect(
+            (_write_chunk(chunk, output, file_format) for chunk in chunks),
+            progress)
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_start_worker) as executor:
+        return _collect(
+            _submitted(executor, chunks, 2 * workers, output, file_format),
+            progress)
+
+
+def _submitted(executor, chunks, limit, output, file_format):
+    """Submits chunks to executor, at most limit of them at once, and
+        yields their results in order of completion.
+    """
+    pending = set()
+    for chunk in chunks:
+        if len(pending) >= limit:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(
+            _write_chunk, chunk, output, file_format))
+    for future in concurrent.futures.as_completed(pending):
+        yield future.result()
+
+
+def _collect(results, progress):
+    """Returns number of written files and errors of chunk results, calls
+        progress for each file.
+    """
+    count = 0
+    errors = list()
+    for chunk in results:
+        for name, path, error in chunk:
+            if error is not None:
+                errors.append((name, error))
+                continue
+            count += 1
+            if progress is not None:
+                progress(path)
+    return count, errors
@@ -0,0 +1,124 @@
+"""Measurement of chart renders.
+
+When 'django_c3.signals.chart_rendered' has receivers, chart tags measure
+each render (time, number of series and points, size of output) and send
+it. Nothing is measured if there is no receiver.
+
+Two receivers are connected by settings:
+
+    C3_LOG_RENDERS = True
+        Each render is logged to 'django_c3' logger, in DEBUG level.
+
+    C3_STATSD = 'myproject.metrics.statsd'
+        Dotted path of a statsd client (an object with 'timing' and 'incr'
+        methods, like statsd.StatsClient), it gets 'c3.<tag>.time' timing
+        and 'c3.<tag>.renders', 'c3.<tag>.points' and 'c3.<tag>.bytes'
+        counters.
+
+'django_c3.panels.ChartsPanel' shows charts of a request in Django Debug
+Toolbar.
+"""
+import logging
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from django_c3.adapters import is_array, pandas
+from django_c3.serialization import is_lazy
+from django_c3.signals import chart_rendered
+
+logger = logging.getLogger('django_c3')
+
+
+def enabled():
+    """Returns True if renders are measured."""
+    return chart_rendered.has_listeners()
+
+
+def _length(items):
+    if is_lazy(items):
+        return None
+    try:
+        return len(items)
+    except TypeError:
+        return None
+
+
+def data_size(data):
+    """Returns number of series and number of all points of data of a chart.
+
+        Iterators are not read, their sizes are None.
+
+        Returns:
+            A tuple of (series, points).
+    """
+    if pandas is not None and isinstance(data, pandas.DataFrame):
+        return data.shape[1], data.size
+    if pandas is not None and isinstance(data, pandas.Series):
+        return 1, data.size
+    if isinstance(data, list):
+        # pie and donut charts have a value for each series.
+        return len(data), len(data)
+    series = data['data']
+    if is_lazy(series):
+        return None, None
+    points = 0
+    for item in series:
+        values = item.get('values', ())
+        length = values.size if is_array(values) else _length(values)
+        if length is None:
+            return len(series), None
+        points += length
+    return len(series), points
+
+
+def rendered(name, bind_to, data, output, seconds):
+    """Sends 'chart_rendered' signal for a render of a chart tag."""
+    series, points = data_size(data)
+    chart_rendered.send(
+        sender=name, bind_to=bind_to, time=seconds, series=series,
+        points=points, bytes=len(output.encode('utf-8')))
+
+###############################################################################
+
+
+def log_render(sender, bind_to, time, series, points, bytes, **kwargs):
+    """Logs a render, receiver of 'chart_rendered'."""
+    logger.debug(
+        '%s %s: %.2f ms, %s series, %s points, %s bytes',
+        sender, bind_to, time * 1000, series, points, bytes)
+
+
+def statsd_receiver(client):
+    """Returns a receiver of 'chart_rendered' that sends renders to client.
+    """
+    def send(sender, time, points, bytes, **kwargs):
+        client.timing('c3.%s.time' % sender, time * 1000)
+        client.incr('c3.%s.renders' % sender)
+        if points is not None:
+            client.incr('c3.%s.points' % sender, points)
+        client.incr('c3.%s.bytes' % sender, bytes)
+    return send
+
+
+def connect_receivers():
+    """Connects receivers that are enabled in settings. (called once, when
+        the app is ready)
+    """
+    try:
+        log_renders = bool(settings.C3_LOG_RENDERS)
+    except AttributeError:
+        log_renders = False
+    if log_renders:
+        chart_rendered.connect(log_render, dispatch_uid='django_c3.log')
+
+    try:
+        client = settings.C3_STATSD
+    except AttributeError:
+        client = None
+    if client:
+        if isinstance(client, str):
+            client = import_string(client)
+        chart_rendered.connect(
+            statsd_receiver(client), weak=False,
+            dispatch_uid='django_c3.statsd')
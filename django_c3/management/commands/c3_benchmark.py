@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_c3 import benchmark
+
+
+def _numbers(text):
+    return tuple(int(number) for number in text.split(','))
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders chart tags with different numbers of points and series, '
+        'reports time, peak memory and output size and compares them with '
+        'a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tags', default=','.join(benchmark.TAGS),
+            help='Comma separated names of tags.')
+        parser.add_argument(
+            '--points', type=_numbers, default=benchmark.POINTS,
+            help='Comma separated numbers of points of a chart.')
+        parser.add_argument(
+            '--series', type=_numbers, default=benchmark.SERIES,
+            help='Comma separated numbers of series of a chart.')
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Renders config of charts as JSON. (as_json=True)')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--baseline', help='Path of a baseline file to compare with.')
+        parser.add_argument(
+            '--threshold', type=float, default=1.25,
+            help='Ratio of time or memory to baseline that is a '
+                 'regression. (default is 1.25)')
+        parser.add_argument(
+            '--save', help='Path of a file to write results in, as a new '
+                           'baseline.')
+
+    def _progress(self, name, result):
+        self.stdout.write('%-28s %10.4fs %12d B %12d B' % (
+            name, result['time'], result['peak_memory'], result['bytes']))
+
+    def handle(self, *args, **options):
+        self.stdout.write('%-28s %11s %14s %14s' % (
+            'tag/points/series', 'time', 'peak memory', 'output'))
+        results = benchmark.run_tags(
+            options['tags'].split(','), options['points'],
+            options['series'], options['json'], options['repeat'],
+            self._progress)
+
+        if options['save']:
+            with open(options['save'], 'w') as baseline:
+                json.dump(results, baseline, indent=4, sort_keys=True)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = benchmark.compare(
+                    results, json.load(baseline), options['threshold'])
+            if regressions:
+                raise CommandError(
+                    'Regressions:\n%s' % '\n'.join(regressions))
+            self.stdout.write('No regression.')
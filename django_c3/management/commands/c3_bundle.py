@@ -0,0 +1,69 @@
+import gzip
+import hashlib
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from django_c3 import assets
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))), 'static')
+
+
+def _read(path):
+    with open(os.path.join(STATIC_DIR, path), 'rb') as static_file:
+        return static_file.read()
+
+
+class Command(BaseCommand):
+    help = (
+        'Concatenates C3 static files into a bundle with a content hash in '
+        'its name, writes gzip and brotli copies of it and a manifest that '
+        'is used by chart tags if C3_BUNDLE setting is set.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=os.path.join(STATIC_DIR, assets.BUNDLE_DIR),
+            help='Directory of files, a directory of static files that its '
+                 'URL is STATIC_URL + "%s/". (default is static directory '
+                 'of django_c3 app)' % assets.BUNDLE_DIR)
+
+    def _write(self, output, name, content):
+        path = os.path.join(output, name)
+        with open(path, 'wb') as bundle:
+            bundle.write(content)
+        # mtime is constant so the same content makes the same file.
+        with open(path + '.gz', 'wb') as bundle:
+            bundle.write(gzip.compress(content, 9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as bundle:
+                bundle.write(brotli.compress(content))
+        self.stdout.write('Wrote %s' % path)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+
+        manifest = dict()
+        for kind, files in (('js', assets.JS_FILES),
+                            ('css', assets.CSS_FILES)):
+            content = b'\n;\n' if kind == 'js' else b'\n'
+            content = content.join(_read(path).rstrip() for path in files)
+            content += b'\n'
+            name = 'c3.%s.%s' % (
+                hashlib.blake2b(content, digest_size=6).hexdigest(), kind)
+            self._write(output, name, content)
+            manifest[kind] = '%s/%s' % (assets.BUNDLE_DIR, name)
+
+        with open(os.path.join(output, assets.MANIFEST_NAME), 'w') as file:
+            json.dump(manifest, file, indent=4, sort_keys=True)
+        if brotli is None:
+            self.stdout.write(
+                'brotli is not installed, .br files are not written.')
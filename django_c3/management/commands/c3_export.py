@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_c3 import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Draws charts (described like calls of chart tags) and writes them '
+        'to SVG or PNG files, in parallel processes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'charts',
+            help='Path of a JSON file that contains a list of charts, or '
+                 'dotted path of a function that returns them.')
+        parser.add_argument(
+            '--output', default='.', help='Directory of files.')
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='svg',
+            help='Format of files, PNG needs cairosvg package.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of worker processes. (default is number of CPUs)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=20,
+            help='Number of charts that are sent to a worker at once.')
+
+    def _progress(self, path):
+        if self.verbosity > 1:
+            self.stdout.write('Wrote %s' % path)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            count, errors = export.export_charts(
+                export.load_charts(options['charts']), options['output'],
+                options['format'], options['workers'],
+                options['chunk_size'], self._progress)
+        except (ValueError, KeyError, ImportError, AttributeError) as error:
+            raise CommandError(error)
+        self.stdout.write('Wrote %d charts.' % count)
+        for name, error in errors:
+            self.stderr.write('Chart %r: %s' % (name, error))
+        if errors:
+            raise CommandError('%d charts are not written.' % len(errors))
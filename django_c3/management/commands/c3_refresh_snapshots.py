@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from django_c3.models import ChartSnapshot
+
+
+def _snapshots():
+    """Returns C3_SNAPSHOTS setting, names of snapshots to dotted paths of
+        their compute functions, or to dictionaries like:
+        {'function': 'reports.charts.daily_sales', 'keep': 365}
+    """
+    try:
+        return settings.C3_SNAPSHOTS
+    except AttributeError:
+        return dict()
+
+
+class Command(BaseCommand):
+    help = (
+        'Refreshes chart snapshots of C3_SNAPSHOTS setting, only the tail '
+        'of each one since its last refresh is computed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Names of snapshots. (default is all of them)')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Computes all data of snapshots again.')
+
+    def handle(self, *args, **options):
+        snapshots = _snapshots()
+        names = options['names'] or list(snapshots)
+        for name in names:
+            if name not in snapshots:
+                raise CommandError('Unknown snapshot: %r' % name)
+        for name in names:
+            config = snapshots[name]
+            if isinstance(config, str):
+                config = {'function': config}
+            try:
+                compute = import_string(config['function'])
+            except ImportError as error:
+                raise CommandError(error)
+            snapshot = ChartSnapshot.refresh(
+                name, compute, config.get('keep'), options['full'])
+            if options['verbosity'] > 1:
+                self.stdout.write('Refreshed %s' % snapshot)
+        self.stdout.write('Refreshed %d snapshots.' % len(names))
@@ -0,0 +1,50 @@
+from django.conf import settings
+
+from django_c3 import assets
+
+
+def _position():
+    try:
+        return settings.C3_ASSETS_POSITION
+    except AttributeError:
+        return 'head'
+
+
+class C3AssetsMiddleware:
+    """Imports C3 static files once in HTML responses that have a chart.
+
+        Charts don't import files, imports are inserted at the end of 'head'
+        or, if C3_ASSETS_POSITION setting is 'body', before '</body>' with
+        'defer' attribute. Nothing is inserted if '{% c3_assets %}' tag
+        imported files already.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        defer = _position() == 'body'
+        setattr(request, assets.CONTEXT_NAME, assets.Assets(
+            managed=True, defer=defer))
+        response = self.get_response(request)
+
+        page_assets = getattr(request, assets.CONTEXT_NAME)
+        if (not page_assets.needed or page_assets.emitted or
+                response.streaming or
+                'html' not in response.get('Content-Type', '')):
+            return response
+
+        content = response.content.decode(response.charset)
+        html = assets.import_html(defer)
+        marker = '</body>' if defer else '</head>'
+        position = content.rfind(marker) if defer else content.find(marker)
+        if position == -1:
+            content = html + '\n' + content
+        else:
+            content = '%s%s\n%s' % (
+                content[:position], html, content[position:])
+        response.content = content.encode(response.charset)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        page_assets.emitted = True
+        return response
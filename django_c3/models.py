@@ -1,3 +1,111 @@
-from django.db import models
+"""Snapshots of chart data that are computed before requests.
 
-# Create your models here.
+Data of an expensive chart (like a dashboard that aggregates millions of
+rows) is computed by a job (see 'c3_refresh_snapshots' command) and stored
+as JSON in a ChartSnapshot, with a watermark: the time that data is
+computed up to. Next refreshes compute only the tail since the watermark
+and append it, so old buckets are never computed again:
+
+    def daily_sales(since):
+        queryset = Order.objects.all()
+        if since is not None:
+            since = bucket_start(since, '1d')
+            queryset = queryset.filter(created__gte=since)
+        return time_buckets(
+            queryset, 'created', '1d', 'total', Sum, start=since, fill=0)
+
+    ChartSnapshot.refresh('daily-sales', daily_sales, keep=365)
+
+A page reads it with a single indexed query:
+
+    {% c3_snapshot 'daily-sales' as data %}
+    {% line '#chart' data x_is_category=True %}
+"""
+import json
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from django_c3 import sources
+
+
+class ChartSnapshot(models.Model):
+    """Precomputed data of a chart, by its name.
+
+        Fields:
+            name: A unique name. (like: 'daily-sales')
+            data: Data of chart as JSON, like 'data' argument of chart tags.
+            watermark: Time of the last refresh, data of rows before it is
+                computed. None if data is set without a refresh.
+            updated: Time of the last change.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    data = models.TextField()
+    watermark = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('name', )
+
+    def __str__(self):
+        return self.name
+
+    def get_data(self):
+        """Returns data of chart, a dictionary."""
+        return json.loads(self.data)
+
+    def set_data(self, data):
+        """Stores data of chart, it must be serializable to JSON."""
+        self.data = json.dumps(data, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, name):
+        """Returns data of the snapshot of name, with one query.
+
+            Raises:
+                ChartSnapshot.DoesNotExist: If there is no snapshot.
+        """
+        return json.loads(
+            cls.objects.values_list('data', flat=True).get(name=name))
+
+    @classmethod
+    def refresh(cls, name, compute, keep=None, full=False):
+        """Computes data of a snapshot and stores it.
+
+            The first refresh computes all data, next ones compute only the
+            tail since watermark (time of the previous refresh) and append
+            it to stored data. (see django_c3.sources.append_data)
+            Concurrent refreshes of a snapshot run one after another.
+
+            Args:
+                name: Name of the snapshot, it's created if it doesn't exist.
+                compute: A function that takes watermark (a datetime, or
+                    None for the first refresh) and returns data of line,
+                    step or bar charts with 'x' labels of rows since it.
+                    Rows must be read from start of the bucket of watermark
+                    (see django_c3.sources.bucket_start), data of its labels
+                    replaces the stored one.
+                keep: Maximum number of labels, older labels are removed.
+                full: If true, all data is computed again.
+
+            Returns:
+                The ChartSnapshot.
+        """
+        # time is taken before the query, rows that are added while it
+        #   runs are in the next tail.
+        now = timezone.now()
+        with transaction.atomic():
+            snapshot, _ = cls.objects.select_for_update(
+                ).get_or_create(name=name, defaults={'data': '{}'})
+            if full or snapshot.watermark is None:
+                data = compute(None)
+                if keep is not None:
+                    data = sources.append_data(
+                        dict(data, x=[], data=[]), data, keep)
+            else:
+                data = sources.append_data(
+                    snapshot.get_data(), compute(snapshot.watermark), keep)
+            snapshot.set_data(data)
+            snapshot.watermark = now
+            snapshot.save()
+        return snapshot
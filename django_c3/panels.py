@@ -0,0 +1,56 @@
+"""A panel of Django Debug Toolbar that shows charts of a request.
+
+Add it to DEBUG_TOOLBAR_PANELS setting:
+
+    DEBUG_TOOLBAR_PANELS = [
+        ...
+        'django_c3.panels.ChartsPanel',
+    ]
+"""
+import threading
+
+from debug_toolbar.panels import Panel
+
+from django_c3.signals import chart_rendered
+
+
+class ChartsPanel(Panel):
+    """Shows every chart that is rendered in the request, with its render
+        time, number of series and points and output size.
+    """
+    title = 'Charts'
+    template = 'django_c3/panel.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.charts = list()
+        self.thread = None
+
+    @property
+    def nav_subtitle(self):
+        return '%d charts in %.2f ms' % (
+            len(self.charts),
+            sum(chart['time'] for chart in self.charts) * 1000)
+
+    def _record(self, sender, **kwargs):
+        # the signal is global, charts of other threads are not recorded.
+        if threading.get_ident() != self.thread:
+            return
+        chart = dict(kwargs, tag=sender)
+        chart.pop('signal', None)
+        self.charts.append(chart)
+
+    def enable_instrumentation(self):
+        self.thread = threading.get_ident()
+        chart_rendered.connect(self._record)
+
+    def disable_instrumentation(self):
+        chart_rendered.disconnect(self._record)
+
+    def generate_stats(self, request, response):
+        self.record_stats({
+            'charts': [
+                dict(chart, time_ms=chart['time'] * 1000)
+                for chart in self.charts
+            ],
+        })
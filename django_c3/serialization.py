@@ -0,0 +1,719 @@
+"""Serialization of chart data into C3 config snippets.
+
+All chart tags render their data into the same few pieces of JS: data
+columns, colors, groups, grid lines and X axis labels. Every function in
+this module builds one of those pieces in a single pass; pieces are
+collected in a list and joined once, so the cost is linear in the number
+of series, points and lines.
+
+Charts can also be rendered as a plain config dictionary which is encoded
+to JSON in one step (see 'script'). The '*_list' and '*_map' functions
+build the pieces of such a config.
+
+Records and values can be iterators (like a generator over a database
+cursor), then columns of the config are iterators too and it's written in
+chunks while they are read. (see 'iter_script' and django_c3.streaming)
+"""
+import array
+import contextlib
+import contextvars
+import itertools
+import json
+import math
+from collections.abc import Iterator
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from django.utils.html import escape
+
+from django_c3.adapters import is_array, numpy
+
+# name of the column that holds X axis labels.
+X_LABELS_NAME = '2d2014226823e74c2accfcce8e0ca141'
+
+# start and end of code of every chart.
+SCRIPT_START = '\n<script type="text/javascript">'
+SCRIPT_END = '\n</script>'
+
+
+def values(items):
+    """Joins values of a record with comma. (like: '26,35,52')
+
+        NumPy arrays are formatted at once, without a Python object for
+        each value; NaN and infinite values become 'null'.
+    """
+    if is_array(items):
+        return _array_values(items)
+    return ','.join([str(v) for v in items])
+
+
+def _array_values(array):
+    array = numpy.ravel(array)
+    if not array.size:
+        return str()
+    if array.dtype.kind == 'b':
+        array = array.astype(numpy.int8)
+    text = array.astype('S32')
+    if array.dtype.kind == 'f':
+        text[~numpy.isfinite(array)] = b'null'
+
+    # a row of bytes for each value, with a comma after it; padding of
+    # values (zero bytes) is removed at the end.
+    width = text.dtype.itemsize
+    buffer = numpy.zeros((len(text), width + 1), dtype=numpy.uint8)
+    buffer[:, :width] = text.view(numpy.uint8).reshape(-1, width)
+    buffer[:-1, width] = ord(',')
+    buffer = buffer.ravel()
+    return buffer[buffer != 0].tobytes().decode('ascii')
+
+
+def _column(pairs, index):
+    """Returns X (index 0) or Y (index 1) of (X, Y) pairs."""
+    if is_array(pairs):
+        return pairs[:, index]
+    return [v[index] for v in pairs]
+
+
+def _list(items):
+    if is_array(items):
+        return items.tolist()
+    return list(items)
+
+
+def _sequence(items):
+    """Returns items as a list, NumPy arrays and array.array are kept."""
+    if is_array(items) or isinstance(items, array.array):
+        return items
+    return list(items)
+
+
+def lines(points):
+    """Generates the 'lines' of a grid. (horizontal or vertical)
+
+        Args:
+            points: An iterable of numbers, a line will be drawn at each one.
+
+        Returns:
+            A string like: '{ value: 40},{ value: 50},'
+    """
+    return ''.join(['{ value: %s},' % point for point in points])
+
+
+def columns(series):
+    """Generates data columns of a chart.
+
+        Args:
+            series: An iterable of dictionaries that have 'title' and 'values'
+                keys. (like 'data' field of line, step and bar charts)
+
+        Returns:
+            A string like: ' ["A", 26,35,52],  ["B", 54,25,52], '
+    """
+    return ''.join([
+        ' ["%s", %s], ' % (item['title'], values(item['values']))
+        for item in series
+    ])
+
+
+def xy_columns(series):
+    """Generates data columns and X mapping of a (X,Y) chart.
+
+        Each record is split into two columns, one for Y values (named by
+        title of record) and one for X values (named by title + '_x').
+
+        Args:
+            series: An iterable of dictionaries that have 'title' and 'values'
+                keys, values are (X, Y) pairs.
+
+        Returns:
+            A tuple of two strings, data columns and 'xs' mapping of C3.
+    """
+    chart_data = list()
+    xy_mapping = list()
+    for item in series:
+        title = item['title']
+        chart_data.append(' ["%s", %s], ' % (
+            title, values(_column(item['values'], 1))))
+        chart_data.append(' ["%s", %s], ' % (
+            title + '_x', values(_column(item['values'], 0))))
+        xy_mapping.append('"%s": "%s",' % (title, title + '_x'))
+    return ''.join(chart_data), ''.join(xy_mapping)
+
+
+def value_columns(items):
+    """Generates data columns of pie and donut charts.
+
+        Args:
+            items: An iterable of dictionaries that have 'title' and 'value'
+                keys.
+
+        Returns:
+            A string like: ' ["A", 6],  ["B", 10], '
+    """
+    return ''.join([
+        ' ["%s", %s], ' % (item['title'], item['value']) for item in items
+    ])
+
+
+def colors(items):
+    """Generates colors of records, records without 'color' are skipped.
+
+        Returns:
+            A string like: ' "A": "red",  "B": "#FF34FF", '
+    """
+    return ''.join([
+        ' "%s": "%s", ' % (item['title'], item['color'])
+        for item in items if 'color' in item
+    ])
+
+
+def groups(group_list, titles):
+    """Generates grouping details of data.
+
+        Args:
+            group_list: An iterable of tuples of record titles.
+            titles: Titles of all records of chart.
+
+        Returns:
+            A string like: "[,'A','B'],"
+
+        Raises:
+            ValueError: If a title in a group does not exist in titles.
+    """
+    _check_groups(group_list, titles)
+    total_group_string = list()
+    for group in group_list:
+        total_group_string.append('[')
+        for item in group:
+            total_group_string.append(',')
+            total_group_string.append(repr(item))
+        total_group_string.append('],')
+    return ''.join(total_group_string)
+
+
+def _check_groups(group_list, titles):
+    titles = set(titles)
+    for group in group_list:
+        for item in group:
+            # raise an exception if mentioned key were not exist in data
+            if item not in titles:
+                raise ValueError("%s is not exists in your data!" % item)
+
+
+def x_labels(labels):
+    """Generates the column of X axis labels.
+
+        Returns:
+            A string like: '["2d2014226823e74c2accfcce8e0ca141", 'a','b'],'
+    """
+    return '["%s", %s],' % (
+        X_LABELS_NAME, ','.join([repr(str(label)) for label in labels]))
+
+###############################################################################
+
+
+def column_list(series):
+    """Returns data columns of a chart as lists. (like: [['A', 26, 35]])"""
+    return [[item['title']] + _list(item['values']) for item in series]
+
+
+def xy_column_list(series):
+    """Returns data columns and 'xs' mapping of a (X,Y) chart.
+
+        Like 'xy_columns', but as a list of lists and a dictionary.
+    """
+    columns = list()
+    xs = dict()
+    for item in series:
+        title = item['title']
+        columns.append([title] + _list(_column(item['values'], 1)))
+        columns.append([title + '_x'] + _list(_column(item['values'], 0)))
+        xs[title] = title + '_x'
+    return columns, xs
+
+
+def value_column_list(items):
+    """Returns data columns of pie and donut charts as lists."""
+    return [[item['title'], item['value']] for item in items]
+
+
+def color_map(items):
+    """Returns colors of records as a dictionary of title to color."""
+    return {
+        item['title']: item['color'] for item in items if 'color' in item
+    }
+
+
+def line_list(points):
+    """Returns 'lines' of a grid. (like: [{'value': 40}])"""
+    return [{'value': point} for point in points]
+
+
+def group_list(group_list, titles):
+    """Returns grouping details of data as lists.
+
+        Raises:
+            ValueError: If a title in a group does not exist in titles.
+    """
+    _check_groups(group_list, titles)
+    return [list(group) for group in group_list]
+
+
+def x_label_list(labels):
+    """Returns the column of X axis labels as a list."""
+    return [X_LABELS_NAME] + [str(label) for label in labels]
+
+
+def axis_labels(labels, x_is_category):
+    """Returns X axis labels that are drawn, (zero labels are removed if X
+        axis is not category) like line, step and bar tags.
+    """
+    if x_is_category:
+        return labels
+    if is_lazy(labels):
+        return filter(lambda x: int(x), labels)
+    return list(filter(lambda x: int(x), labels))
+
+
+def is_lazy(items):
+    """Returns True if items is an iterator, it can be read only once."""
+    return isinstance(items, Iterator)
+
+
+class Deferred:
+    """A value of config that is created when it's written, after the
+        iterators before it are read.
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+
+def lazy_column_list(series, x_labels=None):
+    """Like 'column_list', for an iterator of records.
+
+        Records and their values are read when columns are written, titles
+        and colors are collected meanwhile.
+
+        Args:
+            series: An iterable of records.
+            x_labels: X axis labels (an iterable) or None.
+
+        Returns:
+            A tuple of (columns, colors, titles), columns is an iterator of
+            iterators, colors (a dictionary) and titles (a list) are filled
+            when columns are read.
+    """
+    colors = dict()
+    titles = list()
+
+    def generate():
+        for item in series:
+            titles.append(item['title'])
+            if 'color' in item:
+                colors[item['title']] = item['color']
+            values = item['values']
+            if is_array(values):
+                values = values.tolist()
+            yield itertools.chain([item['title']], values)
+        if x_labels is not None:
+            yield itertools.chain(
+                [X_LABELS_NAME], (str(label) for label in x_labels))
+    return generate(), colors, titles
+
+
+def column_map(data, chart_type, x_is_category=False, lists=True):
+    """Returns columns of a chart as a dictionary of column name to values.
+
+        This is the JSON format of C3 'load' function, it's used to load data
+        of a chart from a URL. (see django_c3.views.ChartDataView)
+
+        Args:
+            data: Data of chart, like 'data' argument of its tag.
+            chart_type: Name of the chart tag. (like: 'line' or 'pie')
+            x_is_category: Like 'x_is_category' argument of tags.
+            lists: If false, NumPy arrays are not converted to lists. (for
+                django_c3.binary)
+    """
+    if chart_type in ('pie', 'donut'):
+        return {item['title']: [item['value']] for item in data}
+
+    convert = _list if lists else _sequence
+    columns = dict()
+    if chart_type == 'line_xy':
+        for item in data['data']:
+            columns[item['title']] = convert(_column(item['values'], 1))
+            columns[item['title'] + '_x'] = convert(
+                _column(item['values'], 0))
+        return columns
+
+    for item in data['data']:
+        columns[item['title']] = convert(item['values'])
+    if 'x' in data:
+        columns[X_LABELS_NAME] = [
+            str(label) for label in axis_labels(data['x'], x_is_category)]
+    return columns
+
+
+def skeleton(data):
+    """Returns data without values of records, X axis labels are empty too.
+
+        Titles, colors, groups and lines are kept, they are enough to create
+        a chart that loads its data from a URL.
+    """
+    if isinstance(data, list):
+        return [dict(item, value=None) for item in data]
+    stripped = dict(data)
+    stripped['data'] = [dict(item, values=[]) for item in data['data']]
+    if 'x' in data:
+        stripped['x'] = []
+    return stripped
+
+###############################################################################
+
+
+def _finite(obj):
+    """Returns a copy of obj that NaN and infinite floats of it are None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(item) for item in obj]
+    return obj
+
+
+def _default(obj):
+    """Converts objects that JSON encoders don't know, like Decimal and
+        NumPy scalars and arrays, to Python types.
+    """
+    if isinstance(obj, Decimal):
+        obj = float(obj)
+    elif numpy is not None and isinstance(obj, (numpy.generic, numpy.ndarray)):
+        obj = obj.tolist()
+    else:
+        raise TypeError(
+            'Object of type %s is not JSON serializable' % type(obj).__name__)
+    return _finite(obj)
+
+
+def _json_dumps(obj):
+    # NaN and Infinity are not JSON, they are written as null like orjson
+    #   does. objects are copied only if they have such floats.
+    try:
+        return json.dumps(
+            obj, separators=(',', ':'), allow_nan=False, default=_default)
+    except ValueError:
+        return json.dumps(
+            _finite(obj), separators=(',', ':'), allow_nan=False,
+            default=_default)
+
+
+# titles of records (keys of 'colors', 'xs', ...) can be numbers.
+_ORJSON_OPTIONS = 0 if orjson is None else (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(
+        obj, default=_default, option=_ORJSON_OPTIONS).decode('utf-8')
+
+
+ENCODERS = {
+    'json': _json_dumps,
+    'orjson': _orjson_dumps,
+}
+
+# characters that may close the 'script' element or start an HTML comment.
+_SCRIPT_ESCAPES = {
+    ord('<'): '\\u003C',
+    ord('>'): '\\u003E',
+    ord('&'): '\\u0026',
+}
+
+
+def get_encoder(encoder=None):
+    """Returns a function that encodes an object to a JSON string.
+
+        Args:
+            encoder: Name of an encoder ('json' or 'orjson') or a callable
+                that takes an object and returns a string. If it is None,
+                'orjson' is used if it's installed, else 'json'.
+
+        Raises:
+            ValueError: If encoder is unknown or orjson is not installed.
+    """
+    if callable(encoder):
+        return encoder
+    if encoder is None:
+        encoder = 'orjson' if orjson is not None else 'json'
+    if encoder not in ENCODERS:
+        raise ValueError("%s is not a known JSON encoder!" % encoder)
+    if encoder == 'orjson' and orjson is None:
+        raise ValueError("orjson is not installed!")
+    return ENCODERS[encoder]
+
+
+def dumps(config, encoder=None):
+    """Encodes config to JSON, it's safe to put result in a 'script'."""
+    return get_encoder(encoder)(config).translate(_SCRIPT_ESCAPES)
+
+
+def _load(data_url, data_format, encoder):
+    """Returns code that loads data of chart from data_url."""
+    if data_url is not None and data_format not in (None, 'json'):
+        data_url = '%s%sformat=%s' % (
+            data_url, '&' if '?' in str(data_url) else '?', data_format)
+        return '\n     djangoC3.loadBinary(chart, %s);' % dumps(
+            str(data_url), encoder)
+    if data_url is not None:
+        return '\n     chart.load({url: %s, mimeType: "json"});' % dumps(
+            str(data_url), encoder)
+    return str()
+
+
+# if it's set, 'script' returns an iterator of chunks. (see streaming)
+_iterate_script = contextvars.ContextVar('iterate_script', default=False)
+
+
+def script(config, encoder=None, data_url=None, data_format=None):
+    """Generates a 'script' element that creates a chart from config.
+
+        Args:
+            config: A dictionary of C3 chart options.
+            encoder: JSON encoder, see 'get_encoder'.
+            data_url: A URL, If it's set, data of chart will be loaded from
+                it after chart is created. (see 'column_map')
+            data_format: Format of data_url, 'json' (default) or a binary
+                format. ('f8' or 'f4', see django_c3.binary)
+
+        Returns:
+            A string like the chart structure of chart tags, but config is
+            written as JSON.
+    """
+    if is_lazy(config['data']['columns']):
+        chunks = iter_script(config, encoder, data_url, data_format)
+        if _iterate_script.get():
+            return chunks
+        return ''.join(chunks)
+    return '%s\n     var chart = c3.generate(%s);%s%s' % (
+        SCRIPT_START, dumps(config, encoder),
+        _load(data_url, data_format, encoder), SCRIPT_END)
+
+
+def iter_script(config, encoder=None, data_url=None, data_format=None,
+                chunk_size=1000):
+    """Like 'script', but yields code in chunks, iterators in config are
+        read while they are written. (see 'iter_dumps')
+    """
+    yield '%s\n     var chart = c3.generate(' % SCRIPT_START
+    yield from iter_dumps(config, encoder, chunk_size)
+    yield ');%s%s' % (_load(data_url, data_format, encoder), SCRIPT_END)
+
+
+def iter_dumps(obj, encoder=None, chunk_size=1000):
+    """Encodes obj to JSON like 'dumps', but yields it in chunks.
+
+        Iterators are written as arrays, items of them are read and encoded
+        'chunk_size' at a time. Deferred values are created when they are
+        reached.
+    """
+    if isinstance(obj, Deferred):
+        obj = obj.function()
+    if isinstance(obj, dict):
+        yield '{'
+        for position, (key, value) in enumerate(obj.items()):
+            yield '%s%s:' % (',' if position else '', dumps(key, encoder))
+            yield from iter_dumps(value, encoder, chunk_size)
+        yield '}'
+    elif isinstance(obj, (list, tuple, Iterator)):
+        yield '['
+        written = False
+        for is_chunk, item in _chunks(obj, chunk_size):
+            if written:
+                yield ','
+            if is_chunk:
+                yield dumps(item, encoder)[1:-1]
+            else:
+                yield from iter_dumps(item, encoder, chunk_size)
+            written = True
+        yield ']'
+    else:
+        yield dumps(obj, encoder)
+
+
+def _chunks(items, chunk_size):
+    """Yields (True, a list of consecutive scalar items) or (False, an item
+        that is a container) tuples.
+    """
+    chunk = list()
+    for item in items:
+        if isinstance(item, (dict, list, tuple, Iterator, Deferred)):
+            if chunk:
+                yield True, chunk
+                chunk = list()
+            yield False, item
+            continue
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield True, chunk
+            chunk = list()
+    if chunk:
+        yield True, chunk
+
+
+@contextlib.contextmanager
+def iterated_scripts():
+    """In this context, 'script' returns an iterator of chunks (instead of
+        a string) if config has iterators.
+    """
+    token = _iterate_script.set(True)
+    try:
+        yield
+    finally:
+        _iterate_script.reset(token)
+
+
+def with_stream(chart, stream_url):
+    """Adds code to chart that appends new points sent by stream_url.
+
+        Args:
+            chart: Code of a chart, like result of 'script'.
+            stream_url: URL of a django_c3.views.ChartStreamView.
+    """
+    return '%s\n     djangoC3.stream(chart, %s);%s' % (
+        chart[:len(chart) - len(SCRIPT_END)], dumps(str(stream_url)),
+        SCRIPT_END)
+
+
+def flow_columns(data):
+    """Returns new points of a line or step chart as argument of C3 'flow'.
+
+        Args:
+            data: New points, like 'data' argument of line and step tags.
+
+        Returns:
+            A dictionary like: {'columns': [['A', 26, 35], ['B', 54, 25]]}
+    """
+    columns = column_list(data['data'])
+    if 'x' in data:
+        columns.append(x_label_list(data['x']))
+    return {'columns': columns}
+
+
+def when_visible(chart, bind_to, destroy_hidden=False):
+    """Changes code of a chart to create it when its element is visible.
+
+        Args:
+            chart: Code of a chart, like result of 'script'.
+            bind_to: 'bindto' of the chart.
+            destroy_hidden: If true, chart is destroyed when its element is
+                not visible.
+
+        Returns:
+            A 'script' element that passes a function that creates the chart
+            to 'djangoC3.whenVisible'. (static/django_c3/js/django-c3.js)
+    """
+    body = chart[len(SCRIPT_START):len(chart) - len(SCRIPT_END)]
+    return (
+        '%s'
+        '\n     djangoC3.whenVisible(%s, function () {%s'
+        '\n     return chart;'
+        '\n     }, %s);'
+        '%s'
+    ) % (SCRIPT_START, dumps(str(bind_to)), body,
+         'true' if destroy_hidden else 'false', SCRIPT_END)
+
+
+def on_load(chart):
+    """Changes code of a chart to create it after the page is parsed, when
+        C3 files are imported with 'defer' or after the chart.
+
+        Args:
+            chart: Code of a chart, like result of 'script'.
+
+        Returns:
+            A 'script' element that creates the chart on 'DOMContentLoaded'
+            event, or at once if the page is already parsed. (like a
+            fragment that is inserted later with AJAX)
+    """
+    body = chart[len(SCRIPT_START):len(chart) - len(SCRIPT_END)]
+    return (
+        '%s'
+        '\n     (function () {'
+        '\n     function create() {%s'
+        '\n     }'
+        '\n     if (document.readyState === "loading") {'
+        '\n         document.addEventListener("DOMContentLoaded", create);'
+        '\n     } else {'
+        '\n         create();'
+        '\n     }'
+        '\n     })();'
+        '%s'
+    ) % (SCRIPT_START, body, SCRIPT_END)
+
+
+def collected(chart, bind_to, viewport=False, destroy_hidden=False):
+    """Changes code of a chart to an item of 'djangoC3.renderAll' list.
+
+        Args:
+            chart: Code of a chart, like result of 'script'.
+            bind_to: 'bindto' of the chart.
+            viewport: If true, chart is created when its element is visible.
+            destroy_hidden: If true (and viewport is true), chart is
+                destroyed when its element is not visible.
+
+        Returns:
+            A JavaScript array of bind_to, a function that creates the chart
+            and the two options.
+    """
+    body = chart[len(SCRIPT_START):len(chart) - len(SCRIPT_END)]
+    return (
+        '\n     [%s, function () {%s'
+        '\n     return chart;'
+        '\n     }, %s, %s]'
+    ) % (dumps(str(bind_to)), body, 'true' if viewport else 'false',
+         'true' if destroy_hidden else 'false')
+
+
+def render_all(items):
+    """Creates a 'script' element that creates all collected charts.
+
+        Args:
+            items: Results of 'collected'.
+    """
+    return '%s\n     djangoC3.renderAll([%s\n     ]);%s' % (
+        SCRIPT_START, ','.join(items), SCRIPT_END)
+
+
+# a script that creates all sparklines of the page.
+#   (see 'sparkline' tag and static/django_c3/js/django-c3.js)
+SPARKLINES_SCRIPT = '%s\n     djangoC3.sparklines();%s' % (
+    SCRIPT_START, SCRIPT_END)
+
+
+def sparkline_element(items, color=None, height=30, width=120, area=False):
+    """Creates the element of a sparkline, 'djangoC3.sparklines' creates
+        a minimal chart (without axes, legend, tooltip, ...) in it.
+
+        Args:
+            items: Values of the line, a list or an array.
+            color: Color of the line, None means the default color of C3.
+            height: Height of the line in pixels.
+            width: Width of the line in pixels.
+            area: If true, area under the line is filled.
+
+        Returns:
+            A 'span' element that has values in its 'data-c3-sparkline'
+            attribute.
+    """
+    return (
+        '<span class="c3-sparkline" data-c3-sparkline="%s"%s%s '
+        'style="display:inline-block;width:%dpx;height:%dpx"></span>'
+    ) % (escape(values(items)),
+         ' data-color="%s"' % escape(color) if color else '',
+         ' data-area="true"' if area else '', int(width), int(height))
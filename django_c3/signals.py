@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Sent after a chart tag is rendered, if it has receivers.
+#   sender: Name of the chart tag. (like: 'line')
+#   bind_to: 'bind_to' argument of the tag.
+#   time: Render time, in seconds.
+#   series: Number of series (records) of chart, None if it's not known.
+#   points: Number of all points of chart, None if it's not known.
+#   bytes: Size of output of the tag (UTF-8).
+chart_rendered = Signal()
@@ -0,0 +1,472 @@
+"""Data sources that create data of chart tags from the database.
+
+Functions of this module read only the needed columns with a single
+'values_list' query (grouped with 'annotate' if an aggregate is given) and
+stream rows into the data format of line, step and bar tags, no model
+instance is created.
+
+'time_buckets' aggregates rows into time buckets in the database (with
+Trunc and Extract functions), so only one row for each bucket is read.
+'append_data' appends a recomputed tail of them to stored data. (see
+django_c3.models.ChartSnapshot)
+"""
+import datetime
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.functions import Extract, Floor, Trunc
+from django.utils import timezone
+
+
+def _title(field, group, value_fields, titles):
+    if group is None:
+        return titles.get(field, field)
+    if len(value_fields) == 1:
+        return str(group)
+    return '%s %s' % (group, titles.get(field, field))
+
+
+def queryset_data(
+        queryset, x, values, group_by=None, aggregate=None, titles=None):
+    """Creates data of line, step and bar charts from a QuerySet.
+
+        Args:
+            queryset: A QuerySet, rows of it will be read.
+            x: Name of the field that is used as X axis labels.
+            values: Name of a field or a list of names of fields that their
+                values are drawn, each one is a record of chart.
+            group_by: Name of a field, If it's set, each distinct value of it
+                makes separate records.
+            aggregate: An aggregate function. (like: django.db.models.Sum) If
+                it's set, values are aggregated for each X label (and group).
+            titles: A dictionary of field names to record titles.
+
+        Returns:
+            A dictionary like 'data' argument of line, step and bar tags.
+            Records that have no value for an X label get None.
+            eg:
+            {
+                'x': ['2017-5-19', '2017-5-20'],
+                'data': [
+                    {'title': 'A', 'values': [26, 35]},
+                    {'title': 'B', 'values': [54, None]},
+                ],
+            }
+
+        Raises:
+            ValueError: If aggregate is not set and some rows have the
+                same X label (and group).
+    """
+    rows, fields, values = _rows(queryset, x, values, group_by, aggregate)
+    return _rows_data(rows.iterator(), fields, values, group_by, titles)
+
+
+async def aqueryset_data(
+        queryset, x, values, group_by=None, aggregate=None, titles=None):
+    """Async version of 'queryset_data', for async views.
+        (see django_c3.views.AsyncChartDataView)
+
+        The query runs in a thread of its own (asgiref.sync_to_async with
+        thread_sensitive=False) with its own database connection, so
+        sources that are awaited together run concurrently. Async ORM of
+        Django ('aiterator') is not used, it runs all queries one after
+        another in a single thread. The connection is closed after the
+        query, so it doesn't see changes of an open transaction of the
+        request.
+    """
+    from asgiref.sync import sync_to_async
+    return await sync_to_async(_thread_queryset_data, thread_sensitive=False)(
+        queryset, x, values, group_by, aggregate, titles)
+
+
+def _thread_queryset_data(*args):
+    try:
+        return queryset_data(*args)
+    finally:
+        # connections of worker threads are not closed at the end of the
+        #   request, threads are reused by other requests.
+        connections.close_all()
+
+
+def _rows(queryset, x, values, group_by, aggregate):
+    """Returns the QuerySet of rows (X label, group and values), its fields
+        before values and names of value fields.
+    """
+    if isinstance(values, str):
+        values = [values]
+    values = list(values)
+
+    fields = [x] if group_by is None else [x, group_by]
+    if aggregate is not None:
+        aliases = ['c3_value_%d' % i for i in range(len(values))]
+        queryset = queryset.values(*fields).annotate(**{
+            alias: aggregate(field) for alias, field in zip(aliases, values)
+        })
+        rows = queryset.order_by(*fields).values_list(*(fields + aliases))
+    else:
+        rows = queryset.order_by(*fields).values_list(*(fields + values))
+    return rows, fields, values
+
+
+def _rows_data(rows, fields, values, group_by, titles):
+    """Creates data of chart from rows. (see 'queryset_data')"""
+    titles = titles or dict()
+    x_labels = list()
+    columns = dict()
+    series_titles = list()
+    group = None
+    for row in rows:
+        if not x_labels or x_labels[-1] != row[0]:
+            x_labels.append(row[0])
+        position = len(x_labels) - 1
+        if group_by is not None:
+            group = row[1]
+        for field, value in zip(values, row[len(fields):]):
+            title = _title(field, group, values, titles)
+            column = columns.get(title)
+            if column is None:
+                column = columns[title] = list()
+                series_titles.append(title)
+            if isinstance(value, Decimal):
+                value = float(value)
+            if len(column) > position:
+                # rows are grouped if there is an aggregate, only rows of
+                #   a QuerySet without it can repeat a label.
+                raise ValueError(
+                    'X label %r has more than one row for %r, use an '
+                    'aggregate.' % (row[0], title))
+            column.extend([None] * (position - len(column)))
+            column.append(value)
+
+    length = len(x_labels)
+    for column in columns.values():
+        column.extend([None] * (length - len(column)))
+    return {
+        'x': x_labels,
+        'data': [
+            {'title': title, 'values': columns[title]}
+            for title in series_titles
+        ],
+    }
+
+
+def merge_data(parts):
+    """Merges data of line, step and bar charts (like results of
+        'queryset_data') into one data.
+
+        Records of all parts are kept in order. If parts have different 'x'
+        labels, labels of the result are union of them (sorted, if they can
+        be sorted) and records get None for labels that they don't have.
+
+        Raises:
+            ValueError: If some parts have 'x' and others don't.
+    """
+    parts = list(parts)
+    records = [item for part in parts for item in part['data']]
+    with_labels = ['x' in part for part in parts]
+    if not any(with_labels):
+        return {'data': records}
+    if not all(with_labels):
+        raise ValueError("All parts must have 'x' labels, or none of them.")
+
+    labels = list(parts[0]['x']) if parts else list()
+    if all(list(part['x']) == labels for part in parts):
+        return {'x': labels, 'data': records}
+
+    labels = list(dict.fromkeys(
+        label for part in parts for label in part['x']))
+    try:
+        labels.sort()
+    except TypeError:
+        pass
+    positions = {label: index for index, label in enumerate(labels)}
+    records = list()
+    for part in parts:
+        for item in part['data']:
+            values = [None] * len(labels)
+            for label, value in zip(part['x'], item['values']):
+                values[positions[label]] = value
+            records.append(dict(item, values=values))
+    return {'x': labels, 'data': records}
+
+
+def append_data(data, tail, keep=None):
+    """Appends data of new 'x' labels (like a recomputed tail of a time
+        series) to data of line, step and bar charts.
+
+        Records are matched by their titles. Values of labels that are in
+        both data and tail are replaced by values of tail (eg: the last
+        bucket, that got more rows), other labels of tail are appended.
+        Records that are only in one of them get None for labels of the
+        other one.
+
+        Args:
+            data: Data of chart, it's not changed.
+            tail: Data of the new labels.
+            keep: Maximum number of labels, If it's set, older labels are
+                removed.
+
+        Returns:
+            A new data, with labels of data then new labels of tail.
+
+        Raises:
+            ValueError: If data or tail doesn't have 'x' labels.
+    """
+    if 'x' not in data or 'x' not in tail:
+        raise ValueError("Data and tail must have 'x' labels.")
+    labels = list(data['x'])
+    positions = {label: index for index, label in enumerate(labels)}
+    for label in tail['x']:
+        if label not in positions:
+            positions[label] = len(labels)
+            labels.append(label)
+
+    records = dict()
+    for item in data['data']:
+        values = list(item['values'])
+        values.extend([None] * (len(labels) - len(values)))
+        records[item['title']] = dict(item, values=values)
+    for item in tail['data']:
+        if item['title'] not in records:
+            records[item['title']] = dict(item, values=[None] * len(labels))
+        values = records[item['title']]['values']
+        for label, value in zip(tail['x'], item['values']):
+            values[positions[label]] = value
+
+    start = 0 if keep is None else max(len(labels) - keep, 0)
+    return dict(data, x=labels[start:], data=[
+        dict(item, values=item['values'][start:])
+        for item in records.values()
+    ])
+
+
+###############################################################################
+
+
+# units of intervals of 'time_buckets': (Trunc kind, kind of the larger
+#   unit and number of units in it, for intervals like '15m')
+_INTERVAL_UNITS = {
+    's': ('second', 'minute', 60),
+    'm': ('minute', 'hour', 60),
+    'h': ('hour', 'day', 24),
+    'd': ('day', None, 1),
+    'w': ('week', None, 1),
+}
+
+_INTERVAL = re.compile(r'^(\d*)([smhdw])$')
+
+_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+LABEL_FORMATS = {
+    'second': '%Y-%m-%d %H:%M:%S',
+    'minute': '%Y-%m-%d %H:%M',
+    'hour': '%Y-%m-%d %H:%M',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+
+def _interval(interval):
+    """Returns (kind, larger kind, count) of an interval.
+
+        eg:
+            _interval('15m')  # ('minute', 'hour', 15)
+            _interval('month')  # ('month', None, 1)
+
+        Raises:
+            ValueError: If interval is not valid.
+    """
+    if interval in _MONTHS:
+        return interval, None, 1
+    match = _INTERVAL.match(str(interval))
+    if match is None:
+        raise ValueError('Unknown interval: %r' % interval)
+    kind, larger_kind, size = _INTERVAL_UNITS[match.group(2)]
+    count = int(match.group(1) or 1)
+    if count < 1 or size % count:
+        raise ValueError(
+            'Interval %r must divide a %s.' % (interval, larger_kind or kind))
+    if count == 1:
+        larger_kind = None
+    return kind, larger_kind, count
+
+
+def _step(kind, count):
+    """Returns a function that returns start of the next bucket."""
+    if kind in _MONTHS:
+        months = _MONTHS[kind]
+
+        def next_month(value):
+            month = value.month - 1 + months
+            return value.replace(
+                year=value.year + month // 12, month=month % 12 + 1)
+        return next_month
+    delta = datetime.timedelta(**{kind + 's': count})
+    return lambda value: value + delta
+
+
+def _truncate(value, kind, count):
+    """Returns start of the bucket of value, like Trunc of the database."""
+    if isinstance(value, datetime.datetime):
+        if settings.USE_TZ and timezone.is_aware(value):
+            value = timezone.localtime(value)
+        fields = ('hour', 'minute', 'second', 'microsecond')
+        if kind in fields:
+            index = fields.index(kind)
+            value = value.replace(**{
+                field: 0 for field in fields[index + 1:]})
+            return value.replace(
+                **{kind: getattr(value, kind) // count * count})
+        value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind == 'week':
+        return value - datetime.timedelta(days=value.weekday())
+    if kind in _MONTHS:
+        month = (value.month - 1) // _MONTHS[kind] * _MONTHS[kind] + 1
+        return value.replace(month=month, day=1)
+    return value
+
+
+def bucket_start(value, interval):
+    """Returns start of the bucket of a datetime (or date) in buckets of
+        'time_buckets'.
+
+        Rows of a recomputed tail must be filtered from start of a bucket,
+        or the first bucket gets only a part of its rows. eg:
+            since = bucket_start(watermark, '15m')
+            queryset = Order.objects.filter(created__gte=since)
+    """
+    kind, _, count = _interval(interval)
+    return _truncate(value, kind, count)
+
+
+def _bound(value, is_datetime):
+    """Converts start or end to the type of buckets: a date to a datetime
+        (or a datetime to a date) and a naive datetime to an aware one, in
+        the current time zone, if USE_TZ setting is set.
+    """
+    if not is_datetime:
+        if isinstance(value, datetime.datetime):
+            if settings.USE_TZ and timezone.is_aware(value):
+                value = timezone.localtime(value)
+            value = value.date()
+        return value
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _label(value, kind, label_format):
+    if callable(label_format):
+        return label_format(value)
+    if label_format is None and kind == 'quarter':
+        return '%d-Q%d' % (value.year, (value.month - 1) // 3 + 1)
+    return value.strftime(label_format or LABEL_FORMATS[kind])
+
+
+def time_buckets(
+        queryset, field, interval, values, aggregate, titles=None,
+        start=None, end=None, fill=None, label_format=None):
+    """Creates data of line, step and bar charts by aggregating rows of a
+        QuerySet into time buckets in the database.
+
+        Rows are grouped by start of their bucket (with Trunc and Extract
+        functions, on SQLite, PostgreSQL, MySQL and Oracle), so the query
+        returns one row for each bucket that has rows. Buckets without rows
+        are filled in order (between start and end, if they are given).
+
+        eg:
+            data = time_buckets(
+                Order.objects.all(), 'created', '15m', 'total', Sum, fill=0)
+            # in template
+            {% line '#chart' data x_is_category=True %}
+
+        Args:
+            queryset: A QuerySet, rows of it will be aggregated.
+            field: Name of a DateTimeField (or DateField, for intervals of
+                days and longer) that buckets are made from.
+            interval: Width of buckets, a number and a unit (like: '15m',
+                units are s, m, h, d and w, the number must divide the next
+                larger unit, like 60 minutes of an hour) or 'month',
+                'quarter' or 'year'.
+            values: Name of a field or a list of names of fields that their
+                aggregated values are drawn, each one is a record of chart.
+            aggregate: An aggregate function. (like: django.db.models.Sum)
+            titles: A dictionary of field names to record titles.
+            start: A datetime (or date), buckets are filled from its bucket.
+            end: A datetime (or date), buckets are filled to its bucket.
+            fill: Value of records in buckets that have no row. (like: 0)
+            label_format: A strftime format (or a function) that 'x' labels
+                are created with, default is in LABEL_FORMATS.
+                (quarters are like: '2017-Q2')
+
+        Returns:
+            A dictionary like 'data' argument of line, step and bar tags, its
+            'x' labels are strings.
+    """
+    kind, larger_kind, count = _interval(interval)
+    if isinstance(values, str):
+        values = [values]
+    values = list(values)
+    titles = titles or dict()
+
+    if larger_kind is None:
+        buckets = {'c3_bucket': Trunc(field, kind)}
+    else:
+        buckets = {
+            'c3_bucket': Trunc(field, larger_kind),
+            'c3_part': Floor(Extract(field, kind) / count),
+        }
+    aliases = ['c3_value_%d' % i for i in range(len(values))]
+    rows = queryset.annotate(**buckets).values(*buckets).annotate(**{
+        alias: aggregate(value) for alias, value in zip(aliases, values)
+    }).order_by(*buckets).values_list(*(list(buckets) + aliases))
+
+    step = _step(kind, count)
+    delta = datetime.timedelta(**{kind + 's': count}) if (
+        larger_kind is not None) else None
+    found = dict()
+    for row in rows.iterator():
+        bucket = row[0]
+        if larger_kind is not None:
+            bucket += delta * int(row[1])
+        found[bucket] = [
+            float(value) if isinstance(value, Decimal) else value
+            for value in row[len(buckets):]
+        ]
+
+    # buckets between the first and the last one (and start and end) are
+    #   filled, buckets of rows are kept even if they are not on the steps.
+    #   (like hours of a day that a DST change happens in it)
+    ends = sorted(found)
+    is_datetime = isinstance(ends[0] if ends else start or end,
+                             datetime.datetime)
+    for bound in (start, end):
+        if bound is not None:
+            ends.append(_truncate(_bound(bound, is_datetime), kind, count))
+    all_buckets = set(found)
+    if ends:
+        bucket, last = min(ends), max(ends)
+        while bucket <= last:
+            all_buckets.add(bucket)
+            bucket = step(bucket)
+
+    x_labels = list()
+    columns = [list() for _ in values]
+    empty = [fill] * len(values)
+    for bucket in sorted(all_buckets):
+        x_labels.append(_label(bucket, kind, label_format))
+        for column, value in zip(columns, found.get(bucket, empty)):
+            column.append(value)
+    return {
+        'x': x_labels,
+        'data': [
+            {'title': titles.get(value, value), 'values': column}
+            for value, column in zip(values, columns)
+        ],
+    }
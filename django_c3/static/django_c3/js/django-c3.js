@@ -0,0 +1,172 @@
+/* Client helpers of Django-C3 chart tags. */
+var djangoC3 = (function () {
+    'use strict';
+
+    // charts that are created by helpers, by their 'bindto'.
+    var charts = {};
+
+    // number of sparklines that are created in each animation frame.
+    var SPARKLINE_BATCH = 50;
+
+    // Calls callback in the next animation frame.
+    function nextFrame(callback) {
+        if (window.requestAnimationFrame) {
+            window.requestAnimationFrame(callback);
+        } else {
+            setTimeout(callback, 0);
+        }
+    }
+
+    // Creates a chart (by calling 'generate') when its element is near the
+    // viewport. If 'destroyHidden' is true, the chart is destroyed when its
+    // element goes out of the viewport and it's created again later.
+    function whenVisible(bindTo, generate, destroyHidden) {
+        var element = document.querySelector(bindTo);
+        if (!element || !('IntersectionObserver' in window)) {
+            charts[bindTo] = generate();
+            return;
+        }
+        var observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    if (!charts[bindTo]) {
+                        element.style.minHeight = '';
+                        charts[bindTo] = generate();
+                    }
+                    if (!destroyHidden) {
+                        observer.disconnect();
+                    }
+                } else if (destroyHidden && charts[bindTo]) {
+                    // keep height of element to not move the page.
+                    element.style.minHeight = element.offsetHeight + 'px';
+                    if (charts[bindTo].djangoC3Source) {
+                        charts[bindTo].djangoC3Source.close();
+                    }
+                    charts[bindTo] = charts[bindTo].destroy();
+                }
+            });
+        }, {rootMargin: '200px'});
+        observer.observe(element);
+    }
+
+    // Creates charts of 'c3_render_all' tag in one animation frame. Each
+    // item is [bindTo, generate, viewport, destroyHidden].
+    function renderAll(items) {
+        nextFrame(function () {
+            items.forEach(function (item) {
+                if (item[2]) {
+                    whenVisible(item[0], item[1], item[3]);
+                } else {
+                    charts[item[0]] = item[1]();
+                }
+            });
+        });
+    }
+
+    // Converts a response of binary format (see django_c3/binary.py) to
+    // C3 columns, NaN values become null.
+    function binaryColumns(buffer) {
+        var length = new DataView(buffer).getUint32(0, true);
+        var header = JSON.parse(new TextDecoder().decode(
+            new Uint8Array(buffer, 4, length)));
+        var Type = header.dtype === 'f4' ? Float32Array : Float64Array;
+        var offset = 4 + length;
+        var columns = header.columns.map(function (column) {
+            var values = new Type(buffer, offset, column[1]);
+            var size = column[1] * Type.BYTES_PER_ELEMENT;
+            var list = new Array(column[1] + 1);
+            var i;
+            offset += size + (8 - size % 8) % 8;
+            list[0] = column[0];
+            for (i = 0; i < values.length; i += 1) {
+                list[i + 1] = isNaN(values[i]) ? null : values[i];
+            }
+            return list;
+        });
+        Object.keys(header.labels).forEach(function (name) {
+            columns.push([name].concat(header.labels[name]));
+        });
+        return columns;
+    }
+
+    // Loads data of chart from 'url' (a ChartDataView) in binary format.
+    function loadBinary(chart, url) {
+        var request = new XMLHttpRequest();
+        request.open('GET', url);
+        request.responseType = 'arraybuffer';
+        request.onload = function () {
+            if (request.status === 200) {
+                chart.load({columns: binaryColumns(request.response)});
+            }
+        };
+        request.send();
+    }
+
+    // Appends points that are sent by 'url' (a ChartStreamView) as
+    // Server-Sent Events to chart, with C3 'flow' API.
+    function stream(chart, url) {
+        if (!('EventSource' in window)) {
+            return;
+        }
+        var source = new EventSource(url);
+        source.onmessage = function (event) {
+            chart.flow(JSON.parse(event.data));
+        };
+        chart.djangoC3Source = source;
+    }
+
+    // Creates a minimal line chart in an element of 'sparkline' tag.
+    function createSparkline(element) {
+        var text = element.getAttribute('data-c3-sparkline');
+        var values = text ? text.split(',').map(function (value) {
+            var number = parseFloat(value);
+            return isFinite(number) ? number : null;
+        }) : [];
+        var color = element.getAttribute('data-color');
+        element.removeAttribute('data-c3-sparkline');
+        c3.generate({
+            bindto: element,
+            data: {
+                columns: [['value'].concat(values)],
+                type: element.getAttribute('data-area') ? 'area' : 'line',
+                colors: color ? {value: color} : {}
+            },
+            axis: {x: {show: false}, y: {show: false}},
+            legend: {show: false},
+            point: {show: false},
+            tooltip: {show: false},
+            interaction: {enabled: false},
+            transition: {duration: 0},
+            padding: {top: 1, right: 1, bottom: 1, left: 1},
+            size: {width: element.offsetWidth, height: element.offsetHeight}
+        });
+    }
+
+    // Creates sparklines of the page that are not created yet, a batch of
+    // them in each animation frame, so a long table doesn't block the page.
+    function sparklines() {
+        if (document.readyState === 'loading') {
+            document.addEventListener('DOMContentLoaded', sparklines);
+            return;
+        }
+        var elements = Array.prototype.slice.call(
+            document.querySelectorAll('[data-c3-sparkline]'));
+        function createBatch() {
+            elements.splice(0, SPARKLINE_BATCH).forEach(createSparkline);
+            if (elements.length) {
+                nextFrame(createBatch);
+            }
+        }
+        nextFrame(createBatch);
+    }
+
+    return {
+        binaryColumns: binaryColumns,
+        charts: charts,
+        loadBinary: loadBinary,
+        renderAll: renderAll,
+        sparklines: sparklines,
+        stream: stream,
+        whenVisible: whenVisible
+    };
+}());
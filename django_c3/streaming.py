@@ -0,0 +1,53 @@
+"""Streaming render of charts with very large data.
+
+Chart tags return the whole chart as a string. 'stream_chart' renders the
+same chart as an iterator of chunks, records and values can be iterators
+(like a generator over a database cursor) and they are read while chunks
+are written, so a page with a huge chart is rendered with constant memory:
+
+    def sales(request):
+        def rows():
+            cursor = Sale.objects.values_list('total', flat=True).iterator()
+            yield {'title': 'Total', 'values': cursor}
+
+        def page():
+            yield '<html><head>%s</head><body><div id="chart"></div>' % (
+                import_c3())
+            yield from stream_chart('line', '#chart', {'data': rows()})
+            yield '</body></html>'
+
+        return StreamingHttpResponse(page())
+
+Only line, step and bar charts read iterators lazily, data of other charts
+(and data that is downsampled with 'max_points' or 'bucket') is read into
+lists first.
+"""
+from django.template import Context
+
+from django_c3 import serialization
+from django_c3.templatetags import c3
+
+
+def stream_chart(name, bind_to, data, **options):
+    """Yields code of a chart in chunks.
+
+        Args:
+            name: Name of the chart tag. (like: 'line' or 'bar')
+            bind_to: Like 'bind_to' argument of the tag.
+            data: Like 'data' argument of the tag, records and their values
+                can be iterators.
+            options: Other arguments of the tag. 'viewport' and 'stream_url'
+                are not supported, config is written as JSON.
+
+        Returns:
+            A generator of strings, import code of C3 files is not included.
+            (see templatetags.c3.import_c3)
+    """
+    func = c3.chart_functions[name]
+    options['as_json'] = True
+    with serialization.iterated_scripts():
+        chart = func(Context(), bind_to, data, **options)
+    if isinstance(chart, str):
+        yield chart
+    else:
+        yield from chart
@@ -0,0 +1,493 @@
+"""Server-side SVG drawing of charts.
+
+Charts are drawn as static SVG elements in Python, so they are shown
+without any JavaScript. (like 'sparkline' tag with 'as_svg=True', or chart
+tags with 'prerender=True' that show an SVG until C3 creates the chart)
+
+Drawings are approximations of C3 charts: the same colors, scales, bars,
+lines, arcs, legend and title, without interactive parts. Spline lines are
+drawn as straight lines.
+
+Coordinates are rounded to one decimal digit, it's enough for pixels and
+keeps the markup small.
+"""
+import math
+
+from django.utils.html import escape
+
+from django_c3 import serialization
+from django_c3.adapters import is_array
+
+# default colors of C3 (d3.scale.category10), in order of records.
+PALETTE = (
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b',
+    '#e377c2', '#7f7f7f', '#bcbd22', '#17becf',
+)
+
+# default color of C3 for the first record.
+DEFAULT_COLOR = PALETTE[0]
+
+# default size of charts, like C3. (width of C3 is width of the element)
+DEFAULT_WIDTH = 640
+DEFAULT_HEIGHT = 320
+
+
+def _number(value):
+    """Returns value as a float, or None if it's missing or not finite."""
+    if value is None:
+        return None
+    value = float(value)
+    if not math.isfinite(value):
+        return None
+    return value
+
+
+def _coordinate(value):
+    return ('%.1f' % value).rstrip('0').rstrip('.')
+
+
+def scale_points(values, width, height, padding=1):
+    """Returns positions of values in an area of width x height pixels.
+
+        The first value is at the left edge and the last one is at the right
+        edge, the minimum value is at the bottom and the maximum is at top
+        (padding pixels far from edges).
+
+        Args:
+            values: A list (or an array) of numbers, None and NaN are gaps.
+            width: Width of the area in pixels.
+            height: Height of the area in pixels.
+            padding: Vertical padding in pixels.
+
+        Returns:
+            A list of (x, y) tuples, None for gaps.
+    """
+    if is_array(values):
+        values = values.tolist()
+    values = [_number(value) for value in values]
+    known = [value for value in values if value is not None]
+    if not known:
+        return [None] * len(values)
+
+    low, high = min(known), max(known)
+    inner_height = max(height - 2 * padding, 0)
+    step = width / (len(values) - 1) if len(values) > 1 else 0
+    points = list()
+    for index, value in enumerate(values):
+        if value is None:
+            points.append(None)
+            continue
+        x = index * step if len(values) > 1 else width / 2
+        if high == low:
+            y = height / 2
+        else:
+            y = padding + (high - value) / (high - low) * inner_height
+        points.append((x, y))
+    return points
+
+
+def segments(points):
+    """Splits points at gaps (None) and returns lists of points."""
+    parts = list()
+    part = list()
+    for point in points:
+        if point is None:
+            if part:
+                parts.append(part)
+            part = list()
+        else:
+            part.append(point)
+    if part:
+        parts.append(part)
+    return parts
+
+
+def path(points):
+    """Returns 'd' attribute of an SVG path that connects points.
+
+        eg:
+            path([(0, 10), (5, 2)])  # 'M0,10L5,2'
+    """
+    if not points:
+        return str()
+    return 'M%s' % 'L'.join(
+        '%s,%s' % (_coordinate(x), _coordinate(y)) for x, y in points)
+
+
+def area_path(points, bottom):
+    """Returns 'd' attribute of an SVG path that fills the area under
+        points, to the bottom line.
+    """
+    if not points:
+        return str()
+    return '%sL%s,%sL%s,%sZ' % (
+        path(points), _coordinate(points[-1][0]), _coordinate(bottom),
+        _coordinate(points[0][0]), _coordinate(bottom))
+
+
+def sparkline(values, width, height, color=None, area=False):
+    """Draws a sparkline as an 'svg' element.
+
+        Args:
+            values: A list (or an array) of numbers, None and NaN are gaps.
+            width: Width of the line in pixels.
+            height: Height of the line in pixels.
+            color: Color of the line, default is the first color of C3.
+            area: If true, area under the line is filled.
+
+        Returns:
+            A string of the 'svg' element.
+    """
+    color = escape(color or DEFAULT_COLOR)
+    elements = list()
+    for part in segments(scale_points(values, width, height)):
+        if area:
+            elements.append(
+                '<path d="%s" fill="%s" fill-opacity="0.2" stroke="none"/>' % (
+                    area_path(part, height), color))
+        # a single point is drawn as a line with zero length (a dot).
+        elements.append(
+            '<path d="%s" fill="none" stroke="%s" stroke-width="1" '
+            'stroke-linecap="round"/>' % (
+                path(part if len(part) > 1 else part * 2), color))
+    return (
+        '<svg class="c3-sparkline" xmlns="http://www.w3.org/2000/svg" '
+        'width="%d" height="%d" viewBox="0 0 %d %d">%s</svg>'
+    ) % (width, height, width, height, ''.join(elements))
+
+
+###############################################################################
+
+
+def _text(x, y, text, anchor='middle', size=12):
+    return '<text x="%s" y="%s" font-size="%d" text-anchor="%s">%s</text>' % (
+        _coordinate(x), _coordinate(y), size, anchor, escape(text))
+
+
+def _colors(items):
+    """Returns colors of records (or items of pie and donut charts)."""
+    return [
+        item.get('color') or PALETTE[index % len(PALETTE)]
+        for index, item in enumerate(items)
+    ]
+
+
+def _legend(titles, colors, width, y):
+    """Draws legend of records, centered in a row."""
+    # width of a character is estimated, there is no font metrics here.
+    sizes = [len(str(title)) * 7 + 25 for title in titles]
+    x = max((width - sum(sizes)) / 2, 0)
+    elements = list()
+    for title, color, size in zip(titles, colors, sizes):
+        elements.append(
+            '<rect x="%s" y="%s" width="10" height="10" fill="%s"/>' % (
+                _coordinate(x), _coordinate(y - 9), escape(color)))
+        elements.append(_text(x + 14, y, title, 'start'))
+        x += size
+    return ''.join(elements)
+
+
+def _document(width, height, elements, fluid=True):
+    return (
+        '<svg class="c3-prerender" xmlns="http://www.w3.org/2000/svg" '
+        'width="%s" height="%d" viewBox="0 0 %d %d" '
+        'font-family="sans-serif">%s</svg>'
+    ) % ('100%' if fluid else width, height, width, height,
+         ''.join(elements))
+
+
+def ticks(low, high, count=5):
+    """Returns round values between low and high for labels of an axis.
+
+        eg:
+            ticks(3, 97)  # [0, 20, 40, 60, 80, 100]
+    """
+    if high <= low:
+        return [low]
+    step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(step))
+    for factor in (1, 2, 2.5, 5, 10):
+        if step <= factor * magnitude:
+            step = factor * magnitude
+            break
+    first = math.floor(low / step)
+    last = math.ceil(high / step)
+    return [round(index * step, 10) for index in range(first, last + 1)]
+
+
+def _label(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def axis_chart(
+        data, chart_type, title='', x_is_category=False, show_legend=True,
+        width=None, height=None, column_width=None, fluid=True
+        ):
+    """Draws a chart that has X axis (line, step and bar charts).
+
+        Args:
+            data: Data of the chart in the dictionary format, like 'data'
+                argument of tags.
+            chart_type: C3 type of chart, like 'line', 'area-spline', 'step'
+                or 'bar'.
+            title: A string that is shown on top of the chart.
+            x_is_category: If true, 'x' of data are labels of points, else
+                they are positions of points.
+            show_legend: If false, legend of records is not drawn.
+            width: Width of the chart in pixels.
+            height: Height of the chart in pixels.
+            column_width: Width of bars in pixels.
+            fluid: If true, drawing is as wide as its element, else it has a
+                fixed width. (like a standalone file)
+
+        Returns:
+            A string of the 'svg' element.
+    """
+    width = int(width or DEFAULT_WIDTH)
+    height = int(height or DEFAULT_HEIGHT)
+    series = data['data']
+    colors = _colors(series)
+    records = list()
+    for item in series:
+        values = item['values']
+        if is_array(values):
+            values = values.tolist()
+        records.append([_number(value) for value in values])
+    count = max([len(values) for values in records] or [0])
+    is_bar = chart_type == 'bar'
+
+    elements = list()
+    top = 10
+    if title:
+        elements.append(_text(width / 2, 20, title, size=14))
+        top += 20
+    bottom = height - 25
+    if show_legend:
+        elements.append(_legend(
+            [item['title'] for item in series], colors, width, height - 5))
+        bottom -= 20
+    left, right = 50, width - 10
+
+    known = [value for values in records for value in values
+             if value is not None]
+    known.extend(data.get('horizontal_lines', []))
+    low, high = min(known, default=0), max(known, default=1)
+    if is_bar or chart_type.startswith('area'):
+        low, high = min(low, 0), max(high, 0)
+    if low == high:
+        low, high = low - 1, high + 1
+    labels = ticks(low, high)
+    low, high = labels[0], labels[-1]
+
+    def y_position(value):
+        return bottom - (value - low) / (high - low) * (bottom - top)
+
+    # X positions of points, by 'x' numbers or by index.
+    x_values = data.get('x')
+    if x_values is not None and not x_is_category and not is_bar:
+        x_values = [float(x) for x in x_values][:count]
+    else:
+        x_values = list(range(count))
+    band = (right - left) / max(count, 1)
+    if is_bar:
+        positions = [left + (index + 0.5) * band for index in x_values]
+    else:
+        first = min(x_values, default=0)
+        last = max(x_values, default=0)
+        scale = (right - left) / (last - first) if last != first else 0
+        positions = [
+            left + (x - first) * scale if scale else (left + right) / 2
+            for x in x_values
+        ]
+
+    # grid lines and axes
+    for value in labels:
+        y = y_position(value)
+        elements.append(_text(left - 5, y + 4, _label(value), 'end', 11))
+        elements.append(
+            '<path d="M%s,%sH%s" stroke="#ddd"/>' % (
+                left, _coordinate(y), right))
+    for value in data.get('horizontal_lines', []):
+        elements.append(
+            '<path d="M%s,%sH%s" stroke="#999" stroke-dasharray="4"/>' % (
+                left, _coordinate(y_position(value)), right))
+    elements.append(
+        '<path d="M%s,%sV%sH%s" fill="none" stroke="#aaa"/>' % (
+            left, top, _coordinate(bottom), right))
+    x_labels = data.get('x')
+    if x_labels is None:
+        x_labels = list(range(count))
+    every = max(math.ceil(count / 10), 1)
+    for index in range(0, min(count, len(x_labels)), every):
+        elements.append(_text(
+            positions[index], bottom + 15, _label(x_labels[index]), size=11))
+
+    if is_bar:
+        group = column_width * len(records) if column_width else band * 0.6
+        bar_width = group / max(len(records), 1)
+        zero = y_position(min(max(0, low), high))
+        for number, (values, color) in enumerate(zip(records, colors)):
+            for index, value in enumerate(values):
+                if value is None:
+                    continue
+                y = y_position(value)
+                elements.append(
+                    '<rect x="%s" y="%s" width="%s" height="%s" '
+                    'fill="%s"/>' % (
+                        _coordinate(positions[index] - group / 2 +
+                                    number * bar_width),
+                        _coordinate(min(y, zero)), _coordinate(bar_width),
+                        _coordinate(abs(zero - y)), escape(color)))
+        return _document(width, height, elements, fluid)
+
+    is_step = chart_type.endswith('step')
+    base = y_position(min(max(0, low), high))
+    for values, color in zip(records, colors):
+        points = [
+            (positions[index], y_position(value))
+            if value is not None else None
+            for index, value in enumerate(values)
+        ]
+        for part in segments(points):
+            if is_step:
+                part = _steps(part)
+            if chart_type.startswith('area'):
+                elements.append(
+                    '<path d="%s" fill="%s" fill-opacity="0.2" '
+                    'stroke="none"/>' % (
+                        area_path(part, base), escape(color)))
+            elements.append(
+                '<path d="%s" fill="none" stroke="%s" stroke-width="1"/>' % (
+                    path(part if len(part) > 1 else part * 2),
+                    escape(color)))
+    return _document(width, height, elements, fluid)
+
+
+def _steps(points):
+    """Returns corners of a step line through points."""
+    corners = points[:1]
+    for (_, y), (x, next_y) in zip(points, points[1:]):
+        corners.append((x, y))
+        corners.append((x, next_y))
+    return corners
+
+
+def _arc_point(x, y, radius, angle):
+    """Returns a point of a circle, angle is in radians, clockwise from
+        top.
+    """
+    return x + radius * math.sin(angle), y - radius * math.cos(angle)
+
+
+def _pair(point):
+    return '%s,%s' % (_coordinate(point[0]), _coordinate(point[1]))
+
+
+def _slice(x, y, radius, inner_radius, start, end):
+    """Returns 'd' attribute of a slice of a pie (or a donut), angles are
+        in radians, clockwise from top.
+    """
+    if end - start >= 2 * math.pi - 1e-9:
+        # a full circle can't be drawn with one arc, it's two half circles.
+        return ''.join(
+            'M%sA%s,%s 0 1 1 %sA%s,%s 0 1 1 %sZ' % (
+                _pair((x - r, y)), _coordinate(r), _coordinate(r),
+                _pair((x + r, y)), _coordinate(r), _coordinate(r),
+                _pair((x - r, y)))
+            for r in (radius, inner_radius) if r)
+
+    large = 1 if end - start > math.pi else 0
+    outer = '%s,%s 0 %d 1 %s' % (
+        _coordinate(radius), _coordinate(radius), large,
+        _pair(_arc_point(x, y, radius, end)))
+    if not inner_radius:
+        return 'M%sL%sA%sZ' % (
+            _pair((x, y)), _pair(_arc_point(x, y, radius, start)), outer)
+    return 'M%sA%sL%sA%s,%s 0 %d 0 %sZ' % (
+        _pair(_arc_point(x, y, radius, start)), outer,
+        _pair(_arc_point(x, y, inner_radius, end)),
+        _coordinate(inner_radius), _coordinate(inner_radius), large,
+        _pair(_arc_point(x, y, inner_radius, start)))
+
+
+def round_chart(
+        items, donut=False, title='', inner_title='', show_legend=True,
+        width=None, height=None, fluid=True
+        ):
+    """Draws a pie or a donut chart.
+
+        Args:
+            items: Data of the chart, like 'data' argument of pie and donut
+                tags. eg: [{'title': 'A', 'value': 6, 'color': '#FF34FF'}]
+            donut: If true, chart is a donut.
+            title: A string that is shown on top of the chart.
+            inner_title: A string that is shown in center of a donut.
+            show_legend: If false, legend of items is not drawn.
+            width: Width of the chart in pixels.
+            height: Height of the chart in pixels.
+            fluid: Like 'fluid' argument of 'axis_chart'.
+
+        Returns:
+            A string of the 'svg' element.
+    """
+    width = int(width or DEFAULT_WIDTH)
+    height = int(height or DEFAULT_HEIGHT)
+    colors = _colors(items)
+    values = [_number(item['value']) or 0 for item in items]
+    total = sum(value for value in values if value > 0)
+
+    elements = list()
+    top = 10
+    if title:
+        elements.append(_text(width / 2, 20, title, size=14))
+        top += 20
+    bottom = height - 10
+    if show_legend:
+        elements.append(_legend(
+            [item['title'] for item in items], colors, width, height - 5))
+        bottom -= 20
+
+    x, y = width / 2, (top + bottom) / 2
+    radius = max(min(width - 20, bottom - top) / 2, 0)
+    inner_radius = radius * 0.6 if donut else 0
+    start = 0
+    labels = list()
+    for value, color in zip(values, colors):
+        if value <= 0:
+            continue
+        end = start + value / total * 2 * math.pi
+        elements.append(
+            '<path d="%s" fill="%s" stroke="#fff" fill-rule="evenodd"/>' % (
+                _slice(x, y, radius, inner_radius, start, end),
+                escape(color)))
+        # percentage of slices, like labels of C3.
+        if end - start > 0.2:
+            label_x, label_y = _arc_point(
+                x, y, (radius + inner_radius) / 2 if donut else radius * 0.6,
+                (start + end) / 2)
+            labels.append(_text(
+                label_x, label_y + 4,
+                '%.1f%%' % (value / total * 100), size=11))
+        start = end
+    elements.extend(labels)
+    if donut and inner_title:
+        elements.append(_text(x, y + 5, inner_title, size=14))
+    return _document(width, height, elements, fluid)
+
+
+def placed(drawing, bind_to):
+    """Returns drawing and an inline script that moves it into the element
+        of the chart, so it's shown there until C3 creates the chart.
+        (C3 removes content of the element when it creates a chart)
+
+        The script doesn't need any other script, it runs while the page is
+        parsed.
+    """
+    return (
+        '%s<script type="text/javascript">(function (svg, element) {'
+        'if (element) { element.appendChild(svg); }'
+        '})(document.currentScript.previousElementSibling, '
+        'document.querySelector(%s));</script>'
+    ) % (drawing, serialization.dumps(str(bind_to)))
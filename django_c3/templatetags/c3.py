@@ -1,51 +1,448 @@
+import functools
+import inspect
+import time
+
 from django import template
 from django.utils.safestring import mark_safe
-from django.contrib.staticfiles.templatetags.staticfiles import static
 from django.conf import settings
 
+from django_c3 import (
+    adapters, assets, cache, downsampling, instrumentation, renderers,
+    serialization, svg)
+from django_c3.models import ChartSnapshot
+
 register = template.Library()
 
+# functions of chart tags by their names, without cache and other options
+#   of chart_tag. (see django_c3.streaming)
+chart_functions = dict()
+
 # read setting file
 try:
     import_by_developer = not bool(settings.C3_IMPORT)
 except AttributeError:
     import_by_developer = False
 
+try:
+    use_json = bool(settings.C3_JSON)
+except AttributeError:
+    use_json = False
+
+try:
+    json_encoder = settings.C3_JSON_ENCODER
+except AttributeError:
+    json_encoder = None
+
+try:
+    use_viewport = bool(settings.C3_VIEWPORT)
+except AttributeError:
+    use_viewport = False
+
+try:
+    collect_charts = bool(settings.C3_COLLECT)
+except AttributeError:
+    collect_charts = False
+
+try:
+    sparkline_svg = bool(settings.C3_SPARKLINE_SVG)
+except AttributeError:
+    sparkline_svg = False
+
+try:
+    use_prerender = bool(settings.C3_PRERENDER)
+except AttributeError:
+    use_prerender = False
+
 ###############################################################################
 
 
-def import_c3():
+def import_c3(defer=False):
     """Generates 'script' tags to import C3 files.
 
         Uses 'static' function and creates urls of C3 static files, then
         uses them in 'script' and 'link' HTML elements.
 
+        Args:
+            defer: If true, scripts have 'defer' attribute.
+
         Returns:
-            A string that contains two script and one linke HTML element.
+            A string that contains three script and one linke HTML element.
     """
     # checks setting and returns empty string if user
     #   imports static files himself (no import occurs)
     if import_by_developer:
         return str()
 
-    import_c3_css = '<link type="text/css" rel="stylesheet" href="%s"/>' \
-        % static('django_c3/css/c3.min.css')
-    import_js_d3 = '<script type="text/javascript" src="%s"></script>' % \
-        static('django_c3/js/d3.v3.min.js')
-    import_js_c3 = '<script type="text/javascript" src="%s"></script>' % \
-        static('django_c3/js/c3.min.js')
+    return assets.import_html(defer)
 
-    return '%s\n%s\n%s' % (import_c3_css, import_js_d3, import_js_c3)
 
-###############################################################################
+def _with_imports(context, chart):
+    """Adds import code of C3 static files to chart, if they are not
+        imported in the page yet. (see django_c3.assets)
+    """
+    page_assets = assets.get_assets(context)
+    if page_assets.managed or page_assets.defer:
+        chart = serialization.on_load(chart)
+    return mark_safe(_imports(page_assets) + chart)
+
+
+def _imports(page_assets):
+    """Returns import code of C3 static files (and a new line) if a chart
+        must import them, else an empty string.
+    """
+    if import_by_developer or page_assets.emitted:
+        return str()
+    if page_assets.managed:
+        page_assets.needed = True
+        return str()
+    page_assets.emitted = True
+    return '%s\n' % import_c3()
+
+
+@register.simple_tag(takes_context=True)
+def c3_assets(context, defer=False):
+    """Imports C3 static files, if they are not imported in the page yet.
+
+        Put it in 'head' of the base template, so charts don't import files
+        themselves.
+
+        Args:
+            defer: If true, scripts have 'defer' attribute and charts that
+                are rendered after it are created after the page is parsed.
+    """
+    page_assets = assets.get_assets(context)
+    if import_by_developer or page_assets.emitted:
+        return str()
+    page_assets.emitted = True
+    page_assets.defer = bool(defer)
+    return mark_safe(import_c3(defer))
+
+
+@register.simple_tag
+def c3_preload():
+    """Writes preload hints of C3 static files, put it in 'head'.
+
+        Browser starts downloading files before it reaches their import.
+    """
+    if import_by_developer:
+        return str()
+    return mark_safe(assets.preload_html())
 
 
 @register.simple_tag(takes_context=True)
+def c3_render_all(context):
+    """Creates charts that are collected in the page so far.
+
+        If C3_COLLECT setting is true, chart tags don't write a script, they
+        add their chart to the page and this tag writes one script that
+        creates all of them in one animation frame. Put it at the end of
+        'body' of the base template. Charts are kept in 'djangoC3.charts'
+        by their 'bind_to'. (static/django_c3/js/django-c3.js)
+    """
+    page_assets = assets.get_assets(context)
+    if not page_assets.charts:
+        return str()
+    chart = serialization.render_all(page_assets.charts)
+    page_assets.charts = list()
+    if page_assets.managed or page_assets.defer:
+        chart = serialization.on_load(chart)
+    return mark_safe(chart)
+
+
+@register.simple_tag
+def c3_snapshot(name):
+    """Returns data of a chart snapshot, with one query. (see
+        django_c3.models)
+
+        eg:
+            {% c3_snapshot 'daily-sales' as data %}
+            {% line '#chart' data x_is_category=True %}
+
+        Raises:
+            ChartSnapshot.DoesNotExist: If there is no snapshot of name.
+    """
+    return ChartSnapshot.load(name)
+
+
+def chart_tag(func):
+    """Registers func as a chart tag.
+
+        func returns code of a chart. The tag takes it from cache (if
+        C3_CACHE setting is set, see django_c3.cache) or calls func, then
+        applies options that only change code around the chart
+        ('stream_url', 'viewport' and 'destroy_hidden') and adds import code
+        of C3 static files to it.
+        If C3_COLLECT setting is true, chart is added to the page and is
+        written by 'c3_render_all' tag.
+        If func has 'prerender' and 'static' arguments, an SVG drawing of
+        the chart is written before it (or instead of it) too.
+        (see django_c3.svg)
+        If chart_rendered signal has receivers, each render is measured and
+        sent to them. (see django_c3.instrumentation)
+    """
+    signature = inspect.signature(func)
+    chart_functions[func.__name__] = func
+
+    @functools.wraps(func)
+    def tag(context, *args, **kwargs):
+        options = signature.bind(context, *args, **kwargs)
+        options.apply_defaults()
+        options = options.arguments
+
+        if not instrumentation.enabled():
+            return render(context, options, args, kwargs)
+        start = time.perf_counter()
+        output = render(context, options, args, kwargs)
+        instrumentation.rendered(
+            func.__name__, options['bind_to'], options['data'], output,
+            time.perf_counter() - start)
+        return output
+
+    def render(context, options, args, kwargs):
+        prerender = options.get('prerender')
+        if prerender is None and 'prerender' in options:
+            prerender = use_prerender
+        if not prerender and not options.get('static'):
+            return render_chart(context, options, args, kwargs)
+
+        if options.get('static') and options['data_url'] is not None:
+            raise Exception("It's meaningless to use static with data_url.")
+        drawing = cache.cached_render(
+            'svg_%s' % func.__name__, args, kwargs,
+            lambda: draw_chart(func.__name__, options))
+        if options.get('static'):
+            # static drawing is written where the tag is, without script.
+            if not drawing:
+                raise Exception(
+                    "Chart %s can't be drawn, static needs data that is "
+                    "not an iterator." % options['bind_to'])
+            return mark_safe(drawing)
+        if drawing:
+            drawing = svg.placed(drawing, options['bind_to'])
+        # drawing is before imports, so it's shown before C3 is loaded.
+        return mark_safe(
+            drawing + render_chart(context, options, args, kwargs))
+
+    def render_chart(context, options, args, kwargs):
+        chart = cache.cached_render(
+            func.__name__, args, kwargs,
+            lambda: func(context, *args, **kwargs))
+
+        if options.get('stream_url') is not None:
+            chart = serialization.with_stream(chart, options['stream_url'])
+
+        viewport = options['viewport']
+        if viewport is None:
+            viewport = use_viewport
+        if collect_charts:
+            page_assets = assets.get_assets(context)
+            page_assets.charts.append(serialization.collected(
+                chart, options['bind_to'], viewport,
+                options['destroy_hidden']))
+            return mark_safe(_imports(page_assets))
+        if viewport:
+            chart = serialization.when_visible(
+                chart, options['bind_to'], options['destroy_hidden'])
+        return _with_imports(context, chart)
+    return register.simple_tag(tag, takes_context=True)
+
+
+def _axis_config(
+        bind_to, data, chart_type, title, x_is_category, labels,
+        vertical_grid_line, horizontal_grid_line, show_legend, zoom,
+        group_tooltip, height, width
+        ):
+    """Creates config of charts that have X axis (step, line and bar) as a
+        dictionary. Arguments are the same as arguments of chart tags.
+
+        If records are an iterator, columns are an iterator too and colors
+        and groups are filled while it's written. (see serialization.
+        lazy_column_list)
+    """
+    # raise an exception if x_is_category set to true and vertical_lines exists
+    if 'vertical_lines' in data and x_is_category:
+        raise Exception(
+            "It's meaningless to use vertical_lines with x_is_category.")
+
+    x_labels = None
+    x_label_list_name = None
+    if 'x' in data:
+        x_labels = serialization.axis_labels(data['x'], x_is_category)
+        x_label_list_name = serialization.X_LABELS_NAME
+
+    data_groups = data.get('groups', [])
+    if serialization.is_lazy(data['data']):
+        columns, colors, data_title_list = serialization.lazy_column_list(
+            data['data'], x_labels)
+        groups = serialization.Deferred(
+            lambda: serialization.group_list(data_groups, data_title_list))
+    else:
+        columns = serialization.column_list(data['data'])
+        if x_labels is not None:
+            columns.append(serialization.x_label_list(x_labels))
+        colors = serialization.color_map(data['data'])
+        data_title_list = [item['title'] for item in data['data']]
+        groups = serialization.group_list(data_groups, data_title_list)
+
+    return {
+        'bindto': bind_to,
+        'data': {
+            'x': x_label_list_name,
+            'columns': columns,
+            'type': chart_type,
+            'colors': colors,
+            'groups': groups,
+            'labels': bool(labels),
+        },
+        'title': {'text': title},
+        'axis': {'x': {'type': 'category' if x_is_category else 'indexed'}},
+        'grid': {
+            'x': {
+                'show': bool(vertical_grid_line),
+                'lines': serialization.line_list(
+                    data.get('vertical_lines', [])),
+            },
+            'y': {
+                'show': bool(horizontal_grid_line),
+                'lines': serialization.line_list(
+                    data.get('horizontal_lines', [])),
+            },
+        },
+        'legend': {'show': bool(show_legend)},
+        'zoom': {'enabled': bool(zoom)},
+        'tooltip': {'grouped': bool(group_tooltip)},
+        'size': {
+            'height': int(height) if height is not None else None,
+            'width': int(width) if width is not None else None,
+        },
+    }
+
+
+def _line_type(angle, area):
+    """Returns C3 type of a line chart."""
+    if angle:
+        return 'area' if area else 'line'
+    return 'area-spline' if area else 'spline'
+
+
+def draw_chart(name, options, fluid=True):
+    """Draws a chart as SVG from arguments of its tag. (see django_c3.svg)
+
+        Args:
+            name: Name of the chart tag. (like: 'line' or 'pie')
+            options: A dictionary of all arguments of the tag.
+            fluid: If false, drawing has a fixed width, instead of width of
+                its element.
+
+        Returns:
+            A string of the 'svg' element, or an empty string if data can't
+            be drawn. (if it's loaded from data_url or it's an iterator that
+            can be read once)
+    """
+    data = options['data']
+    if options['data_url'] is not None or serialization.is_lazy(data):
+        return str()
+
+    if name in ('pie', 'donut'):
+        return svg.round_chart(
+            data, name == 'donut',
+            options.get('title', options.get('outer_title')),
+            options.get('inner_title', ''), options['show_legend'],
+            options['width'], options['height'], fluid)
+
+    data = adapters.chart_data(data)
+    if serialization.is_lazy(data['data']) or any(
+            serialization.is_lazy(item['values']) for item in data['data']):
+        return str()
+    if options.get('bucket') is not None:
+        data = downsampling.bucket(
+            data, options['bucket'], options['bucket_aggregate'])
+    if options.get('max_points') is not None:
+        data = downsampling.downsample(data, options['max_points'])
+
+    if name == 'step':
+        chart_type = 'area-step' if options['area'] else 'step'
+    elif name == 'line':
+        chart_type = _line_type(options['angle'], options['area'])
+    else:
+        chart_type = name
+    return svg.axis_chart(
+        data, chart_type, options['title'], options['x_is_category'],
+        options['show_legend'], options['width'], options['height'],
+        options.get('column_width'), fluid)
+
+###############################################################################
+
+
+# converters of options of charts, options are compiled in skeletons of
+#   charts. (see django_c3.renderers)
+_OPTIONS = {
+    'type': renderers.js_text,
+    'labels': renderers.js_bool,
+    'x_type': renderers.js_text,
+    'column_width': renderers.js_number,
+    'x_grid': renderers.js_bool,
+    'y_grid': renderers.js_bool,
+    'legend': renderers.js_bool,
+    'zoom': renderers.js_bool,
+    'points': renderers.js_bool,
+    'tooltip': renderers.js_bool,
+    'height': renderers.js_number,
+    'width': renderers.js_number,
+}
+
+
+def _options(*names):
+    """Returns options of a skeleton, values of options are passed to
+        'render' in order of names.
+    """
+    return {name: _OPTIONS[name] for name in names}
+
+
+_step_skeleton = renderers.Skeleton((
+    '\n<script type="text/javascript">'
+    '\n     var chart = c3.generate({'
+    '\n         bindto: "%(bind_to)s",'
+    '\n         data: {'
+    '\n             x: %(x)s,'
+    '\n             columns: ['
+    '\n                 %(columns)s'
+    '\n             ],'
+    '\n             type : "%(type)s",'
+    '\n             colors: {'
+    '\n                 %(colors)s'
+    '\n             },'
+    '\n             groups: ['
+    '\n                 %(groups)s'
+    '\n             ],'
+    '\n             labels : %(labels)s'
+    '\n         },'
+    '\n         title: { text: "%(title)s"},'
+    '\n         axis: { x: { type: "%(x_type)s" } },'
+    '\n         grid: {'
+    '\n             x: { show: %(x_grid)s ,lines: [%(x_lines)s] },'
+    '\n             y: { show: %(y_grid)s ,lines: [%(y_lines)s] },'
+    '\n         },'
+    '\n         legend: { show: %(legend)s },'
+    '\n         zoom: { enabled: %(zoom)s },'
+    '\n         tooltip: { grouped: %(tooltip)s },'
+    '\n         size: { height: %(height)s, width: %(width)s }'
+    '\n     });'
+    '\n</script>'
+), options=_options(
+    'type', 'labels', 'x_type', 'x_grid', 'y_grid', 'legend', 'zoom',
+    'tooltip', 'height', 'width'))
+
+
+@chart_tag
 def step(
         context, bind_to, data, title='', area=False, x_is_category=False,
         labels=False, vertical_grid_line=False, horizontal_grid_line=False,
         show_legend=True, zoom=False, group_tooltip=True, height=None,
-        width=None
+        width=None, as_json=None, max_points=None, bucket=None,
+        bucket_aggregate='envelope', data_url=None, viewport=None,
+        destroy_hidden=False, stream_url=None, data_format='json',
+        prerender=None, static=False
         ):
 
     """Generates javascript code to show a 'step' chart.
@@ -91,104 +488,79 @@ def step(
                 in pixel.
             width: It's an integer option, it will determine width of chart
                 in pixel.
+            as_json: It's boolean option, If true, config of chart will be
+                created as a dictionary and written as JSON. (default is
+                C3_JSON setting)
+            max_points: It's an integer option, if a record has more points,
+                it will be downsampled to this number of points with LTTB
+                algorithm.
+            bucket: Number of points (like: 10) or a time width (like: '15m',
+                units are s, m, h, d and w) of buckets. If it's set,
+                consecutive points will be aggregated into buckets and
+                each bucket gets the first 'x' label of its points.
+            bucket_aggregate: How points of a bucket are combined, one of
+                'envelope' (default, min and max of each bucket), 'min',
+                'max', 'mean', 'sum' and 'last'.
+            data_url: A URL, If it's set, only structure of chart is written
+                and its data will be loaded from the URL (that is served by
+                django_c3.views.ChartDataView). values of records are not
+                needed in data.
+            data_format: Format of data that is loaded from data_url,
+                'json' (default), 'f8' or 'f4'. 'f8' and 'f4' are binary
+                formats (64 and 32 bit floats, see django_c3.binary) that are
+                smaller and faster for very large series.
+            viewport: It's boolean option, If true, chart will be created
+                when its element is visible. (default is C3_VIEWPORT
+                setting)
+            destroy_hidden: It's boolean option, If true (and viewport is
+                true), chart will be destroyed when its element is not
+                visible.
+            stream_url: URL of a django_c3.views.ChartStreamView, If it's
+                set, new points that it sends will be appended to chart.
+            prerender: It's boolean option, If true, an SVG drawing of chart
+                is written in its element and is shown until C3 is loaded
+                and creates the chart. (default is C3_PRERENDER setting)
+            static: It's boolean option, If true, only the SVG drawing is
+                written and there is no script.
 
     Returns:
         A string contains chart js code and import code of C3 static files, if
         it did not imported yet.
-        You can see structure of chart in chart_structur variable.
+        You can see structure of chart in _step_skeleton.
 
     """
 
-    # step chart structure in JS
-    chart_structur = (
-        '\n<script type="text/javascript">'
-        '\n     var chart = c3.generate({'
-        '\n         bindto: "%s",'
-        '\n         data: {'
-        '\n             x: %s,'
-        '\n             columns: ['
-        '\n                 %s'
-        '\n             ],'
-        '\n             type : "%s",'
-        '\n             colors: {'
-        '\n                 %s'
-        '\n             },'
-        '\n             groups: ['
-        '\n                 %s'
-        '\n             ],'
-        '\n             labels : %s'
-        '\n         },'
-        '\n         title: { text: "%s"},'
-        '\n         axis: { x: { type: "%s" } },'
-        '\n         grid: {'
-        '\n             x: { show: %s ,lines: [%s] },'
-        '\n             y: { show: %s ,lines: [%s] },'
-        '\n         },'
-        '\n         legend: { show: %s },'
-        '\n         zoom: { enabled: %s },'
-        '\n         tooltip: { grouped: %s },'
-        '\n         size: { height: %s, width: %s }'
-        '\n     });'
-        '\n</script>'
-    )
-
-    # convert parameters to strings to be acceptable in JS and C3 syntax.
-    if area:
-        _type = 'area-step'
-    else:
-        _type = 'step'
+    data = adapters.chart_data(data)
 
-    if x_is_category:
-        x_type = 'category'
-    else:
-        x_type = ''
+    if data_url is not None:
+        data = serialization.skeleton(data)
+        as_json = True
 
-    if labels:
-        labels = 'true'
-    else:
-        labels = 'false'
-
-    if vertical_grid_line:
-        vertical_grid_line = 'true'
-    else:
-        vertical_grid_line = 'false'
-
-    if horizontal_grid_line:
-        horizontal_grid_line = 'true'
-    else:
-        horizontal_grid_line = 'false'
-
-    if show_legend:
-        show_legend = 'true'
-    else:
-        show_legend = 'false'
-
-    if zoom:
-        zoom = 'true'
-    else:
-        zoom = 'false'
+    if serialization.is_lazy(data['data']):
+        # records can be read once, only JSON config is written in one pass.
+        as_json = True
 
-    if group_tooltip:
-        group_tooltip = 'true'
-    else:
-        group_tooltip = 'false'
+    if bucket is not None:
+        data = downsampling.bucket(data, bucket, bucket_aggregate)
 
-    if height is not None:
-        height = int(height)
-    else:
-        height = 'null'
+    if max_points is not None:
+        data = downsampling.downsample(data, int(max_points))
 
-    if width is not None:
-        width = int(width)
-    else:
-        width = 'null'
+    if as_json is None:
+        as_json = use_json
+    if as_json:
+        config = _axis_config(
+            bind_to, data, 'area-step' if area else 'step', title,
+            x_is_category, labels, vertical_grid_line, horizontal_grid_line,
+            show_legend, zoom, group_tooltip, height, width)
+        chart = serialization.script(
+            config, json_encoder, data_url, data_format)
+        return chart
 
     # read horizontal line points from data
     horizontal_lines = str()
     if 'horizontal_lines' in data.keys():
-        for line in data['horizontal_lines']:
-            horizontal_lines = ''.join([horizontal_lines,
-                                        '{ value: %s}' % line, ','])
+        horizontal_lines = serialization.lines(data['horizontal_lines'])
 
     # read vertical line points from data
     # raise an exception if x_is_category set to true and vertical_lines exists
@@ -198,9 +570,7 @@ def step(
             raise Exception(
                 "It's meaningless to use vertical_lines with x_is_category."
                 )
-        for line in data['vertical_lines']:
-            vertical_lines = ''.join(
-                                [vertical_lines, '{ value: %s}' % line, ','])
+        vertical_lines = serialization.lines(data['vertical_lines'])
 
     # reads 'x' field of data and creates X axis labels.
     # a hash is used to naming X axis labels
@@ -210,69 +580,80 @@ def step(
             x_labels = data['x']
         else:
             x_labels = list(filter(lambda x: int(x), data['x']))
-        x_labels = ','.join([repr(str(label)) for label in x_labels])
-        x_labels = '["2d2014226823e74c2accfcce8e0ca141", %s],' % x_labels
-        x_label_list_name = '"2d2014226823e74c2accfcce8e0ca141"'
+        x_labels = serialization.x_labels(x_labels)
+        x_label_list_name = '"%s"' % serialization.X_LABELS_NAME
     else:
         x_labels = ''
         x_label_list_name = "null"
 
     # read records points to draw on chart
-    data_title_list = list()
-    chart_data = str()
-    for item in data['data']:
-        values = ','.join([str(v) for v in item['values']])
-        item_data = '["%s", %s], ' % (item['title'], values)
-        chart_data = ' '.join([chart_data, item_data])
-        data_title_list.append(item['title'])
+    chart_data = serialization.columns(data['data'])
+    data_title_list = [item['title'] for item in data['data']]
     # add X axis labels to chart data
-    chart_data = ''.join([chart_data, x_labels])
+    chart_data = chart_data + x_labels
 
     # read colors of data
-    chart_color = str()
-    for item in data['data']:
-        if 'color' in item.keys():
-            item_color = '"%s": "%s", ' % (item['title'], item['color'])
-            chart_color = ' '.join([chart_color, item_color])
+    chart_color = serialization.colors(data['data'])
 
     # read grouping details of data
     total_group_string = str()
     if 'groups' in data.keys():
-        for group in data['groups']:
-            group_string = str()
-            for item in group:
-                # raise an exception if mentioned key were not exist in data
-                if item not in data_title_list:
-                    raise ValueError("%s is not exists in your data!" % item)
-                group_string = ''.join([group_string, ',', repr(item)])
-            total_group_string = ''.join(
-                            [total_group_string, '[', group_string, ']', ','])
+        total_group_string = serialization.groups(
+                                        data['groups'], data_title_list)
 
     # pass arguments to chart structure
-    chart = chart_structur % (
-            bind_to, x_label_list_name,
-            chart_data, _type, chart_color, total_group_string, labels,
-            title, x_type, vertical_grid_line, vertical_lines,
-            horizontal_grid_line, horizontal_lines, show_legend, zoom,
-            group_tooltip, height, width
-        )
-
-    # add import C3 elements to it, if it does not imported yet and return it.
-    if not ('import_js_c3' in context and context['import_js_c3']):
-        context['import_js_c3'] = True
-        return mark_safe('%s\n%s' % (import_c3(), chart))
-    else:
-        return mark_safe(chart)
+    chart = _step_skeleton.render(
+        ('area-step' if area else 'step', labels,
+         'category' if x_is_category else '', vertical_grid_line,
+         horizontal_grid_line, show_legend, zoom, group_tooltip, height,
+         width),
+        (bind_to, x_label_list_name, chart_data, chart_color,
+         total_group_string, title, vertical_lines, horizontal_lines))
+
+    return chart
 
 ###############################################################################
 
 
-@register.simple_tag(takes_context=True)
+_line_xy_skeleton = renderers.Skeleton((
+    '\n<script type="text/javascript">'
+    '\n     var chart = c3.generate({'
+    '\n         bindto: "%(bind_to)s",'
+    '\n         data: {'
+    '\n             xs: { %(xs)s },'
+    '\n             columns: [ %(columns)s ],'
+    '\n             type : "%(type)s",'
+    '\n             colors: { %(colors)s },'
+    '\n             groups: ['
+    '\n                 %(groups)s'
+    '\n             ],'
+    '\n             labels : %(labels)s'
+    '\n         },'
+    '\n         title: { text: "%(title)s"},'
+    '\n         grid: {'
+    '\n             x: { show: %(x_grid)s ,lines: [%(x_lines)s] },'
+    '\n             y: { show: %(y_grid)s ,lines: [%(y_lines)s] },'
+    '\n         },'
+    '\n         legend: { show: %(legend)s },'
+    '\n         zoom: { enabled: %(zoom)s },'
+    '\n         point: { show: %(points)s },'
+    '\n         tooltip: { grouped: %(tooltip)s },'
+    '\n         size: { height: %(height)s, width: %(width)s }'
+    '\n     });'
+    '\n</script>'
+), options=_options(
+    'type', 'labels', 'x_grid', 'y_grid', 'legend', 'zoom', 'points',
+    'tooltip', 'height', 'width'))
+
+
+@chart_tag
 def line_xy(
         context, bind_to, data, title='', angle=True, area=False,
         labels=False, vertical_grid_line=False, horizontal_grid_line=False,
         show_legend=True, zoom=False, show_points=True, group_tooltip=True,
-        height=None, width=None
+        height=None, width=None, as_json=None, max_points=None,
+        data_url=None, viewport=None, destroy_hidden=False,
+        data_format='json'
         ):
 
     """Generates javascript code to show a 'bar' chart.
@@ -319,174 +700,162 @@ def line_xy(
             height: It's an integer option, It will determine heigth of chart
                 in pixel.
             width: It's an integer option, It will determine width of chart
-                in pixel
+                in pixel.
+            as_json: It's boolean option, If true, config of chart will be
+                created as a dictionary and written as JSON. (default is
+                C3_JSON setting)
+            max_points: It's an integer option, if a record has more points,
+                it will be downsampled to this number of points with LTTB
+                algorithm.
+            data_url: A URL, If it's set, only structure of chart is written
+                and its data will be loaded from the URL (that is served by
+                django_c3.views.ChartDataView). values of records are not
+                needed in data.
+            data_format: Format of data that is loaded from data_url,
+                'json' (default), 'f8' or 'f4'. 'f8' and 'f4' are binary
+                formats (64 and 32 bit floats, see django_c3.binary) that are
+                smaller and faster for very large series.
+            viewport: It's boolean option, If true, chart will be created
+                when its element is visible. (default is C3_VIEWPORT
+                setting)
+            destroy_hidden: It's boolean option, If true (and viewport is
+                true), chart will be destroyed when its element is not
+                visible.
 
     Returns:
         A string contains chart js code and import code of C3 static files, if
         it did not imported yet.
-        You can see structure of chart in chart_structur variable.
+        You can see structure of chart in _line_xy_skeleton.
 
     """
-    # line (X,Y) chart structure in JS
-    chart_structur = (
-        '\n<script type="text/javascript">'
-        '\n     var chart = c3.generate({'
-        '\n         bindto: "%s",'
-        '\n         data: {'
-        '\n             xs: { %s },'
-        '\n             columns: [ %s ],'
-        '\n             type : "%s",'
-        '\n             colors: { %s },'
-        '\n             groups: ['
-        '\n                 %s'
-        '\n             ],'
-        '\n             labels : %s'
-        '\n         },'
-        '\n         title: { text: "%s"},'
-        '\n         grid: {'
-        '\n             x: { show: %s ,lines: [%s] },'
-        '\n             y: { show: %s ,lines: [%s] },'
-        '\n         },'
-        '\n         legend: { show: %s },'
-        '\n         zoom: { enabled: %s },'
-        '\n         point: { show: %s },'
-        '\n         tooltip: { grouped: %s },'
-        '\n         size: { height: %s, width: %s }'
-        '\n     });'
-        '\n</script>'
-    )
-
-    # convert parameters to strings to be acceptable in JS and C3 syntax.
-    if angle and not area:
-        _type = 'line'
-    elif angle and area:
-        _type = 'area'
-    elif not angle and not area:
-        _type = 'spline'
-    elif not angle and area:
-        _type = 'area-spline'
-    else:
-        _type = 'line'
-
-    if labels:
-        labels = 'true'
-    else:
-        labels = 'false'
-
-    if vertical_grid_line:
-        vertical_grid_line = 'true'
-    else:
-        vertical_grid_line = 'false'
-
-    if horizontal_grid_line:
-        horizontal_grid_line = 'true'
-    else:
-        horizontal_grid_line = 'false'
-
-    if show_legend:
-        show_legend = 'true'
-    else:
-        show_legend = 'false'
-
-    if zoom:
-        zoom = 'true'
-    else:
-        zoom = 'false'
-
-    if show_points:
-        show_points = 'true'
-    else:
-        show_points = 'false'
-
-    if group_tooltip:
-        group_tooltip = 'true'
-    else:
-        group_tooltip = 'false'
-
-    if height is not None:
-        height = int(height)
-    else:
-        height = 'null'
-
-    if width is not None:
-        width = int(width)
-    else:
-        width = 'null'
+    data = adapters.xy_chart_data(data)
+
+    if data_url is not None:
+        data = serialization.skeleton(data)
+        as_json = True
+
+    if max_points is not None:
+        data = downsampling.downsample_xy(data, int(max_points))
+
+    if as_json is None:
+        as_json = use_json
+    if as_json:
+        columns, xs = serialization.xy_column_list(data['data'])
+        data_title_list = [item['title'] for item in data['data']]
+        config = {
+            'bindto': bind_to,
+            'data': {
+                'xs': xs,
+                'columns': columns,
+                'type': _line_type(angle, area),
+                'colors': serialization.color_map(data['data']),
+                'groups': serialization.group_list(
+                    data.get('groups', []), data_title_list),
+                'labels': bool(labels),
+            },
+            'title': {'text': title},
+            'grid': {
+                'x': {
+                    'show': bool(vertical_grid_line),
+                    'lines': serialization.line_list(
+                        data.get('vertical_lines', [])),
+                },
+                'y': {
+                    'show': bool(horizontal_grid_line),
+                    'lines': serialization.line_list(
+                        data.get('horizontal_lines', [])),
+                },
+            },
+            'legend': {'show': bool(show_legend)},
+            'zoom': {'enabled': bool(zoom)},
+            'point': {'show': bool(show_points)},
+            'tooltip': {'grouped': bool(group_tooltip)},
+            'size': {
+                'height': int(height) if height is not None else None,
+                'width': int(width) if width is not None else None,
+            },
+        }
+        chart = serialization.script(
+            config, json_encoder, data_url, data_format)
+        return chart
 
     # read horizontal line points from data
     horizontal_lines = str()
     if 'horizontal_lines' in data.keys():
-        for line in data['horizontal_lines']:
-            horizontal_lines = ''.join(
-                                [horizontal_lines, '{ value: %s}' % line, ','])
+        horizontal_lines = serialization.lines(data['horizontal_lines'])
 
     # read vertical line points from data
     vertical_lines = str()
     if 'vertical_lines' in data.keys():
-        for line in data['vertical_lines']:
-            vertical_lines = ''.join(
-                                [vertical_lines, '{ value: %s}' % line, ','])
+        vertical_lines = serialization.lines(data['vertical_lines'])
 
     # read records points to draw on chart
-    xy_mapping = str()
-    data_title_list = list()
-    chart_data = str()
-    for item in data['data']:
-        y_values = ','.join([str(v[1]) for v in item['values']])
-        item_data = '["%s", %s], ' % (item['title'], y_values)
-        chart_data = ' '.join([chart_data, item_data])
-        data_title_list.append(item['title'])
-        x_values = ','.join([str(v[0]) for v in item['values']])
-        item_data = '["%s", %s], ' % (item['title']+'_x', x_values)
-        chart_data = ' '.join([chart_data, item_data])
-        xy_mapping = ''.join(
-                [xy_mapping, '"%s": "%s"' %
-                    (item['title'], item['title']+'_x'), ','])
+    chart_data, xy_mapping = serialization.xy_columns(data['data'])
+    data_title_list = [item['title'] for item in data['data']]
 
     # read colors of data
-    chart_color = str()
-    for item in data['data']:
-        if 'color' in item.keys():
-            item_color = '"%s": "%s", ' % (item['title'], item['color'])
-            chart_color = ' '.join([chart_color, item_color])
+    chart_color = serialization.colors(data['data'])
 
     # read grouping details of data
     total_group_string = str()
     if 'groups' in data.keys():
-        for group in data['groups']:
-            group_string = str()
-            for item in group:
-                # raise an exception if mentioned key were not exist in data
-                if item not in data_title_list:
-                    raise ValueError("%s is not exists in your data!" % item)
-                group_string = ''.join([group_string, ',', repr(item)])
-            total_group_string = ''.join(
-                            [total_group_string, '[', group_string, ']', ','])
+        total_group_string = serialization.groups(
+                                        data['groups'], data_title_list)
 
     # pass arguments to chart structure
-    chart = chart_structur % (
-            bind_to, xy_mapping, chart_data, _type,
-            chart_color, total_group_string, labels, title,
-            vertical_grid_line, vertical_lines, horizontal_grid_line,
-            horizontal_lines, show_legend, zoom, show_points, group_tooltip,
-            height, width
-            )
-
-    # add import C3 elements to it, if it does not imported yet and return it.
-    if not ('import_js_c3' in context and context['import_js_c3']):
-        return mark_safe('%s\n%s' % (import_c3(), chart))
-    else:
-        return mark_safe(chart)
+    chart = _line_xy_skeleton.render(
+        (_line_type(angle, area), labels, vertical_grid_line,
+         horizontal_grid_line, show_legend, zoom, show_points, group_tooltip,
+         height, width),
+        (bind_to, xy_mapping, chart_data, chart_color, total_group_string,
+         title, vertical_lines, horizontal_lines))
+
+    return chart
 
 ###############################################################################
 
 
-@register.simple_tag(takes_context=True)
+_line_skeleton = renderers.Skeleton((
+    '\n<script type="text/javascript">'
+    '\n     var chart = c3.generate({'
+    '\n         bindto: "%(bind_to)s",'
+    '\n         data: {'
+    '\n             x: %(x)s,'
+    '\n             columns: [ %(columns)s ],'
+    '\n             type : "%(type)s",'
+    '\n             colors: { %(colors)s },'
+    '\n             groups: ['
+    '\n                 %(groups)s'
+    '\n             ],'
+    '\n             labels : %(labels)s'
+    '\n         },'
+    '\n         title: { text: "%(title)s"},'
+    '\n         axis: { x: { type: "%(x_type)s" } },'
+    '\n         grid: {'
+    '\n             x: { show: %(x_grid)s ,lines: [%(x_lines)s] },'
+    '\n             y: { show: %(y_grid)s ,lines: [%(y_lines)s] },'
+    '\n         },'
+    '\n         legend: { show: %(legend)s },'
+    '\n         zoom: { enabled: %(zoom)s },'
+    '\n         point: { show: %(points)s },'
+    '\n         tooltip: { grouped: %(tooltip)s },'
+    '\n         size: { height: %(height)s, width: %(width)s }'
+    '\n     });'
+    '\n</script>'
+), options=_options(
+    'type', 'labels', 'x_type', 'x_grid', 'y_grid', 'legend', 'zoom', 'points',
+    'tooltip', 'height', 'width'))
+
+
+@chart_tag
 def line(
         context, bind_to, data, title='', angle=True, area=False,
         x_is_category=False, labels=False, vertical_grid_line=False,
         horizontal_grid_line=False, show_legend=True, zoom=False,
-        show_points=True, group_tooltip=True, height=None, width=None
+        show_points=True, group_tooltip=True, height=None, width=None,
+        as_json=None, max_points=None, data_url=None, viewport=None,
+        destroy_hidden=False, stream_url=None, data_format='json',
+        prerender=None, static=False
         ):
 
     """Generates javascript code to show a 'bar' chart.
@@ -534,112 +903,70 @@ def line(
             height: It's an integer option, It will determine heigth of chart
                 in pixel.
             width: It's an integer option, It will determine width of chart
-                in pixel
+                in pixel.
+            as_json: It's boolean option, If true, config of chart will be
+                created as a dictionary and written as JSON. (default is
+                C3_JSON setting)
+            max_points: It's an integer option, if a record has more points,
+                it will be downsampled to this number of points with LTTB
+                algorithm.
+            data_url: A URL, If it's set, only structure of chart is written
+                and its data will be loaded from the URL (that is served by
+                django_c3.views.ChartDataView). values of records are not
+                needed in data.
+            data_format: Format of data that is loaded from data_url,
+                'json' (default), 'f8' or 'f4'. 'f8' and 'f4' are binary
+                formats (64 and 32 bit floats, see django_c3.binary) that are
+                smaller and faster for very large series.
+            viewport: It's boolean option, If true, chart will be created
+                when its element is visible. (default is C3_VIEWPORT
+                setting)
+            destroy_hidden: It's boolean option, If true (and viewport is
+                true), chart will be destroyed when its element is not
+                visible.
+            stream_url: URL of a django_c3.views.ChartStreamView, If it's
+                set, new points that it sends will be appended to chart.
+            prerender: It's boolean option, If true, an SVG drawing of chart
+                is written in its element and is shown until C3 is loaded
+                and creates the chart. (default is C3_PRERENDER setting)
+            static: It's boolean option, If true, only the SVG drawing is
+                written and there is no script.
 
     Returns:
         A string contains chart js code and import code of C3 static files, if
         it did not imported yet.
-        You can see structure of chart in chart_structur variable.
+        You can see structure of chart in _line_skeleton.
 
     """
-    # line/spline chart structure in JS
-    chart_structur = (
-        '\n<script type="text/javascript">'
-        '\n     var chart = c3.generate({'
-        '\n         bindto: "%s",'
-        '\n         data: {'
-        '\n             x: %s,'
-        '\n             columns: [ %s ],'
-        '\n             type : "%s",'
-        '\n             colors: { %s },'
-        '\n             groups: ['
-        '\n                 %s'
-        '\n             ],'
-        '\n             labels : %s'
-        '\n         },'
-        '\n         title: { text: "%s"},'
-        '\n         axis: { x: { type: "%s" } },'
-        '\n         grid: {'
-        '\n             x: { show: %s ,lines: [%s] },'
-        '\n             y: { show: %s ,lines: [%s] },'
-        '\n         },'
-        '\n         legend: { show: %s },'
-        '\n         zoom: { enabled: %s },'
-        '\n         point: { show: %s },'
-        '\n         tooltip: { grouped: %s },'
-        '\n         size: { height: %s, width: %s }'
-        '\n     });'
-        '\n</script>'
-    )
-
-    # convert parameters to strings to be acceptable in JS and C3 syntax.
-    if angle and not area:
-        _type = 'line'
-    elif angle and area:
-        _type = 'area'
-    elif not angle and not area:
-        _type = 'spline'
-    elif not angle and area:
-        _type = 'area-spline'
-    else:
-        _type = 'line'
-
-    if x_is_category:
-        x_type = 'category'
-    else:
-        x_type = ''
-
-    if labels:
-        labels = 'true'
-    else:
-        labels = 'false'
-
-    if vertical_grid_line:
-        vertical_grid_line = 'true'
-    else:
-        vertical_grid_line = 'false'
-
-    if horizontal_grid_line:
-        horizontal_grid_line = 'true'
-    else:
-        horizontal_grid_line = 'false'
-
-    if show_legend:
-        show_legend = 'true'
-    else:
-        show_legend = 'false'
-
-    if zoom:
-        zoom = 'true'
-    else:
-        zoom = 'false'
-
-    if show_points:
-        show_points = 'true'
-    else:
-        show_points = 'false'
-
-    if group_tooltip:
-        group_tooltip = 'true'
-    else:
-        group_tooltip = 'false'
-
-    if height is not None:
-        height = int(height)
-    else:
-        height = 'null'
-
-    if width is not None:
-        width = int(width)
-    else:
-        width = 'null'
+    data = adapters.chart_data(data)
+
+    if data_url is not None:
+        data = serialization.skeleton(data)
+        as_json = True
+
+    if serialization.is_lazy(data['data']):
+        # records can be read once, only JSON config is written in one pass.
+        as_json = True
+
+    if max_points is not None:
+        data = downsampling.downsample(data, int(max_points))
+
+    if as_json is None:
+        as_json = use_json
+    if as_json:
+        config = _axis_config(
+            bind_to, data, _line_type(angle, area), title, x_is_category,
+            labels, vertical_grid_line, horizontal_grid_line, show_legend,
+            zoom, group_tooltip, height, width)
+        config['point'] = {'show': bool(show_points)}
+        chart = serialization.script(
+            config, json_encoder, data_url, data_format)
+        return chart
 
     # read horizontal line points from data
     horizontal_lines = str()
     if 'horizontal_lines' in data.keys():
-        for line in data['horizontal_lines']:
-            horizontal_lines = ''.join(
-                                [horizontal_lines, '{ value: %s}' % line, ','])
+        horizontal_lines = serialization.lines(data['horizontal_lines'])
 
     # read vertical line points from data
     # raise an exception if x_is_category set to true and vertical_lines exists
@@ -648,9 +975,7 @@ def line(
         if x_is_category:
             raise Exception(
                 "It's meaningless to use vertical_lines with x_is_category.")
-        for line in data['vertical_lines']:
-            vertical_lines = ''.join(
-                                [vertical_lines, '{ value: %s}' % line, ','])
+        vertical_lines = serialization.lines(data['vertical_lines'])
 
     # reads 'x' field of data and creates X axis labels.
     # a hash is used to naming X axis labels
@@ -661,68 +986,83 @@ def line(
         else:
             x_labels = list(filter(lambda x: int(x), data['x']))
 
-        x_labels = ','.join([repr(str(label)) for label in x_labels])
-        x_labels = '["2d2014226823e74c2accfcce8e0ca141", %s],' % x_labels
-        x_label_list_name = '"2d2014226823e74c2accfcce8e0ca141"'
+        x_labels = serialization.x_labels(x_labels)
+        x_label_list_name = '"%s"' % serialization.X_LABELS_NAME
     else:
         x_labels = ''
         x_label_list_name = "null"
 
     # read records points to draw on chart
-    data_title_list = list()
-    chart_data = str()
-    for item in data['data']:
-        values = ','.join([str(v) for v in item['values']])
-        item_data = '["%s", %s], ' % (item['title'], values)
-        chart_data = ' '.join([chart_data, item_data])
-        data_title_list.append(item['title'])
+    chart_data = serialization.columns(data['data'])
+    data_title_list = [item['title'] for item in data['data']]
     # add X axis labels to chart data
-    chart_data = ''.join([chart_data, x_labels])
+    chart_data = chart_data + x_labels
 
     # read colors of data
-    chart_color = str()
-    for item in data['data']:
-        if 'color' in item.keys():
-            item_color = '"%s": "%s", ' % (item['title'], item['color'])
-            chart_color = ' '.join([chart_color, item_color])
+    chart_color = serialization.colors(data['data'])
 
     # read grouping details of data
     total_group_string = str()
     if 'groups' in data.keys():
-        for group in data['groups']:
-            group_string = str()
-            for item in group:
-                # raise an exception if mentioned key were not exist in data
-                if item not in data_title_list:
-                    raise ValueError("%s is not exists in your data!" % item)
-                group_string = ''.join([group_string, ',', repr(item)])
-            total_group_string = ''.join(
-                            [total_group_string, '[', group_string, ']', ','])
+        total_group_string = serialization.groups(
+                                        data['groups'], data_title_list)
 
     # pass arguments to chart structure
-    chart = chart_structur % (
-            bind_to, x_label_list_name, chart_data, _type,
-            chart_color, total_group_string, labels, title, x_type,
-            vertical_grid_line, vertical_lines, horizontal_grid_line,
-            horizontal_lines, show_legend, zoom, show_points, group_tooltip,
-            height, width
-            )
-
-    # add import C3 elements to it, if it does not imported yet and return it.
-    if not ('import_js_c3' in context and context['import_js_c3']):
-        return mark_safe('%s\n%s' % (import_c3(), chart))
-    else:
-        return mark_safe(chart)
+    chart = _line_skeleton.render(
+        (_line_type(angle, area), labels,
+         'category' if x_is_category else '', vertical_grid_line,
+         horizontal_grid_line, show_legend, zoom, show_points, group_tooltip,
+         height, width),
+        (bind_to, x_label_list_name, chart_data, chart_color,
+         total_group_string, title, vertical_lines, horizontal_lines))
+
+    return chart
 
 ##############################################################################
 
 
-@register.simple_tag(takes_context=True)
+_bar_skeleton = renderers.Skeleton((
+    '\n<script type="text/javascript">'
+    '\n     var chart = c3.generate({'
+    '\n         bindto: "%(bind_to)s",'
+    '\n         data: {'
+    '\n             x: %(x)s,'
+    '\n             columns: ['
+    '\n                 %(columns)s'
+    '\n             ],'
+    '\n             type : "bar",'
+    '\n             colors: { %(colors)s },'
+    '\n             groups: ['
+    '\n                 %(groups)s'
+    '\n             ],'
+    '\n             labels : %(labels)s'
+    '\n         },'
+    '\n         title: { text: "%(title)s"},'
+    '\n         axis: { x: { type: "%(x_type)s" } },'
+    '\n         bar: { width: %(column_width)s },'
+    '\n         grid: {'
+    '\n             x: { show: %(x_grid)s ,lines: [%(x_lines)s] },'
+    '\n             y: { show: %(y_grid)s ,lines: [%(y_lines)s] },'
+    '\n         },'
+    '\n         legend: { show: %(legend)s },'
+    '\n         zoom: { enabled: %(zoom)s },'
+    '\n         tooltip: { grouped: %(tooltip)s },'
+    '\n         size: { height: %(height)s, width: %(width)s }'
+    '\n     });'
+    '\n</script>'
+), options=_options(
+    'labels', 'x_type', 'column_width', 'x_grid', 'y_grid', 'legend', 'zoom',
+    'tooltip', 'height', 'width'))
+
+
+@chart_tag
 def bar(
         context, bind_to, data, title='', x_is_category=False, labels=False,
         vertical_grid_line=False, horizontal_grid_line=False, show_legend=True,
         zoom=False, group_tooltip=True, column_width=None, height=None,
-        width=None
+        width=None, as_json=None, bucket=None, bucket_aggregate='max',
+        data_url=None, viewport=None, destroy_hidden=False,
+        data_format='json', prerender=None, static=False
         ):
 
     """Generates javascript code to show a 'bar' chart.
@@ -769,44 +1109,66 @@ def bar(
             in pixel.
         width: It's an integer option, It will determine width of chart
             in pixel.
+        as_json: It's boolean option, If true, config of chart will be
+            created as a dictionary and written as JSON. (default is
+            C3_JSON setting)
+        bucket: Number of points (like: 10) or a time width (like: '15m',
+            units are s, m, h, d and w) of buckets. If it's set, consecutive
+            points will be aggregated into buckets and each bucket gets the
+            first 'x' label of its points.
+        bucket_aggregate: How points of a bucket are combined, one of 'max'
+            (default), 'envelope' (min and max of each bucket, as two bars
+            with the same label), 'min', 'mean', 'sum' and 'last'.
+        data_url: A URL, If it's set, only structure of chart is written and
+            its data will be loaded from the URL (that is served by
+            django_c3.views.ChartDataView). values of records are not needed
+            in data.
+        data_format: Format of data that is loaded from data_url, 'json'
+            (default), 'f8' or 'f4'. 'f8' and 'f4' are binary formats (64 and
+            32 bit floats, see django_c3.binary) that are smaller and faster
+            for very large series.
+        viewport: It's boolean option, If true, chart will be created when
+            its element is visible. (default is C3_VIEWPORT setting)
+        destroy_hidden: It's boolean option, If true (and viewport is true),
+            chart will be destroyed when its element is not visible.
+        prerender: It's boolean option, If true, an SVG drawing of chart is
+            written in its element and is shown until C3 is loaded and
+            creates the chart. (default is C3_PRERENDER setting)
+        static: It's boolean option, If true, only the SVG drawing is
+            written and there is no script.
 
     Returns:
         A string contains chart js code and import code of C3 static files, if
         it did not imported yet.
-        You can see structure of chart in chart_structur variable.
+        You can see structure of chart in _bar_skeleton.
 
     """
-    # bar chart structure in JS
-    chart_structur = (
-        '\n<script type="text/javascript">'
-        '\n     var chart = c3.generate({'
-        '\n         bindto: "%s",'
-        '\n         data: {'
-        '\n             x: %s,'
-        '\n             columns: ['
-        '\n                 %s'
-        '\n             ],'
-        '\n             type : "bar",'
-        '\n             colors: { %s },'
-        '\n             groups: ['
-        '\n                 %s'
-        '\n             ],'
-        '\n             labels : %s'
-        '\n         },'
-        '\n         title: { text: "%s"},'
-        '\n         axis: { x: { type: "%s" } },'
-        '\n         bar: { width: %s },'
-        '\n         grid: {'
-        '\n             x: { show: %s ,lines: [%s] },'
-        '\n             y: { show: %s ,lines: [%s] },'
-        '\n         },'
-        '\n         legend: { show: %s },'
-        '\n         zoom: { enabled: %s },'
-        '\n         tooltip: { grouped: %s },'
-        '\n         size: { height: %s, width: %s }'
-        '\n     });'
-        '\n</script>'
-    )
+    data = adapters.chart_data(data)
+
+    if data_url is not None:
+        data = serialization.skeleton(data)
+        as_json = True
+
+    if serialization.is_lazy(data['data']):
+        # records can be read once, only JSON config is written in one pass.
+        as_json = True
+
+    if bucket is not None:
+        data = downsampling.bucket(data, bucket, bucket_aggregate)
+
+    if as_json is None:
+        as_json = use_json
+    if as_json:
+        config = _axis_config(
+            bind_to, data, 'bar', title, x_is_category, labels,
+            vertical_grid_line, horizontal_grid_line, show_legend, zoom,
+            group_tooltip, height, width)
+        config['bar'] = {
+            'width': int(column_width) if column_width is not None else None
+        }
+        chart = serialization.script(
+            config, json_encoder, data_url, data_format)
+        return chart
 
     # reads 'x' field of data and creates X axis labels.
     # a hash is used to naming X axis labels
@@ -817,88 +1179,25 @@ def bar(
         else:
             x_labels = list(filter(lambda x: int(x), data['x']))
 
-        x_labels = ','.join([repr(str(label)) for label in x_labels])
-        x_labels = '["2d2014226823e74c2accfcce8e0ca141", %s],' % x_labels
-        x_label_list_name = '"2d2014226823e74c2accfcce8e0ca141"'
+        x_labels = serialization.x_labels(x_labels)
+        x_label_list_name = '"%s"' % serialization.X_LABELS_NAME
     else:
         x_labels = ''
         x_label_list_name = "null"
 
-    # convert parameters to strings to be acceptable in JS and C3 syntax.
-    if x_is_category:
-        x_type = 'category'
-    else:
-        x_type = ''
-
-    if labels:
-        labels = 'true'
-    else:
-        labels = 'false'
-
-    if vertical_grid_line:
-        vertical_grid_line = 'true'
-    else:
-        vertical_grid_line = 'false'
-
-    if horizontal_grid_line:
-        horizontal_grid_line = 'true'
-    else:
-        horizontal_grid_line = 'false'
-
-    if show_legend:
-        show_legend = 'true'
-    else:
-        show_legend = 'false'
-
-    if zoom:
-        zoom = 'true'
-    else:
-        zoom = 'false'
-
-    if group_tooltip:
-        group_tooltip = 'true'
-    else:
-        group_tooltip = 'false'
-
-    if height is not None:
-        height = int(height)
-    else:
-        height = 'null'
-
-    if width is not None:
-        width = int(width)
-    else:
-        width = 'null'
-
-    if column_width is not None:
-        column_width = int(column_width)
-    else:
-        column_width = 'null'
-
     # read records points to draw on chart
-    data_title_list = list()
-    chart_data = str()
-    for item in data['data']:
-        values = ','.join([str(v) for v in item['values']])
-        item_data = '["%s", %s], ' % (item['title'], values)
-        chart_data = ' '.join([chart_data, item_data])
-        data_title_list.append(item['title'])
+    chart_data = serialization.columns(data['data'])
+    data_title_list = [item['title'] for item in data['data']]
     # add X axis labels to chart data
-    chart_data = ''.join([chart_data, x_labels])
+    chart_data = chart_data + x_labels
 
     # read colors of data
-    chart_color = str()
-    for item in data['data']:
-        if 'color' in item.keys():
-            item_color = '"%s": "%s", ' % (item['title'], item['color'])
-            chart_color = ' '.join([chart_color, item_color])
+    chart_color = serialization.colors(data['data'])
 
     # read horizontal line points from data
     horizontal_lines = str()
     if 'horizontal_lines' in data.keys():
-        for line in data['horizontal_lines']:
-            horizontal_lines = ''.join(
-                                [horizontal_lines, '{ value: %s}' % line, ','])
+        horizontal_lines = serialization.lines(data['horizontal_lines'])
 
     # read vertical line points from data
     # raise an exception if x_is_category set to true and vertical_lines exists
@@ -907,45 +1206,49 @@ def bar(
         if x_is_category:
             raise Exception(
                 "It's meaningless to use vertical_lines with x_is_category.")
-        for line in data['vertical_lines']:
-            vertical_lines = ''.join(
-                                [vertical_lines, '{ value: %s}' % line, ','])
+        vertical_lines = serialization.lines(data['vertical_lines'])
 
     # read grouping details of data
     total_group_string = str()
     if 'groups' in data.keys():
-        for group in data['groups']:
-            group_string = str()
-            for item in group:
-                # raise an exception if mentioned key were not exist in data
-                if item not in data_title_list:
-                    raise ValueError("%s is not exists in your data!" % item)
-                group_string = ''.join([group_string, ',', repr(item)])
-            total_group_string = ''.join(
-                            [total_group_string, '[', group_string, ']', ','])
+        total_group_string = serialization.groups(
+                                        data['groups'], data_title_list)
 
     # pass arguments to chart structure
-    chart = chart_structur % (
-        bind_to, x_label_list_name, chart_data, chart_color,
-        total_group_string, labels, title, x_type, column_width,
-        vertical_grid_line, vertical_lines, horizontal_grid_line,
-        horizontal_lines, show_legend, zoom, group_tooltip, height, width
-        )
-
-    # add import C3 elements to it, if it does not imported yet and return it.
-    if not ('import_js_c3' in context and context['import_js_c3']):
-        context['import_js_c3'] = True
-        return mark_safe('%s\n%s' % (import_c3(), chart))
-    else:
-        return mark_safe(chart)
+    chart = _bar_skeleton.render(
+        (labels, 'category' if x_is_category else '', column_width,
+         vertical_grid_line, horizontal_grid_line, show_legend, zoom,
+         group_tooltip, height, width),
+        (bind_to, x_label_list_name, chart_data, chart_color,
+         total_group_string, title, vertical_lines, horizontal_lines))
+
+    return chart
 
 ###############################################################################
 
 
-@register.simple_tag(takes_context=True)
+_pie_skeleton = renderers.Skeleton((
+    '\n<script type="text/javascript">'
+    '\n     var chart = c3.generate({'
+    '\n         bindto: "%(bind_to)s",'
+    '\n         data: {'
+    '\n             columns: [ %(columns)s ],'
+    '\n             type : "pie",'
+    '\n             colors: { %(colors)s }'
+    '\n         },'
+    '\n         title: { text: "%(title)s"},'
+    '\n         legend: { show: %(legend)s },'
+    '\n         size: { height: %(height)s, width: %(width)s }'
+    '\n     });'
+    '\n</script>'
+), options=_options('legend', 'height', 'width'))
+
+
+@chart_tag
 def pie(
         context, bind_to, data, title='', show_legend=True, height=None,
-        width=None
+        width=None, as_json=None, data_url=None, viewport=None,
+        destroy_hidden=False, prerender=None, static=False
         ):
 
     """Generates javascript code to show a 'pie' chart.
@@ -967,79 +1270,93 @@ def pie(
             in pixel.
         width: It's an integer option, It will determine width of chart
             in pixel.
+        as_json: It's boolean option, If true, config of chart will be
+            created as a dictionary and written as JSON. (default is
+            C3_JSON setting)
+        data_url: A URL, If it's set, only structure of chart is written and
+            its data will be loaded from the URL (that is served by
+            django_c3.views.ChartDataView). values of records are not needed
+            in data.
+        viewport: It's boolean option, If true, chart will be created when
+            its element is visible. (default is C3_VIEWPORT setting)
+        destroy_hidden: It's boolean option, If true (and viewport is true),
+            chart will be destroyed when its element is not visible.
+        prerender: It's boolean option, If true, an SVG drawing of chart is
+            written in its element and is shown until C3 is loaded and
+            creates the chart. (default is C3_PRERENDER setting)
+        static: It's boolean option, If true, only the SVG drawing is
+            written and there is no script.
 
     Returns:
         A string contains chart js code and import code of C3 static files, if
         it did not imported yet.
-        You can see structure of chart in chart_structur variable.
+        You can see structure of chart in _pie_skeleton.
     """
 
-    # pie chart structure in JS
-    chart_structur = (
-        '\n<script type="text/javascript">'
-        '\n     var chart = c3.generate({'
-        '\n         bindto: "%s",'
-        '\n         data: {'
-        '\n             columns: [ %s ],'
-        '\n             type : "pie",'
-        '\n             colors: { %s }'
-        '\n         },'
-        '\n         title: { text: "%s"},'
-        '\n         legend: { show: %s },'
-        '\n         size: { height: %s, width: %s }'
-        '\n     });'
-        '\n</script>'
-    )
-
-    # convert parameters to strings to be acceptable in JS and C3 syntax.
-    if show_legend:
-        show_legend = 'true'
-    else:
-        show_legend = 'false'
-
-    if height is not None:
-        height = int(height)
-    else:
-        height = 'null'
-
-    if width is not None:
-        width = int(width)
-    else:
-        width = 'null'
+    if data_url is not None:
+        data = serialization.skeleton(data)
+        as_json = True
+
+    if as_json is None:
+        as_json = use_json
+    if as_json:
+        config = {
+            'bindto': bind_to,
+            'data': {
+                'columns': serialization.value_column_list(data),
+                'type': 'pie',
+                'colors': serialization.color_map(data),
+            },
+            'title': {'text': title},
+            'legend': {'show': bool(show_legend)},
+            'size': {
+                'height': int(height) if height is not None else None,
+                'width': int(width) if width is not None else None,
+            },
+        }
+        chart = serialization.script(config, json_encoder, data_url)
+        return chart
 
     # read records points to draw on chart
-    chart_data = str()
-    for item in data:
-        item_data = '["%s", %s], ' % (item['title'], item['value'])
-        chart_data = ' '.join([chart_data, item_data])
+    chart_data = serialization.value_columns(data)
 
     # read colors of data
-    chart_color = str()
-    for item in data:
-        if 'color' in item.keys():
-            item_color = '"%s": "%s", ' % (item['title'], item['color'])
-            chart_color = ' '.join([chart_color, item_color])
+    chart_color = serialization.colors(data)
 
     # pass arguments to chart structure
-    chart = chart_structur % (
-            bind_to, chart_data, chart_color, title,
-            show_legend, height, width
-            )
-
-    # add import C3 elements to it, if it does not imported yet and return it.
-    if not ('import_js_c3' in context and context['import_js_c3']):
-        context['import_js_c3'] = True
-        return mark_safe('%s\n%s' % (import_c3(), chart))
-    else:
-        return mark_safe(chart)
+    chart = _pie_skeleton.render(
+        (show_legend, height, width),
+        (bind_to, chart_data, chart_color, title))
+
+    return chart
 
 ###############################################################################
 
 
-@register.simple_tag(takes_context=True)
+_donut_skeleton = renderers.Skeleton((
+    '\n<script type="text/javascript">'
+    '\n     var chart = c3.generate({'
+    '\n         bindto: "%(bind_to)s",'
+    '\n         data: {'
+    '\n             columns: [ %(columns)s ],'
+    '\n             type : "donut",'
+    '\n             colors: { %(colors)s }'
+    '\n         },'
+    '\n         title: { text: "%(title)s"},'
+    '\n         donut: { title: "%(inner_title)s"},'
+    '\n         legend: { show: %(legend)s },'
+    '\n         size: { height: %(height)s, width: %(width)s }'
+    '\n     });'
+    '\n</script>'
+), options=_options('legend', 'height', 'width'))
+
+
+@chart_tag
 def donut(
         context, bind_to, data, inner_title='', outer_title='',
-        show_legend=True, height=None, width=None
+        show_legend=True, height=None, width=None, as_json=None,
+        data_url=None, viewport=None, destroy_hidden=False, prerender=None,
+        static=False
         ):
 
     """Generates javascript code to show a 'donut' chart.
@@ -1062,69 +1379,122 @@ def donut(
             in pixel.
         width: It's an integer option, It will determine width of chart
             in pixel.
+        as_json: It's boolean option, If true, config of chart will be
+            created as a dictionary and written as JSON. (default is
+            C3_JSON setting)
+        data_url: A URL, If it's set, only structure of chart is written and
+            its data will be loaded from the URL (that is served by
+            django_c3.views.ChartDataView). values of records are not needed
+            in data.
+        viewport: It's boolean option, If true, chart will be created when
+            its element is visible. (default is C3_VIEWPORT setting)
+        destroy_hidden: It's boolean option, If true (and viewport is true),
+            chart will be destroyed when its element is not visible.
+        prerender: It's boolean option, If true, an SVG drawing of chart is
+            written in its element and is shown until C3 is loaded and
+            creates the chart. (default is C3_PRERENDER setting)
+        static: It's boolean option, If true, only the SVG drawing is
+            written and there is no script.
 
     Returns:
         A string contains chart js code and import code of C3 static files, if
         it did not imported yet.
-        You can see structure of chart in chart_structur variable.
+        You can see structure of chart in _donut_skeleton.
 
     """
-    # donut chart structure in JS
-    chart_structur = (
-        '\n<script type="text/javascript">'
-        '\n     var chart = c3.generate({'
-        '\n         bindto: "%s",'
-        '\n         data: {'
-        '\n             columns: [ %s ],'
-        '\n             type : "donut",'
-        '\n             colors: { %s }'
-        '\n         },'
-        '\n         title: { text: "%s"},'
-        '\n         donut: { title: "%s"},'
-        '\n         legend: { show: %s },'
-        '\n         size: { height: %s, width: %s }'
-        '\n     });'
-        '\n</script>'
-    )
-
-    # convert parameters to strings to be acceptable in JS and C3 syntax.
-    if height is not None:
-        height = int(height)
-    else:
-        height = 'null'
-
-    if width is not None:
-        width = int(width)
-    else:
-        width = 'null'
-
-    if show_legend:
-        show_legend = 'true'
-    else:
-        show_legend = 'false'
+    if data_url is not None:
+        data = serialization.skeleton(data)
+        as_json = True
+
+    if as_json is None:
+        as_json = use_json
+    if as_json:
+        config = {
+            'bindto': bind_to,
+            'data': {
+                'columns': serialization.value_column_list(data),
+                'type': 'donut',
+                'colors': serialization.color_map(data),
+            },
+            'title': {'text': outer_title},
+            'donut': {'title': inner_title},
+            'legend': {'show': bool(show_legend)},
+            'size': {
+                'height': int(height) if height is not None else None,
+                'width': int(width) if width is not None else None,
+            },
+        }
+        chart = serialization.script(config, json_encoder, data_url)
+        return chart
 
     # read records points to draw on chart
-    chart_data = str()
-    for item in data:
-        item_data = '["%s", %s], ' % (item['title'], item['value'])
-        chart_data = ' '.join([chart_data, item_data])
+    chart_data = serialization.value_columns(data)
 
     # read colors of data
-    chart_color = str()
-    for item in data:
-        if 'color' in item.keys():
-            item_color = '"%s": "%s", ' % (item['title'], item['color'])
-            chart_color = ' '.join([chart_color, item_color])
+    chart_color = serialization.colors(data)
 
     # pass arguments to chart structure
-    chart = chart_structur % (
-                bind_to, chart_data, chart_color, outer_title, inner_title,
-                show_legend, height, width
-                )
+    chart = _donut_skeleton.render(
+        (show_legend, height, width),
+        (bind_to, chart_data, chart_color, outer_title, inner_title))
 
-    # add import C3 elements to it, if it does not imported yet and return it.
-    if not ('import_js_c3' in context and context['import_js_c3']):
-        context['import_js_c3'] = True
-        return mark_safe('%s\n%s' % (import_c3(), chart))
-    else:
-        return mark_safe(chart)
+    return chart
+
+###############################################################################
+
+
+@register.simple_tag(takes_context=True)
+def sparkline(
+        context, values, color=None, height=30, width=120, area=False,
+        as_svg=None
+        ):
+
+    """Generates a sparkline, a tiny line chart for tables and lists.
+
+    Unlike other chart tags, it writes the element of chart itself and no
+    script. The first sparkline of the page writes one script that creates
+    all sparklines of the page with a minimal config (no axes, legend,
+    tooltip, ...), a batch of them in each animation frame.
+    (see djangoC3.sparklines in static/django_c3/js/django-c3.js)
+
+    eg:
+        {% for product in products %}
+            <tr><td>{{ product.name }}</td>
+                <td>{% sparkline product.daily_sales %}</td></tr>
+        {% endfor %}
+
+    Args:
+        context: Context of template.
+        values: Values of the line, a list (or a NumPy array or pandas
+            Series) of numbers. None and NaN values are gaps.
+        color: Color of the line. (like: '#FF34FF')
+        height: It's an integer option, It will determine heigth of chart
+            in pixel.
+        width: It's an integer option, It will determine width of chart
+            in pixel.
+        area: It's boolean option, If true, area under the line is filled.
+        as_svg: It's boolean option, If true, the line is drawn as an inline
+            SVG on server and no JavaScript is needed. (default is
+            C3_SPARKLINE_SVG setting)
+
+    Returns:
+        A string contains element of the sparkline (or an 'svg' element) and
+        import code of C3 static files and the script that creates
+        sparklines, if they are not written yet.
+
+    """
+    values = adapters.values_data(values)
+    if as_svg is None:
+        as_svg = sparkline_svg
+    if as_svg:
+        return mark_safe(
+            svg.sparkline(values, int(width), int(height), color, area))
+
+    element = serialization.sparkline_element(
+        values, color, height, width, area)
+    page_assets = assets.get_assets(context)
+    if page_assets.sparklines:
+        return mark_safe(element)
+    page_assets.sparklines = True
+    return mark_safe(
+        _with_imports(context, serialization.SPARKLINES_SCRIPT) + element)
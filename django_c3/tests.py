@@ -1,5 +1,45 @@
-from django.test import SimpleTestCase
-from django.template import Context, Template
+import asyncio
+import base64
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings)
+from django.http import HttpResponse
+from django.template import Context, RequestContext, Template
+from django.urls import path
+from django.utils import timezone
+
+from django_c3 import (
+    adapters, assets, benchmark, binary, cache, downsampling, export,
+    instrumentation, renderers, serialization, sources, svg)
+from django_c3.middleware import C3AssetsMiddleware
+from django_c3.models import ChartSnapshot
+from django_c3.signals import chart_rendered
+from django_c3.streaming import stream_chart
+from django_c3.templatetags import c3 as c3_tags
+from django_c3.views import (
+    ASYNC_STREAMING, ASYNC_VIEWS, AsyncChartDataView, ChartDataView,
+    ChartStreamView)
 
 ###############################################################################
 
@@ -984,3 +1024,1696 @@ class LineChartTest(SimpleTestCase):
             ('["2d2014226823e74c2accfcce8e0ca141",'
             '\'2017-5-19\',\'2017-5-20\',\'2017-5-21\',\'2017-5-22\']') in
             rendered_template)
+
+###############################################################################
+
+
+class SerializationTest(SimpleTestCase):
+
+    def test_lines(self):
+        self.assertEqual(
+            serialization.lines([40, 50]), '{ value: 40},{ value: 50},')
+
+    def test_columns(self):
+        series = [
+            {'title': 'A', 'values': [1, 2]},
+            {'title': 'B', 'values': [3, 4]},
+        ]
+        self.assertEqual(
+            serialization.columns(series), ' ["A", 1,2],  ["B", 3,4], ')
+
+    def test_xy_columns(self):
+        series = [{'title': 'A', 'values': [(1, 2), (3, 4)]}]
+        chart_data, xy_mapping = serialization.xy_columns(series)
+        self.assertEqual(chart_data, ' ["A", 2,4],  ["A_x", 1,3], ')
+        self.assertEqual(xy_mapping, '"A": "A_x",')
+
+    def test_groups(self):
+        self.assertEqual(
+            serialization.groups([('A', 'B')], ['A', 'B']), "[,'A','B'],")
+        with self.assertRaises(ValueError):
+            serialization.groups([('A', 'C')], ['A', 'B'])
+
+    def test_many_series(self):
+        series = [{'title': str(i), 'values': [i]} for i in range(20000)]
+        chart_data = serialization.columns(series)
+        self.assertTrue(chart_data.startswith(' ["0", 0], '))
+        self.assertTrue(chart_data.endswith(' ["19999", 19999], '))
+
+###############################################################################
+
+
+class JSONConfigTest(SimpleTestCase):
+
+    def setUp(self):
+        self.chart_data = {
+            'x': ['2017-5-19', '2017-5-20'],
+            'horizontal_lines': [40],
+            'data': [
+                {'title': 'A', 'values': [26, 35], 'color': 'red'},
+                {'title': 'B', 'values': [54, 25]},
+            ],
+            'groups': [('A', 'B')]
+        }
+        self.context = Context({'chart': self.chart_data})
+
+    def render_config(self, tag):
+        rendered_template = Template(
+            '{%% load c3 %%}{%% %s as_json=True %%}' % tag
+            ).render(self.context)
+        match = re.search(r'c3\.generate\((.*)\);', rendered_template)
+        return json.loads(match.group(1))
+
+    def test_bar(self):
+        config = self.render_config(
+            'bar "#chart" chart "</script>" x_is_category=True '
+            'column_width=10')
+        self.assertEqual(config['bindto'], '#chart')
+        self.assertEqual(config['title']['text'], '</script>')
+        self.assertEqual(config['data']['type'], 'bar')
+        self.assertEqual(config['data']['columns'][0], ['A', 26, 35])
+        self.assertEqual(
+            config['data']['columns'][2],
+            [serialization.X_LABELS_NAME, '2017-5-19', '2017-5-20'])
+        self.assertEqual(config['data']['colors'], {'A': 'red'})
+        self.assertEqual(config['data']['groups'], [['A', 'B']])
+        self.assertEqual(config['grid']['y']['lines'], [{'value': 40}])
+        self.assertEqual(config['axis']['x']['type'], 'category')
+        self.assertEqual(config['bar']['width'], 10)
+
+    def test_script_escape(self):
+        rendered_template = Template(
+            '{% load c3 %}{% bar "#chart" chart "</script>" '
+            'x_is_category=True as_json=True %}'
+            ).render(self.context)
+        self.assertFalse('"</script>"' in rendered_template)
+
+    def test_line(self):
+        config = self.render_config(
+            'line "#chart" chart angle=False area=True show_points=False '
+            'x_is_category=True')
+        self.assertEqual(config['data']['type'], 'area-spline')
+        self.assertEqual(config['point']['show'], False)
+
+    def test_line_xy(self):
+        self.context['chart'] = {
+            'data': [{'title': 'A', 'values': [(1, 2), (3, 4)]}]}
+        config = self.render_config('line_xy "#chart" chart')
+        self.assertEqual(
+            config['data']['columns'], [['A', 2, 4], ['A_x', 1, 3]])
+        self.assertEqual(config['data']['xs'], {'A': 'A_x'})
+
+    def test_donut(self):
+        self.context['chart'] = [
+            {'title': 'A', 'value': 6, 'color': 'red'},
+            {'title': 'B', 'value': 10},
+        ]
+        config = self.render_config(
+            'donut "#chart" chart "inner" "outer" height=100')
+        self.assertEqual(config['data']['columns'], [['A', 6], ['B', 10]])
+        self.assertEqual(config['donut']['title'], 'inner')
+        self.assertEqual(config['size'], {'height': 100, 'width': None})
+
+    def test_encoders(self):
+        config = {'data': {'columns': [['A', 1, 2]]}, 'title': '<b>'}
+        self.assertEqual(
+            json.loads(serialization.dumps(config, 'json')), config)
+        self.assertEqual(
+            json.loads(serialization.dumps(config, json.dumps)), config)
+        with self.assertRaises(ValueError):
+            serialization.dumps(config, 'unknown')
+
+    def test_not_finite(self):
+        config = {'columns': [['A', 1.5, float('nan')], ('B', float('inf'))]}
+        self.assertEqual(
+            serialization.dumps(config, 'json'),
+            '{"columns":[["A",1.5,null],["B",null]]}')
+        # config is not changed.
+        self.assertEqual(config['columns'][1], ('B', float('inf')))
+
+    @skipIf(adapters.numpy is None, 'NumPy is not installed.')
+    def test_numpy_scalars(self):
+        numpy = adapters.numpy
+        config = {
+            'columns': [[1, numpy.int64(26), numpy.float32(1.5),
+                         numpy.float64('nan'), Decimal('2.5')]],
+            'colors': {1: 'red'},
+        }
+        encoders = ['json'] + (['orjson'] if serialization.orjson else [])
+        for encoder in encoders:
+            self.assertEqual(
+                serialization.dumps(config, encoder),
+                '{"columns":[[1,26,1.5,null,2.5]],"colors":{"1":"red"}}')
+
+    def test_number_titles(self):
+        self.chart_data['data'] = [
+            {'title': 1, 'values': [Decimal('26.5'), 35], 'color': 'red'},
+            {'title': 2, 'values': [54, 25]},
+        ]
+        self.chart_data['groups'] = [(1, 2)]
+        config = self.render_config('bar "#chart" chart x_is_category=True')
+        self.assertEqual(config['data']['columns'][0], [1, 26.5, 35])
+        self.assertEqual(config['data']['colors'], {'1': 'red'})
+
+###############################################################################
+
+
+class DownsamplingTest(SimpleTestCase):
+
+    def setUp(self):
+        self.y = [(i * 7919) % 101 for i in range(1000)]
+        self.x = list(range(1000))
+
+    def test_lttb_python(self):
+        indices = downsampling._lttb_python(self.x, self.y, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+        self.assertEqual(indices, sorted(indices))
+
+    @skipIf(downsampling.numpy is None, 'NumPy is not installed.')
+    def test_lttb_numpy(self):
+        self.assertEqual(
+            downsampling._lttb_numpy(self.x, self.y, 50),
+            downsampling._lttb_python(self.x, self.y, 50))
+
+    def test_small_threshold(self):
+        with self.assertRaises(ValueError):
+            downsampling.lttb_indices(self.x, self.y, 2)
+
+    def test_downsample(self):
+        data = {
+            'x': list(range(1000)),
+            'data': [{'title': 'A', 'values': self.y, 'color': 'red'}],
+        }
+        downsampled = downsampling.downsample(data, 100)
+        values = downsampled['data'][0]['values']
+        self.assertEqual(len(values), 100)
+        self.assertEqual(downsampled['data'][0]['color'], 'red')
+        self.assertEqual(
+            values, [self.y[x] for x in downsampled['x']])
+        self.assertEqual(len(data['data'][0]['values']), 1000)
+
+    def test_missing_values(self):
+        y = list(self.y)
+        y[100:200] = [None] * 100
+        y[500] = float('nan')
+        for numpy in (downsampling.numpy, None):
+            with mock.patch('django_c3.downsampling.numpy', numpy):
+                indices = downsampling.lttb_indices(self.x, y, 50)
+                self.assertEqual(len(indices), 50)
+                self.assertFalse(set(indices) & set(range(100, 200)))
+                self.assertNotIn(500, indices)
+
+                downsampled = downsampling.downsample(
+                    {'x': self.x, 'data': [{'title': 'A', 'values': y}]}, 50)
+                values = downsampled['data'][0]['values']
+                self.assertEqual(len(values), 50)
+                # first position of each gap is kept, lines are broken.
+                self.assertIn(100, downsampled['x'])
+                self.assertIn(500, downsampled['x'])
+                self.assertEqual(
+                    len([v for v in values if v is None or v != v]), 2)
+
+    def test_iterator_values(self):
+        def data():
+            return {
+                'x': (i for i in range(100)),
+                'data': [
+                    {'title': 'A', 'values': (i % 7 for i in range(100))}],
+            }
+
+        downsampled = downsampling.downsample(data(), 10)
+        self.assertEqual(len(downsampled['x']), 10)
+        self.assertEqual(
+            downsampled['data'][0]['values'],
+            [x % 7 for x in downsampled['x']])
+        bucketed = downsampling.bucket(data(), 50, 'max')
+        self.assertEqual(bucketed['x'], [0, 50])
+        self.assertEqual(bucketed['data'][0]['values'], [6, 6])
+
+    def test_many_records(self):
+        data = {'x': self.x, 'data': [
+            {'title': str(k), 'values': [(i * k) % 97 for i in self.x]}
+            for k in range(1, 51)
+        ]}
+        downsampled = downsampling.downsample(data, 100)
+        self.assertLessEqual(len(downsampled['x']), 100)
+        for item in downsampled['data']:
+            self.assertEqual(len(item['values']), len(downsampled['x']))
+        self.assertEqual(downsampled['x'][0], 0)
+        self.assertEqual(downsampled['x'][-1], 999)
+
+        data['data'] = data['data'][:2]
+        downsampled = downsampling.downsample(data, 100)
+        self.assertLessEqual(len(downsampled['x']), 100)
+        self.assertGreater(len(downsampled['x']), 50)
+
+    def test_downsample_xy(self):
+        points = list(zip(self.x, self.y))
+        data = {'data': [{'title': 'A', 'values': points}]}
+        downsampled = downsampling.downsample_xy(data, 100)
+        values = downsampled['data'][0]['values']
+        self.assertEqual(len(values), 100)
+        for point in values:
+            self.assertTrue(point in points)
+
+    def test_tag(self):
+        context = Context({'chart': {
+            'data': [{'title': 'A', 'values': self.y}]}})
+        rendered_template = Template(
+            '{% load c3 %}{% line "#chart" chart max_points=10 %}'
+            ).render(context)
+        values = re.search(r'\["A", ([\d,]+)\]', rendered_template).group(1)
+        self.assertEqual(len(values.split(',')), 10)
+
+###############################################################################
+
+
+class BucketTest(SimpleTestCase):
+
+    def setUp(self):
+        self.chart_data = {
+            'x': list(range(1, 11)),
+            'data': [
+                {'title': 'A', 'values': [1, 9, 2, 3, 8, 1, 0, 0, 5, 1]},
+                {'title': 'B', 'values': [1, 2, 3, 4]},
+            ],
+        }
+
+    def test_aggregates(self):
+        expected = {
+            'min': [1, 1, 0, 1],
+            'max': [9, 8, 5, 1],
+            'sum': [12, 12, 5, 1],
+            'mean': [4, 4, 5 / 3, 1],
+            'last': [2, 1, 5, 1],
+        }
+        for aggregate, values in expected.items():
+            bucketed = downsampling.bucket(self.chart_data, 3, aggregate)
+            self.assertEqual(bucketed['data'][0]['values'], values)
+            self.assertEqual(len(bucketed['data'][1]['values']), 2)
+            self.assertEqual(bucketed['x'], [1, 4, 7, 10])
+
+    def test_envelope(self):
+        chart_data = {
+            'x': list(range(9)),
+            'data': [
+                {'title': 'A', 'values': [5, 5, -90, 5, 5, 95, 5, 4, None]},
+                {'title': 'B', 'values': [1, 2]},
+            ],
+        }
+        bucketed = downsampling.bucket(chart_data, 3)
+        # the negative spike survives, min and max are in their order.
+        self.assertEqual(
+            bucketed['data'][0]['values'], [5, -90, 5, 95, 5, 4])
+        self.assertEqual(bucketed['data'][1]['values'], [1, 2])
+        self.assertEqual(bucketed['x'], [0, 0, 3, 3, 6, 6])
+        self.assertEqual(
+            downsampling.bucket(chart_data, 3, 'max')['data'][0]['values'],
+            [5, 95, 5])
+
+    def test_time_width(self):
+        start = datetime.datetime(2017, 5, 19)
+        chart_data = {
+            'x': [start + datetime.timedelta(minutes=7 * i)
+                  for i in range(10)],
+            'data': [{'title': 'A', 'values': list(range(10))}],
+        }
+        bucketed = downsampling.bucket(chart_data, '15m', 'sum')
+        self.assertEqual(bucketed['data'][0]['values'], [3, 7, 11, 15, 9])
+        self.assertEqual(bucketed['x'][1], chart_data['x'][3])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            downsampling.bucket(self.chart_data, 3, 'median')
+        with self.assertRaises(ValueError):
+            downsampling.bucket(self.chart_data, 0)
+        with self.assertRaises(ValueError):
+            downsampling.bucket({'data': []}, '1h')
+        with self.assertRaises(ValueError):
+            downsampling.bucket(
+                dict(self.chart_data, x=[str(i) for i in range(10)]), '15m')
+
+    def test_tag(self):
+        context = Context({'chart': self.chart_data})
+        rendered_template = Template(
+            '{% load c3 %}{% bar "#chart" chart bucket=5 %}'
+            ).render(context)
+        self.assertTrue('["A", 9,5]' in rendered_template)
+        self.assertTrue('["B", 4]' in rendered_template)
+        rendered_template = Template(
+            '{% load c3 %}{% step "#chart" chart bucket=5 %}'
+            ).render(context)
+        self.assertTrue('["A", 1,9,0,5]' in rendered_template)
+        self.assertTrue('["B", 1,4]' in rendered_template)
+
+###############################################################################
+
+
+class QuerySetDataTest(TestCase):
+
+    def setUp(self):
+        User.objects.create(username='a', is_staff=True)
+        User.objects.create(username='b', is_staff=False)
+        User.objects.create(username='c', is_staff=True)
+        self.queryset = User.objects.all()
+
+    def test_values(self):
+        with self.assertNumQueries(1):
+            data = sources.queryset_data(
+                self.queryset, 'username', 'is_staff',
+                titles={'is_staff': 'staff'})
+        self.assertEqual(data['x'], ['a', 'b', 'c'])
+        self.assertEqual(
+            data['data'], [{'title': 'staff', 'values': [True, False, True]}])
+
+    def test_group_by(self):
+        data = sources.queryset_data(
+            self.queryset, 'username', ['is_active'], group_by='is_staff')
+        self.assertEqual(data['x'], ['a', 'b', 'c'])
+        self.assertEqual(data['data'], [
+            {'title': 'True', 'values': [True, None, True]},
+            {'title': 'False', 'values': [None, True, None]},
+        ])
+
+    def test_duplicate_x(self):
+        with self.assertRaises(ValueError):
+            sources.queryset_data(self.queryset, 'is_staff', 'id')
+        data = sources.queryset_data(
+            self.queryset, 'is_staff', 'id', group_by='username')
+        self.assertEqual(data['x'], [False, True])
+        self.assertEqual(
+            [item['title'] for item in data['data']], ['b', 'a', 'c'])
+        self.assertIsNone(data['data'][1]['values'][0])
+
+    def test_aggregate(self):
+        with self.assertNumQueries(1):
+            data = sources.queryset_data(
+                self.queryset, 'is_staff', 'id', aggregate=Count)
+        self.assertEqual(data['x'], [False, True])
+        self.assertEqual(data['data'], [{'title': 'id', 'values': [1, 2]}])
+
+###############################################################################
+
+
+def local_datetime(*args):
+    """Returns a datetime of the current time zone, it's aware if USE_TZ
+        setting is set.
+    """
+    value = datetime.datetime(*args)
+    if settings.USE_TZ:
+        value = timezone.make_aware(value)
+    return value
+
+
+class TimeBucketsTest(TestCase):
+
+    def setUp(self):
+        self.start = local_datetime(2017, 5, 19, 10, 0)
+        for number, minutes in enumerate([0, 5, 20, 50, 100, 200]):
+            User.objects.create(
+                username='user%d' % number,
+                date_joined=self.start + datetime.timedelta(minutes=minutes))
+        self.queryset = User.objects.all()
+
+    def test_minutes(self):
+        with self.assertNumQueries(1):
+            data = sources.time_buckets(
+                self.queryset, 'date_joined', '15m', 'id', Count, fill=0,
+                titles={'id': 'users'})
+        self.assertEqual(len(data['x']), 14)
+        self.assertEqual(data['x'][:3], [
+            '2017-05-19 10:00', '2017-05-19 10:15', '2017-05-19 10:30'])
+        self.assertEqual(data['data'], [{
+            'title': 'users',
+            'values': [2, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1],
+        }])
+
+    def test_start_end(self):
+        data = sources.time_buckets(
+            self.queryset, 'date_joined', 'h', ['id'], Sum,
+            start=self.start - datetime.timedelta(minutes=90),
+            end=self.start + datetime.timedelta(hours=5))
+        self.assertEqual(data['x'][0], '2017-05-19 08:00')
+        self.assertEqual(data['x'][-1], '2017-05-19 15:00')
+        self.assertEqual(
+            data['data'][0]['values'],
+            [None, None, 10, 5, None, 6, None, None])
+
+    @override_settings(USE_TZ=True, TIME_ZONE='UTC')
+    def test_naive_bounds(self):
+        # naive start and end are in the current time zone.
+        data = sources.time_buckets(
+            User.objects.all(), 'date_joined', 'h', 'id', Count,
+            start=datetime.datetime(2017, 5, 19),
+            end=datetime.date(2017, 5, 20))
+        self.assertEqual(data['x'][0], '2017-05-19 00:00')
+        self.assertEqual(data['x'][-1], '2017-05-20 00:00')
+        self.assertEqual(len(data['x']), 25)
+
+    def test_months(self):
+        data = sources.time_buckets(
+            self.queryset, 'date_joined', 'quarter', 'id', Count,
+            end=datetime.date(2017, 12, 1))
+        self.assertEqual(data['x'], ['2017-Q2', '2017-Q3', '2017-Q4'])
+        self.assertEqual(data['data'][0]['values'], [6, None, None])
+        data = sources.time_buckets(
+            self.queryset, 'date_joined', 'w', 'id', Count,
+            label_format='%d/%m')
+        self.assertEqual(data['x'], ['15/05'])
+
+    def test_interval(self):
+        for interval in ('7m', '2d', 'decade', '0h'):
+            with self.assertRaises(ValueError):
+                sources.time_buckets(
+                    self.queryset, 'date_joined', interval, 'id', Count)
+
+###############################################################################
+
+
+class ShopData(AsyncChartDataView):
+    x_is_category = True
+
+    def get_sources(self):
+        users = User.objects.all()
+        return [
+            sources.aqueryset_data(
+                users, 'username', 'id', titles={'id': 'ID'}),
+            sources.aqueryset_data(
+                users.filter(is_staff=True), 'username', 'is_staff'),
+        ]
+
+
+# queries of aqueryset_data run in other threads (and connections), they
+#   don't see data of the transaction of TestCase.
+class AsyncDataTest(TransactionTestCase):
+
+    def setUp(self):
+        self.ids = [
+            User.objects.create(username='a', is_staff=True).id,
+            User.objects.create(username='b', is_staff=False).id,
+            User.objects.create(username='c', is_staff=True).id,
+        ]
+
+    @skipIf(not ASYNC_VIEWS, 'Async class-based views need Django 4.1+.')
+    @override_settings(ROOT_URLCONF='django_c3.tests')
+    def test_view(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        async def get():
+            # a request through the ASGI handler of the test client.
+            return await AsyncClient().get('/chart/shop/')
+
+        response = async_to_sync(get)()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {
+            'ID': self.ids,
+            'is_staff': [True, None, True],
+            serialization.X_LABELS_NAME: ['a', 'b', 'c'],
+        })
+        self.assertTrue(response.has_header('ETag'))
+
+    @skipIf(ASYNC_VIEWS, 'Async class-based views need Django 4.1+.')
+    def test_old_django(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ShopData.as_view()
+
+    def test_concurrent(self):
+        from asgiref.sync import async_to_sync
+        # each source waits for all of them, it fails if they run one
+        #   after another.
+        barrier = threading.Barrier(3, timeout=5)
+
+        def queryset_data(queryset, x, values, *args):
+            barrier.wait()
+            return {'x': [1], 'data': [{'title': values, 'values': [1]}]}
+
+        async def gather():
+            return await asyncio.gather(*[
+                sources.aqueryset_data(User.objects.all(), 'id', title)
+                for title in ('A', 'B', 'C')
+            ])
+
+        with mock.patch('django_c3.sources.queryset_data', queryset_data):
+            data = async_to_sync(gather)()
+        self.assertEqual([item['data'][0]['title'] for item in data],
+                         ['A', 'B', 'C'])
+
+    def test_merge(self):
+        self.assertEqual(sources.merge_data([
+            {'x': [1, 2], 'data': [{'title': 'A', 'values': [5, 6]}]},
+            {'x': [1, 2], 'data': [{'title': 'B', 'values': [7, 8]}]},
+        ]), {'x': [1, 2], 'data': [
+            {'title': 'A', 'values': [5, 6]},
+            {'title': 'B', 'values': [7, 8]},
+        ]})
+        self.assertEqual(sources.merge_data([
+            {'x': [1, 3], 'data': [{'title': 'A', 'values': [5, 6]}]},
+            {'x': [2, 3], 'data': [{'title': 'B', 'values': [7, 8],
+                                    'color': 'red'}]},
+        ]), {'x': [1, 2, 3], 'data': [
+            {'title': 'A', 'values': [5, None, 6]},
+            {'title': 'B', 'values': [None, 7, 8], 'color': 'red'},
+        ]})
+        self.assertEqual(
+            sources.merge_data([{'data': [{'title': 'A', 'values': [1]}]}]),
+            {'data': [{'title': 'A', 'values': [1]}]})
+        with self.assertRaises(ValueError):
+            sources.merge_data([{'x': [1], 'data': []}, {'data': []}])
+
+###############################################################################
+
+
+def hourly_users(since):
+    queryset = User.objects.all()
+    if since is not None:
+        since = sources.bucket_start(since, 'h')
+        queryset = queryset.filter(date_joined__gte=since)
+    return sources.time_buckets(
+        queryset, 'date_joined', 'h', 'id', Count, titles={'id': 'users'},
+        start=since, fill=0)
+
+
+@override_settings(C3_SNAPSHOTS={
+    'users': 'django_c3.tests.hourly_users',
+    'recent-users': {'function': 'django_c3.tests.hourly_users', 'keep': 2},
+})
+class SnapshotTest(TestCase):
+
+    def setUp(self):
+        self.start = local_datetime(2017, 5, 19, 10, 0)
+        for minutes in (0, 5, 70, 130):
+            self.add_user(minutes)
+
+    def add_user(self, minutes):
+        User.objects.create(
+            username='user%d' % User.objects.count(),
+            date_joined=self.start + datetime.timedelta(minutes=minutes))
+
+    def test_refresh(self):
+        before = timezone.now()
+        snapshot = ChartSnapshot.refresh('users', hourly_users)
+        self.assertGreaterEqual(snapshot.watermark, before)
+        self.assertLessEqual(snapshot.watermark, timezone.now())
+        self.assertEqual(snapshot.get_data(), {
+            'x': ['2017-05-19 10:00', '2017-05-19 11:00', '2017-05-19 12:00'],
+            'data': [{'title': 'users', 'values': [2, 1, 1]}],
+        })
+
+        # the tail since watermark is computed again, its first bucket is
+        #   replaced and new buckets are appended.
+        ChartSnapshot.objects.filter(name='users').update(
+            watermark=self.start + datetime.timedelta(minutes=140))
+        self.add_user(0)
+        self.add_user(150)
+        self.add_user(250)
+        with mock.patch('django_c3.tests.hourly_users',
+                        wraps=hourly_users) as compute:
+            ChartSnapshot.refresh('users', compute)
+        compute.assert_called_once_with(
+            self.start + datetime.timedelta(minutes=140))
+        with self.assertNumQueries(1):
+            data = ChartSnapshot.load('users')
+        self.assertEqual(data, {
+            'x': ['2017-05-19 10:00', '2017-05-19 11:00', '2017-05-19 12:00',
+                  '2017-05-19 13:00', '2017-05-19 14:00'],
+            'data': [{'title': 'users', 'values': [2, 1, 2, 0, 1]}],
+        })
+
+        snapshot = ChartSnapshot.refresh('users', hourly_users, full=True)
+        self.assertEqual(
+            snapshot.get_data()['data'][0]['values'], [3, 1, 2, 0, 1])
+
+    @override_settings(USE_TZ=True)
+    def test_aware_watermark(self):
+        ChartSnapshot.refresh('users', hourly_users)
+        watermark = ChartSnapshot.objects.get(name='users').watermark
+        self.assertTrue(timezone.is_aware(watermark))
+        with mock.patch('django_c3.tests.hourly_users',
+                        wraps=hourly_users) as compute:
+            ChartSnapshot.refresh('users', compute)
+        self.assertTrue(timezone.is_aware(compute.call_args[0][0]))
+
+    def test_append(self):
+        data = {
+            'x': [1, 2], 'horizontal_lines': [5],
+            'data': [{'title': 'A', 'values': [5, 6], 'color': 'red'}],
+        }
+        tail = {'x': [2, 3], 'data': [
+            {'title': 'A', 'values': [7, 8]},
+            {'title': 'B', 'values': [1, 2]},
+        ]}
+        self.assertEqual(sources.append_data(data, tail), {
+            'x': [1, 2, 3], 'horizontal_lines': [5],
+            'data': [
+                {'title': 'A', 'values': [5, 7, 8], 'color': 'red'},
+                {'title': 'B', 'values': [None, 1, 2]},
+            ]})
+        self.assertEqual(data['data'][0]['values'], [5, 6])
+        self.assertEqual(sources.append_data(data, tail, keep=1), {
+            'x': [3], 'horizontal_lines': [5],
+            'data': [
+                {'title': 'A', 'values': [8], 'color': 'red'},
+                {'title': 'B', 'values': [2]},
+            ]})
+        with self.assertRaises(ValueError):
+            sources.append_data({'data': []}, tail)
+
+    def test_bucket_start(self):
+        self.assertEqual(
+            sources.bucket_start(
+                datetime.datetime(2017, 5, 19, 10, 41), '15m'),
+            datetime.datetime(2017, 5, 19, 10, 30))
+        self.assertEqual(
+            sources.bucket_start(datetime.date(2017, 5, 19), 'month'),
+            datetime.date(2017, 5, 1))
+
+    def test_tag(self):
+        ChartSnapshot.refresh('users', hourly_users)
+        template = Template(
+            "{% load c3 %}{% c3_snapshot 'users' as data %}"
+            "{% line '#chart' data x_is_category=True %}")
+        output = template.render(Context())
+        self.assertIn("'2017-05-19 11:00'", output)
+        self.assertIn('["users", 2,1,1]', output)
+        with self.assertRaises(ChartSnapshot.DoesNotExist):
+            Template(
+                "{% load c3 %}{% c3_snapshot 'missing' as data %}"
+            ).render(Context())
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('c3_refresh_snapshots', stdout=output)
+        self.assertIn('Refreshed 2 snapshots.', output.getvalue())
+        self.assertEqual(
+            ChartSnapshot.load('recent-users')['x'],
+            ['2017-05-19 11:00', '2017-05-19 12:00'])
+        self.assertEqual(len(ChartSnapshot.load('users')['x']), 3)
+        with self.assertRaises(CommandError):
+            call_command('c3_refresh_snapshots', 'missing')
+
+###############################################################################
+
+
+@skipIf(adapters.pandas is None, 'pandas is not installed.')
+class AdaptersTest(SimpleTestCase):
+
+    def test_array_values(self):
+        numpy = adapters.numpy
+        self.assertEqual(
+            serialization.values(numpy.array([26, 5, -52])), '26,5,-52')
+        self.assertEqual(
+            serialization.values(numpy.array([0.5, numpy.nan, 1e20])),
+            '0.5,null,1e+20')
+        self.assertEqual(
+            serialization.values(numpy.array([True, False])), '1,0')
+        self.assertEqual(serialization.values(numpy.array([])), '')
+
+    def test_data_frame(self):
+        data_frame = adapters.pandas.DataFrame(
+            {'A': [26, 5, 52], 'B': [1.5, 2.5, 3.5]},
+            index=['2017-5-19', '2017-5-20', '2017-5-21'])
+        context = Context({'chart': data_frame})
+        rendered_template = Template(
+            '{% load c3 %}{% bar "#chart" chart x_is_category=True %}'
+            ).render(context)
+        self.assertTrue('["A", 26,5,52]' in rendered_template)
+        self.assertTrue('["B", 1.5,2.5,3.5]' in rendered_template)
+        self.assertTrue("'2017-5-19','2017-5-20'" in rendered_template)
+
+    def test_series_values(self):
+        context = Context({'chart': {'data': [
+            {'title': 'A', 'values': adapters.pandas.Series([1, 2, 3])}]}})
+        rendered_template = Template(
+            '{% load c3 %}{% line "#chart" chart as_json=True %}'
+            ).render(context)
+        self.assertTrue('["A",1,2,3]' in rendered_template)
+
+    def test_line_xy(self):
+        data_frame = adapters.pandas.DataFrame(
+            {'A': [2, 4, 6]}, index=[1, 2, 3])
+        context = Context({'chart': data_frame})
+        rendered_template = Template(
+            '{% load c3 %}{% line_xy "#chart" chart max_points=3 %}'
+            ).render(context)
+        self.assertTrue('["A", 2,4,6]' in rendered_template)
+        self.assertTrue('["A_x", 1,2,3]' in rendered_template)
+
+###############################################################################
+
+
+@override_settings(
+    C3_CACHE={'ALIAS': 'c3', 'TIMEOUT': 60},
+    CACHES={'c3': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheTest(SimpleTestCase):
+
+    def setUp(self):
+        caches['c3'].clear()
+        cache.reset_cache_info()
+        self.template = Template(
+            '{% load c3 %}{% pie "#chart" chart "title" %}')
+        self.chart_data = [
+            {'title': 'A', 'value': 6},
+            {'title': 'B', 'value': 10},
+        ]
+
+    def test_hits(self):
+        first = self.template.render(Context({'chart': self.chart_data}))
+        second = self.template.render(Context({'chart': self.chart_data}))
+        self.assertEqual(first, second)
+        self.assertTrue('<script' in second)
+        self.assertEqual(cache.cache_info(), {'hits': 1, 'misses': 1})
+
+    def test_data_changes(self):
+        self.template.render(Context({'chart': self.chart_data}))
+        self.chart_data[0]['value'] = 7
+        rendered_template = self.template.render(
+            Context({'chart': self.chart_data}))
+        self.assertTrue('["A", 7]' in rendered_template)
+        self.assertEqual(cache.cache_info(), {'hits': 0, 'misses': 2})
+
+    def test_arguments_change(self):
+        self.template.render(Context({'chart': self.chart_data}))
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#chart" chart "other" %}'
+            ).render(Context({'chart': self.chart_data}))
+        self.assertTrue('title: { text: "other"}' in rendered_template)
+        self.assertEqual(cache.cache_info(), {'hits': 0, 'misses': 2})
+
+    @override_settings(C3_CACHE=None)
+    def test_disabled(self):
+        self.template.render(Context({'chart': self.chart_data}))
+        self.assertEqual(cache.cache_info(), {'hits': 0, 'misses': 0})
+
+###############################################################################
+
+
+class SalesData(ChartDataView):
+    chart_type = 'bar'
+    x_is_category = True
+
+    def get_data(self):
+        return {
+            'x': ['2017-5-19', '2017-5-20'],
+            'data': [
+                {'title': 'A', 'values': [26, 35]},
+                {'title': 'B', 'values': [54, 25]},
+            ],
+        }
+
+    def get_last_modified(self):
+        return datetime.datetime(2017, 5, 20)
+
+
+class DataURLTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_tag(self):
+        context = Context({'chart': {
+            'x': [],
+            'data': [{'title': 'A', 'color': 'red'}, {'title': 'B'}],
+            'groups': [('A', 'B')],
+        }})
+        rendered_template = Template(
+            '{% load c3 %}{% bar "#chart" chart x_is_category=True '
+            'data_url="/chart/sales/" %}').render(context)
+        self.assertTrue(
+            'chart.load({url: "/chart/sales/", mimeType: "json"});' in
+            rendered_template)
+        config = json.loads(
+            re.search(r'c3\.generate\((.*)\);', rendered_template).group(1))
+        self.assertEqual(
+            config['data']['columns'],
+            [['A'], ['B'], [serialization.X_LABELS_NAME]])
+        self.assertEqual(config['data']['colors'], {'A': 'red'})
+
+    def test_view(self):
+        response = SalesData.as_view()(self.factory.get('/chart/sales/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {
+            'A': [26, 35],
+            'B': [54, 25],
+            serialization.X_LABELS_NAME: ['2017-5-19', '2017-5-20'],
+        })
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = SalesData.as_view()(self.factory.get(
+            '/chart/sales/', HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(C3_JSON_ENCODER='json')
+    def test_view_not_finite(self):
+        class GapData(SalesData):
+            def get_data(self):
+                return {'data': [
+                    {'title': 'A', 'values': [1.5, float('nan')]},
+                    {'title': 'B', 'values': [float('-inf'), 2]},
+                ]}
+
+        response = GapData.as_view()(self.factory.get('/chart/sales/'))
+        self.assertEqual(
+            response.content, b'{"A":[1.5,null],"B":[null,2]}')
+
+    @override_settings(C3_JSON_ENCODER=lambda obj: '"custom"')
+    def test_view_encoder(self):
+        response = SalesData.as_view()(self.factory.get('/chart/sales/'))
+        self.assertEqual(response.content, b'"custom"')
+
+    def test_view_last_modified(self):
+        response = SalesData.as_view()(self.factory.get(
+            '/chart/sales/',
+            HTTP_IF_MODIFIED_SINCE='Sat, 20 May 2017 00:00:00 GMT'))
+        self.assertEqual(response.status_code, 304)
+
+###############################################################################
+
+
+class ViewportTest(SimpleTestCase):
+
+    def setUp(self):
+        self.context = Context({'chart': [
+            {'title': 'A', 'value': 6},
+            {'title': 'B', 'value': 10},
+        ]})
+
+    def test_viewport(self):
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#chart" chart viewport=True %}'
+            ).render(self.context)
+        self.assertTrue('django_c3/js/django-c3.js' in rendered_template)
+        self.assertRegex(
+            rendered_template,
+            r'(?s)djangoC3\.whenVisible\("#chart", function \(\) {\s+'
+            r'var chart = c3\.generate\({.*return chart;\s+}, false\);\s+'
+            r'</script>$')
+
+    def test_destroy_hidden(self):
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#chart" chart as_json=True viewport=True '
+            'destroy_hidden=True %}').render(self.context)
+        self.assertRegex(
+            rendered_template,
+            r'djangoC3\.whenVisible\("#chart", function \(\) {\s+'
+            r'var chart = c3\.generate\({.*}\);\s+return chart;\s+}, true\);')
+
+    def test_default(self):
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#chart" chart %}').render(self.context)
+        self.assertFalse('whenVisible' in rendered_template)
+
+###############################################################################
+
+
+class SalesStream(ChartStreamView):
+    interval = 0
+    timeout = 0
+
+    def get_points(self, cursor):
+        if cursor == '2':
+            return None, cursor
+        return {
+            'x': ['2017-5-21'],
+            'data': [
+                {'title': 'A', 'values': [40]},
+                {'title': 'B', 'values': [12]},
+            ],
+        }, 2
+
+
+class StreamTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_tag(self):
+        context = Context({'chart': {
+            'x': ['2017-5-19', '2017-5-20'],
+            'data': [{'title': 'A', 'values': [26, 35]}],
+        }})
+        rendered_template = Template(
+            '{% load c3 %}{% line "#chart" chart x_is_category=True '
+            'viewport=True stream_url="/chart/stream/" %}').render(context)
+        self.assertRegex(
+            rendered_template,
+            r'(?s)whenVisible\("#chart", function \(\) {.*'
+            r'djangoC3\.stream\(chart, "/chart/stream/"\);\s+'
+            r'return chart;')
+
+    def test_view(self):
+        response = SalesStream.as_view()(self.factory.get('/chart/stream/'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        event = content.split('\n\n')[1].split('\n')
+        self.assertEqual(event[0], 'id: 2')
+        self.assertEqual(json.loads(event[1][len('data: '):]), {'columns': [
+            ['A', 40], ['B', 12],
+            [serialization.X_LABELS_NAME, '2017-5-21'],
+        ]})
+
+    def test_async_events(self):
+        from asgiref.sync import async_to_sync
+
+        class AsyncSalesStream(SalesStream):
+            async def get_points(self, cursor):
+                return SalesStream.get_points(self, cursor)
+
+        async def read(view):
+            return [event async for event in view.aevents(None)]
+
+        for view in (SalesStream(), AsyncSalesStream()):
+            events = async_to_sync(read)(view)
+            self.assertEqual(events[0], 'retry: 1000\n\n')
+            self.assertTrue(events[1].startswith('id: 2\ndata: '))
+
+    @skipIf(not ASYNC_STREAMING, 'Async streaming needs Django 4.2+.')
+    @override_settings(ROOT_URLCONF='django_c3.tests')
+    def test_asgi(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        async def get():
+            # a request through the ASGI handler of the test client.
+            response = await AsyncClient().get(
+                '/chart/stream/', HTTP_LAST_EVENT_ID='1')
+            return response, [
+                chunk async for chunk in response.streaming_content]
+
+        response, chunks = async_to_sync(get)()
+        # events are sent by the async generator, not by the sync one.
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(chunks[0], b'retry: 1000\n\n')
+        self.assertTrue(chunks[1].startswith(b'id: 2\ndata: '))
+
+    @skipIf(adapters.pandas is None, 'pandas is not installed.')
+    def test_dataframe(self):
+        class FrameStream(SalesStream):
+            def get_points(self, cursor):
+                return adapters.pandas.DataFrame({'A': [40]}), 2
+
+        content = b''.join(FrameStream.as_view()(
+            self.factory.get('/chart/stream/')).streaming_content)
+        self.assertIn(b'"A",40', content.replace(b' ', b''))
+
+    def test_view_last_event_id(self):
+        response = SalesStream.as_view()(self.factory.get(
+            '/chart/stream/', HTTP_LAST_EVENT_ID='2'))
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.endswith(': keep-alive\n\n'))
+
+###############################################################################
+
+
+class AssetsTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.chart = [
+            {'title': 'A', 'value': 6},
+            {'title': 'B', 'value': 10},
+        ]
+
+    def test_include_and_with(self):
+        rendered_template = Template(
+            '{% load c3 %}{% with name="#a" %}{% pie name chart %}'
+            '{% endwith %}{% include template %}{% pie "#c" chart %}'
+            ).render(Context({
+                'chart': self.chart,
+                'template': Template(
+                    '{% load c3 %}{% pie "#b" chart %}'),
+            }))
+        self.assertEqual(rendered_template.count('c3.min.js'), 1)
+        self.assertEqual(rendered_template.count('c3.generate('), 3)
+
+    def test_request(self):
+        request = self.factory.get('/')
+        template = Template('{% load c3 %}{% pie "#chart" chart %}')
+        first = template.render(RequestContext(request, {'chart': self.chart}))
+        second = template.render(
+            RequestContext(request, {'chart': self.chart}))
+        self.assertTrue('c3.min.js' in first)
+        self.assertFalse('c3.min.js' in second)
+
+    def test_tag(self):
+        rendered_template = Template(
+            '{% load c3 %}{% c3_assets %}{% pie "#chart" chart %}'
+            '{% c3_assets %}').render(Context({'chart': self.chart}))
+        self.assertEqual(rendered_template.count('c3.min.js'), 1)
+        self.assertTrue(rendered_template.startswith('<link'))
+        self.assertFalse('DOMContentLoaded' in rendered_template)
+
+    def test_tag_defer(self):
+        rendered_template = Template(
+            '{% load c3 %}{% c3_assets defer=True %}{% pie "#chart" chart %}'
+            ).render(Context({'chart': self.chart}))
+        self.assertRegex(
+            rendered_template, r'c3\.min\.js" integrity="[^"]+" '
+            r'crossorigin="anonymous" defer></script>')
+        self.assertTrue(
+            'document.addEventListener("DOMContentLoaded", create);'
+            in rendered_template)
+        # fragments that are inserted after the page is parsed create
+        #   their charts at once.
+        self.assertRegex(
+            rendered_template,
+            r'if \(document\.readyState === "loading"\) {\s+'
+            r'document\.addEventListener\("DOMContentLoaded", create\);\s+'
+            r'} else {\s+create\(\);')
+
+    def _middleware_response(self, request, body):
+        def view(request):
+            return HttpResponse(Template(
+                '{% load c3 %}<html><head></head><body>' + body +
+                '</body></html>').render(RequestContext(
+                    request, {'chart': self.chart})))
+        return C3AssetsMiddleware(view)(request)
+
+    def test_middleware(self):
+        response = self._middleware_response(
+            self.factory.get('/'), '{% pie "#a" chart %}{% pie "#b" chart %}')
+        content = response.content.decode('utf-8')
+        self.assertEqual(content.count('c3.min.js'), 1)
+        self.assertTrue(content.index('c3.min.js') < content.index('</head>'))
+        self.assertEqual(content.count('DOMContentLoaded'), 2)
+
+    def test_middleware_body(self):
+        with self.settings(C3_ASSETS_POSITION='body'):
+            response = self._middleware_response(
+                self.factory.get('/'), '{% pie "#a" chart %}')
+        content = response.content.decode('utf-8')
+        self.assertRegex(
+            content, r'django-c3\.js"[^>]* defer></script>\n</body>')
+
+    def test_middleware_without_chart(self):
+        response = self._middleware_response(self.factory.get('/'), '')
+        self.assertFalse('c3.min.js' in response.content.decode('utf-8'))
+
+    def test_middleware_with_tag(self):
+        response = self._middleware_response(
+            self.factory.get('/'), '{% c3_assets %}{% pie "#a" chart %}')
+        self.assertEqual(
+            response.content.decode('utf-8').count('c3.min.js'), 1)
+
+###############################################################################
+
+
+@mock.patch.object(c3_tags, 'collect_charts', True)
+class RenderAllTest(SimpleTestCase):
+
+    def setUp(self):
+        self.context = Context({'chart': [
+            {'title': 'A', 'value': 6},
+            {'title': 'B', 'value': 10},
+        ]})
+
+    def test_render_all(self):
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#a" chart %}<div></div>'
+            '{% donut "#b" chart viewport=True %}{% c3_render_all %}'
+            ).render(self.context)
+        self.assertEqual(rendered_template.count('c3.min.js'), 1)
+        self.assertEqual(
+            rendered_template.count('<script type="text/javascript">'), 1)
+        self.assertRegex(
+            rendered_template,
+            r'(?s)<div></div>\s+<script type="text/javascript">\s+'
+            r'djangoC3\.renderAll\(\[\s+'
+            r'\["#a", function \(\) {\s+var chart = c3\.generate\(.*'
+            r'return chart;\s+}, false, false\],\s+'
+            r'\["#b", function \(\) {.*}, true, false\]\s+\]\);')
+
+    def test_empty(self):
+        rendered_template = Template(
+            '{% load c3 %}{% c3_render_all %}').render(self.context)
+        self.assertEqual(rendered_template, '')
+
+    def test_once(self):
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#a" chart %}{% c3_render_all %}'
+            '{% c3_render_all %}').render(self.context)
+        self.assertEqual(rendered_template.count('renderAll'), 1)
+
+###############################################################################
+
+
+class BundleTest(SimpleTestCase):
+
+    def setUp(self):
+        self.output = tempfile.TemporaryDirectory()
+        call_command(
+            'c3_bundle', output=self.output.name, stdout=io.StringIO())
+        self.manifest_path = os.path.join(
+            self.output.name, assets.MANIFEST_NAME)
+
+    def tearDown(self):
+        self.output.cleanup()
+
+    def test_files(self):
+        with open(self.manifest_path) as manifest:
+            manifest = json.load(manifest)
+        self.assertRegex(manifest['js'], r'^django_c3/dist/c3\.\w{12}\.js$')
+        path = os.path.join(
+            self.output.name, os.path.basename(manifest['js']))
+        with open(path, 'rb') as bundle:
+            content = bundle.read()
+        with open(path + '.gz', 'rb') as bundle:
+            self.assertEqual(gzip.decompress(bundle.read()), content)
+        self.assertTrue(b'var djangoC3' in content)
+        self.assertTrue(content.index(b'd3') < content.index(b'djangoC3'))
+
+    def test_import(self):
+        with self.settings(C3_BUNDLE=self.manifest_path):
+            html = assets.import_html(defer=True)
+        self.assertEqual(html.count('<script'), 1)
+        self.assertRegex(html, r'/static/django_c3/dist/c3\.\w{12}\.css"')
+        self.assertRegex(
+            html, r'/static/django_c3/dist/c3\.\w{12}\.js" defer>')
+
+###############################################################################
+
+
+class PreloadTest(SimpleTestCase):
+
+    def test_integrity(self):
+        with open(finders.find('django_c3/js/c3.min.js'), 'rb') as c3_file:
+            digest = hashlib.sha384(c3_file.read()).digest()
+        html = assets.import_html()
+        self.assertTrue(
+            'c3.min.js" integrity="sha384-%s" crossorigin="anonymous">' %
+            base64.b64encode(digest).decode('ascii') in html)
+
+    def test_memoized(self):
+        self.assertIs(assets.c3_files(), assets.c3_files())
+
+    def test_tag(self):
+        rendered_template = Template(
+            '{% load c3 %}{% c3_preload %}').render(Context())
+        self.assertEqual(rendered_template.count('rel="preload"'), 4)
+        self.assertRegex(
+            rendered_template,
+            r'<link rel="preload" href="/static/django_c3/css/c3\.min\.css" '
+            r'as="style" integrity="sha384-[^"]+" crossorigin="anonymous"/>')
+        self.assertRegex(
+            rendered_template,
+            r'href="/static/django_c3/js/d3\.v3\.min\.js" as="script" ')
+
+###############################################################################
+
+
+def decode_binary(content):
+    """Decodes binary format of django_c3.binary, like djangoC3.binaryColumns.
+    """
+    length = struct.unpack('<I', content[:4])[0]
+    header = json.loads(content[4:4 + length].decode('utf-8'))
+    size = 4 if header['dtype'] == 'f4' else 8
+    offset = 4 + length
+    columns = dict()
+    for name, count in header['columns']:
+        values = struct.unpack_from(
+            '<%d%s' % (count, 'f' if size == 4 else 'd'), content, offset)
+        columns[name] = [None if v != v else v for v in values]
+        offset += count * size + (-count * size) % 8
+    columns.update(header['labels'])
+    return columns
+
+
+class BinaryTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_encode(self):
+        content = b''.join(binary.encode({
+            'A': [26, None, 35.5],
+            serialization.X_LABELS_NAME: ['a', 'b', 'c'],
+        }, 'f4'))
+        self.assertEqual(struct.unpack('<I', content[:4])[0] % 8, 4)
+        self.assertEqual(decode_binary(content), {
+            'A': [26, None, 35.5],
+            serialization.X_LABELS_NAME: ['a', 'b', 'c'],
+        })
+
+    def test_bad_dtype(self):
+        with self.assertRaises(ValueError):
+            binary.encode({'A': [1]}, 'i4')
+
+    @skipIf(adapters.numpy is None, 'NumPy is not installed.')
+    def test_no_copy(self):
+        values = adapters.numpy.arange(10, dtype='<f8')
+        buffer = binary.column_buffer(values, 'f8')
+        values[0] = 5
+        self.assertEqual(struct.unpack_from('<d', buffer)[0], 5)
+
+    def test_view(self):
+        response = SalesData.as_view()(self.factory.get(
+            '/chart/sales/', {'format': 'f8'}))
+        self.assertEqual(response['Content-Type'], binary.CONTENT_TYPE)
+        self.assertEqual(decode_binary(response.content), {
+            'A': [26, 35],
+            'B': [54, 25],
+            serialization.X_LABELS_NAME: ['2017-5-19', '2017-5-20'],
+        })
+
+    def test_tag(self):
+        context = Context({'chart': {
+            'x': [],
+            'data': [{'title': 'A'}],
+        }})
+        rendered_template = Template(
+            '{% load c3 %}{% line "#chart" chart x_is_category=True '
+            'data_url="/chart/?id=1" data_format="f4" %}').render(context)
+        self.assertTrue(
+            'djangoC3.loadBinary(chart, "/chart/?id=1\\u0026format=f4");' in
+            rendered_template)
+
+###############################################################################
+
+
+class StreamingRenderTest(SimpleTestCase):
+
+    def setUp(self):
+        self.data = {
+            'x': ['2017-5-19', '2017-5-20', '2017-5-21'],
+            'data': [
+                {'title': 'A', 'values': [26, 35, 52], 'color': 'red'},
+                {'title': 'B', 'values': [54, 25, None]},
+            ],
+            'groups': [('A', 'B')],
+        }
+
+    def lazy_data(self):
+        data = dict(self.data)
+        data['x'] = iter(self.data['x'])
+        data['data'] = (
+            dict(item, values=iter(item['values']))
+            for item in self.data['data'])
+        return data
+
+    def render(self, data, arguments=''):
+        return Template(
+            '{% load c3 %}{% bar "#chart" chart x_is_category=True '
+            'as_json=True ' + arguments + '%}').render(
+                Context({'chart': data}))
+
+    def test_tag(self):
+        self.assertEqual(
+            self.render(self.lazy_data()), self.render(self.data))
+
+    def test_tag_legacy(self):
+        rendered_template = Template(
+            '{% load c3 %}{% line "#chart" chart x_is_category=True %}'
+            ).render(Context({'chart': self.lazy_data()}))
+        config = json.loads(
+            re.search(r'c3\.generate\((.*)\);', rendered_template).group(1))
+        self.assertEqual(config['data']['colors'], {'A': 'red'})
+        self.assertEqual(config['data']['columns'][1], ['B', 54, 25, None])
+
+    def test_bucket(self):
+        self.assertEqual(
+            self.render(self.lazy_data(), 'bucket=2 '),
+            self.render(self.data, 'bucket=2 '))
+
+    def test_stream_chart(self):
+        read = list()
+
+        def values():
+            for value in range(5000):
+                read.append(value)
+                yield value
+
+        chunks = stream_chart(
+            'line', '#chart',
+            {'data': iter([{'title': 'A', 'values': values()}])})
+        self.assertEqual(read, [])
+        first = next(chunks)
+        self.assertTrue(first.startswith(serialization.SCRIPT_START))
+        rest = list(chunks)
+        self.assertEqual(len(read), 5000)
+        self.assertTrue(len(rest) > 5)
+        config = json.loads(re.search(
+            r'c3\.generate\((.*)\);', first + ''.join(rest)).group(1))
+        self.assertEqual(
+            config['data']['columns'], [['A'] + list(range(5000))])
+
+    def test_stream_chart_groups(self):
+        data = self.lazy_data()
+        data['groups'] = [('A', 'C')]
+        with self.assertRaises(ValueError):
+            ''.join(stream_chart('step', '#chart', data, x_is_category=True))
+
+###############################################################################
+
+
+class BenchmarkTest(SimpleTestCase):
+
+    def test_run_tags(self):
+        results = benchmark.run_tags(points=(10, 100), series=(1, 5), repeat=1)
+        self.assertEqual(len(results), 4 * 4 + 2 * 2)
+        result = results['line/100/5/js']
+        self.assertTrue(result['time'] > 0)
+        self.assertTrue(result['peak_memory'] > 0)
+        self.assertTrue(result['bytes'] > 0)
+
+    def test_compare(self):
+        baseline = {'bar/10/1/js': {
+            'time': 0.001, 'peak_memory': 1000, 'bytes': 900}}
+        self.assertEqual(benchmark.compare({'bar/10/1/js': {
+            'time': 0.0011, 'peak_memory': 1000, 'bytes': 900}}, baseline),
+            [])
+        self.assertEqual(len(benchmark.compare({'bar/10/1/js': {
+            'time': 0.003, 'peak_memory': 100000, 'bytes': 901}}, baseline)),
+            3)
+
+###############################################################################
+
+
+class InstrumentationTest(SimpleTestCase):
+
+    def setUp(self):
+        self.renders = list()
+        chart_rendered.connect(self.receiver)
+        self.context = Context({'chart': {
+            'x': ['2017-5-19', '2017-5-20'],
+            'data': [
+                {'title': 'A', 'values': [26, 35]},
+                {'title': 'B', 'values': [54, 25]},
+            ],
+        }})
+
+    def tearDown(self):
+        chart_rendered.disconnect(self.receiver)
+
+    def receiver(self, sender, **kwargs):
+        self.renders.append(dict(kwargs, tag=sender))
+
+    def test_signal(self):
+        rendered_template = Template(
+            '{% load c3 %}{% bar "#chart" chart x_is_category=True %}'
+            ).render(self.context)
+        self.assertEqual(len(self.renders), 1)
+        render = self.renders[0]
+        self.assertEqual(render['tag'], 'bar')
+        self.assertEqual(render['bind_to'], '#chart')
+        self.assertEqual(render['series'], 2)
+        self.assertEqual(render['points'], 4)
+        self.assertEqual(render['bytes'], len(rendered_template))
+        self.assertTrue(render['time'] > 0)
+
+    def test_data_size(self):
+        self.assertEqual(
+            instrumentation.data_size([{'title': 'A', 'value': 1}]), (1, 1))
+        self.assertEqual(instrumentation.data_size(
+            {'data': iter([])}), (None, None))
+        self.assertEqual(instrumentation.data_size(
+            {'data': [{'title': 'A', 'values': iter([1])}]}), (1, None))
+
+    def test_statsd(self):
+        client = mock.Mock()
+        instrumentation.statsd_receiver(client)(
+            sender='line', bind_to='#chart', time=0.002, series=1,
+            points=10, bytes=100)
+        client.timing.assert_called_once_with('c3.line.time', 2.0)
+        client.incr.assert_any_call('c3.line.renders')
+        client.incr.assert_any_call('c3.line.points', 10)
+        client.incr.assert_any_call('c3.line.bytes', 100)
+
+    def test_log(self):
+        with self.assertLogs('django_c3', 'DEBUG') as logs:
+            instrumentation.log_render(
+                sender='pie', bind_to='#chart', time=0.001, series=2,
+                points=2, bytes=300)
+        self.assertEqual(logs.output, [
+            'DEBUG:django_c3:pie #chart: 1.00 ms, 2 series, 2 points, '
+            '300 bytes'])
+
+###############################################################################
+
+
+class RenderersTest(SimpleTestCase):
+
+    def setUp(self):
+        self.skeleton = renderers.Skeleton(
+            '{bindto: "%(bind_to)s", legend: %(legend)s, '
+            'height: %(height)s, title: "%(title)s"}',
+            options={'legend': renderers.js_bool,
+                     'height': renderers.js_number})
+
+    def test_render(self):
+        self.assertEqual(self.skeleton.slots, ('bind_to', 'title'))
+        self.assertEqual(
+            self.skeleton.render((True, None), ('#chart', '100%')),
+            '{bindto: "#chart", legend: true, height: null, title: "100%"}')
+        self.assertEqual(
+            self.skeleton.render(('', '200'), ('#c', '%s')),
+            '{bindto: "#c", legend: false, height: 200, title: "%s"}')
+
+    def test_cache(self):
+        self.skeleton.render((True, None), ('#a', ''))
+        self.skeleton.render((True, None), ('#b', ''))
+        self.skeleton.render((False, 100), ('#c', ''))
+        self.assertEqual(len(self.skeleton._formats), 2)
+        # unhashable options are compiled each time.
+        self.assertEqual(
+            self.skeleton.render(([1], 5), ('#d', '')),
+            '{bindto: "#d", legend: true, height: 5, title: ""}')
+        self.assertEqual(len(self.skeleton._formats), 2)
+
+    def test_unknown_option(self):
+        with self.assertRaises(ValueError):
+            renderers.Skeleton('%(a)s', options={'b': renderers.js_bool})
+
+###############################################################################
+
+
+class SparklineTest(SimpleTestCase):
+
+    def setUp(self):
+        self.context = Context({'rows': [[1, 3, 2], [4, None, 6]]})
+
+    def test_sparkline(self):
+        rendered_template = Template(
+            '{% load c3 %}{% for row in rows %}'
+            '{% sparkline row color="#FF34FF" width=60 %}{% endfor %}'
+            ).render(self.context)
+        self.assertEqual(rendered_template.count('c3.min.js'), 1)
+        self.assertEqual(rendered_template.count('djangoC3.sparklines()'), 1)
+        self.assertIn(
+            '<span class="c3-sparkline" data-c3-sparkline="1,3,2" '
+            'data-color="#FF34FF" style="display:inline-block;width:60px;'
+            'height:30px"></span>', rendered_template)
+        self.assertIn('data-c3-sparkline="4,None,6"', rendered_template)
+
+    def test_svg(self):
+        rendered_template = Template(
+            '{% load c3 %}'
+            '{% sparkline rows.0 width=10 height=12 as_svg=True area=True %}'
+            ).render(self.context)
+        self.assertNotIn('<script', rendered_template)
+        self.assertEqual(rendered_template, (
+            '<svg class="c3-sparkline" xmlns="http://www.w3.org/2000/svg" '
+            'width="10" height="12" viewBox="0 0 10 12">'
+            '<path d="M0,11L5,1L10,6L10,12L0,12Z" fill="#1f77b4" '
+            'fill-opacity="0.2" stroke="none"/>'
+            '<path d="M0,11L5,1L10,6" fill="none" stroke="#1f77b4" '
+            'stroke-width="1" stroke-linecap="round"/></svg>'))
+
+    def test_gaps(self):
+        rendered_template = Template(
+            '{% load c3 %}{% sparkline rows.1 width=10 as_svg=True %}'
+            ).render(self.context)
+        # a single point between gaps is a dot.
+        self.assertIn('<path d="M0,29L0,29"', rendered_template)
+        self.assertIn('<path d="M10,1L10,1"', rendered_template)
+
+    def test_scale_points(self):
+        self.assertEqual(
+            svg.scale_points([0, 5, float('nan'), 10], 30, 12),
+            [(0, 11), (10, 6), None, (30, 1)])
+        self.assertEqual(svg.scale_points([3, 3], 10, 10), [(0, 5), (10, 5)])
+        self.assertEqual(svg.path([(0, 11), (10.04, 6.06)]), 'M0,11L10,6.1')
+
+    @skipIf(adapters.numpy is None, 'NumPy is not installed.')
+    def test_array(self):
+        rendered_template = Template(
+            '{% load c3 %}{% sparkline values %}').render(
+                Context({'values': adapters.numpy.array([1.5, 2.0])}))
+        self.assertIn('data-c3-sparkline="1.5,2.0"', rendered_template)
+
+###############################################################################
+
+
+class PrerenderTest(SimpleTestCase):
+
+    def setUp(self):
+        self.context = Context({
+            'chart': {
+                'x': ['A', 'B', 'C'],
+                'data': [
+                    {'title': 'A', 'values': [26, 5, 52]},
+                    {'title': 'B', 'values': [54, 21, 40],
+                     'color': '#FF34FF'},
+                ],
+            },
+            'pie_chart': [
+                {'title': 'A', 'value': 6},
+                {'title': 'B', 'value': 10},
+            ],
+        })
+
+    def test_prerender(self):
+        rendered_template = Template(
+            '{% load c3 %}{% bar "#chart" chart x_is_category=True '
+            'prerender=True %}').render(self.context)
+        self.assertTrue(rendered_template.startswith(
+            '<svg class="c3-prerender"'))
+        self.assertIn(
+            'document.querySelector("#chart"));</script>', rendered_template)
+        # drawing is shown before C3 files are loaded.
+        self.assertLess(
+            rendered_template.index('</svg>'),
+            rendered_template.index('c3.min.js'))
+        self.assertIn('c3.generate', rendered_template)
+        self.assertEqual(rendered_template.count('<rect'), 8)
+        self.assertIn('fill="#FF34FF"', rendered_template)
+
+    def test_static(self):
+        for tag in ('line', 'step', 'bar'):
+            rendered_template = Template(
+                '{% load c3 %}{% ' + tag + ' "#chart" chart '
+                'x_is_category=True static=True %}').render(self.context)
+            self.assertIn('<svg class="c3-prerender"', rendered_template)
+            self.assertNotIn('c3.generate', rendered_template)
+            self.assertNotIn('c3.min.js', rendered_template)
+            self.assertNotIn('<script', rendered_template)
+            self.assertTrue(rendered_template.startswith('<svg'))
+
+        context = Context({'chart': {
+            'data': [{'title': 'A', 'values': iter([1, 2])}]}})
+        with self.assertRaisesMessage(Exception, "can't be drawn"):
+            Template(
+                '{% load c3 %}{% line "#chart" chart static=True %}'
+            ).render(context)
+
+    def test_round(self):
+        rendered_template = Template(
+            '{% load c3 %}{% donut "#chart" pie_chart inner_title="Sum" '
+            'static=True %}').render(self.context)
+        self.assertIn('>37.5%</text>', rendered_template)
+        self.assertIn('>Sum</text>', rendered_template)
+        self.assertEqual(rendered_template.count('<path'), 2)
+        rendered_template = Template(
+            '{% load c3 %}{% pie "#chart" pie_chart static=True %}'
+            ).render(self.context)
+        self.assertIn('>62.5%</text>', rendered_template)
+
+    def test_data_url(self):
+        rendered_template = Template(
+            '{% load c3 %}{% line "#chart" chart x_is_category=True '
+            'data_url="/data/" prerender=True %}').render(self.context)
+        self.assertNotIn('<svg', rendered_template)
+        self.assertIn('c3.generate', rendered_template)
+        with self.assertRaises(Exception):
+            Template(
+                '{% load c3 %}{% line "#chart" chart data_url="/data/" '
+                'static=True %}').render(self.context)
+
+    def test_ticks(self):
+        self.assertEqual(svg.ticks(3, 97), [0, 20, 40, 60, 80, 100])
+        self.assertEqual(svg.ticks(0, 1), [0, 0.2, 0.4, 0.6, 0.8, 1])
+
+    def test_full_circle(self):
+        drawing = svg.round_chart(
+            [{'title': 'A', 'value': 1}], donut=True, width=100, height=100,
+            show_legend=False)
+        self.assertIn(
+            '<path d="M10,50A40,40 0 1 1 90,50A40,40 0 1 1 10,50Z'
+            'M26,50A24,24 0 1 1 74,50A24,24 0 1 1 26,50Z"', drawing)
+
+###############################################################################
+
+
+def report_charts():
+    yield {
+        'name': 'sales', 'tag': 'bar',
+        'data': {'x': ['A', 'B'], 'data': [{'title': 'S', 'values': [1, 2]}]},
+        'options': {'x_is_category': True, 'width': 300},
+    }
+    yield {
+        'name': 'share', 'tag': 'donut',
+        'data': [{'title': 'A', 'value': 1}, {'title': 'B', 'value': 3}],
+    }
+
+
+def broken_charts():
+    yield from report_charts()
+    yield {'name': 'bad', 'tag': 'line_xy', 'data': {}}
+
+
+class ExportTest(SimpleTestCase):
+
+    def setUp(self):
+        self.output = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.output.cleanup()
+
+    def test_export(self):
+        for workers in (1, 2):
+            stdout = io.StringIO()
+            call_command(
+                'c3_export', 'django_c3.tests.report_charts',
+                output=self.output.name, workers=workers, stdout=stdout)
+            self.assertEqual(stdout.getvalue(), 'Wrote 2 charts.\n')
+            with open(os.path.join(self.output.name, 'sales.svg')) as chart:
+                content = chart.read()
+            self.assertTrue(content.startswith(export.XML_DECLARATION))
+            self.assertIn('width="300" height="320"', content)
+            self.assertTrue(
+                os.path.exists(os.path.join(self.output.name, 'share.svg')))
+
+    def test_json(self):
+        path = os.path.join(self.output.name, 'charts.json')
+        with open(path, 'w') as charts:
+            json.dump(list(report_charts()), charts)
+        self.assertEqual(len(export.load_charts(path)), 2)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            export.draw({'name': 'xy', 'tag': 'line_xy', 'data': {}})
+        # other charts are written, errors are collected.
+        charts = [{'name': 'bad', 'tag': 'line_xy', 'data': {}}]
+        charts += list(report_charts()) + [{'name': 'no-tag', 'data': []}]
+        for workers in (1, 2):
+            written = list()
+            count, errors = export.export_charts(
+                charts, self.output.name, workers=workers, chunk_size=1,
+                progress=written.append)
+            self.assertEqual(count, 2)
+            self.assertEqual(len(written), 2)
+            self.assertEqual(
+                sorted(name for name, error in errors), ['bad', 'no-tag'])
+            self.assertIn("KeyError: 'tag'", dict(errors)['no-tag'])
+
+        stderr = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 charts are not'):
+            call_command(
+                'c3_export', 'django_c3.tests.broken_charts', workers=1,
+                output=self.output.name, stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("Chart 'bad'", stderr.getvalue())
+        with self.assertRaises(CommandError):
+            call_command(
+                'c3_export', 'django_c3.tests.report_charts', format='gif',
+                output=self.output.name)
+
+###############################################################################
+
+
+# URLs of views that are tested with requests of test clients.
+urlpatterns = [
+    path('chart/stream/', SalesStream.as_view()),
+] + ([path('chart/shop/', ShopData.as_view())] if ASYNC_VIEWS else [])
@@ -1,3 +1,352 @@
-from django.shortcuts import render
+import asyncio
+import calendar
+import hashlib
+import time
 
-# Create your views here.
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
+
+from django_c3 import adapters, binary, downsampling, serialization, sources
+
+try:
+    from django.core.handlers.asgi import ASGIRequest
+except ImportError:
+    # Django < 3.0 has no ASGI handler.
+    ASGIRequest = None
+
+# class-based views can have async handlers since Django 4.1.
+ASYNC_VIEWS = django.VERSION >= (4, 1)
+
+# StreamingHttpResponse reads async iterators since Django 4.2.
+ASYNC_STREAMING = django.VERSION >= (4, 2)
+
+
+def _encoder():
+    """Returns JSON encoder of C3_JSON_ENCODER setting, like chart tags."""
+    try:
+        encoder = settings.C3_JSON_ENCODER
+    except AttributeError:
+        encoder = None
+    return serialization.get_encoder(encoder)
+
+###############################################################################
+
+
+class ChartDataView(View):
+    """Serves data of a chart as JSON, for tags that have 'data_url'.
+
+        Subclasses implement 'get_data' and return data in the same format
+        as 'data' argument of the chart tag. Responses have ETag (and
+        Last-Modified, if 'get_last_modified' returns a datetime) headers,
+        so unchanged data is answered with '304 Not Modified'.
+        With 'format=f8' or 'format=f4' query parameter (see 'data_format'
+        argument of tags), data is sent in binary format of django_c3.binary.
+
+        eg:
+            class SalesData(ChartDataView):
+                chart_type = 'bar'
+                x_is_category = True
+
+                def get_data(self):
+                    return queryset_data(Sale.objects.all(), 'day', 'total')
+
+            # in template
+            {% bar '#chart' sales_skeleton data_url='/charts/sales/' %}
+
+        Attributes:
+            chart_type: Name of the chart tag. (like: 'line' or 'pie')
+            x_is_category: Like 'x_is_category' argument of tags.
+            max_points: Like 'max_points' argument of line, step and line_xy
+                tags.
+            bucket: Like 'bucket' argument of step and bar tags.
+            bucket_aggregate: Like 'bucket_aggregate' argument of step and
+                bar tags, default is 'max' for bar charts and 'envelope' for
+                others, like the tags.
+    """
+    chart_type = 'line'
+    x_is_category = False
+    max_points = None
+    bucket = None
+    bucket_aggregate = None
+
+    def get_data(self):
+        """Returns data of chart."""
+        raise NotImplementedError(
+            'Subclasses of ChartDataView must implement get_data().')
+
+    def get_last_modified(self):
+        """Returns last modification time of data (a datetime) or None."""
+        return None
+
+    def get_columns(self, lists=True):
+        """Returns data of chart in JSON format of C3 'load' function.
+
+            Args:
+                lists: If false, NumPy arrays are not converted to lists.
+        """
+        data = self.get_data()
+        if self.chart_type == 'line_xy':
+            data = adapters.xy_chart_data(data)
+            if self.max_points is not None:
+                data = downsampling.downsample_xy(data, self.max_points)
+        elif self.chart_type not in ('pie', 'donut'):
+            data = adapters.chart_data(data)
+            if self.bucket is not None:
+                data = downsampling.bucket(
+                    data, self.bucket, self.bucket_aggregate or (
+                        'max' if self.chart_type == 'bar' else 'envelope'))
+            if self.max_points is not None:
+                data = downsampling.downsample(data, self.max_points)
+        return serialization.column_map(
+            data, self.chart_type, self.x_is_category, lists)
+
+    def get_content(self, data_format):
+        """Returns content and content type of response.
+
+            Args:
+                data_format: 'json' or a format of django_c3.binary.
+        """
+        if data_format in binary.DTYPES:
+            return (binary.encode(self.get_columns(lists=False), data_format),
+                    binary.CONTENT_TYPE)
+        content = _encoder()(self.get_columns())
+        return [content.encode('utf-8')], 'application/json'
+
+    def unmodified_response(self, request, last_modified):
+        """Returns a '304 Not Modified' response if data is not changed
+            since the copy of client, by last modification time only, else
+            None.
+
+            Args:
+                last_modified: A timestamp or None.
+        """
+        # data is not read if it's not changed since the copy of client
+        #   and client does not validate with ETag.
+        if last_modified is None or 'HTTP_IF_NONE_MATCH' in request.META:
+            return None
+        return get_conditional_response(request, last_modified=last_modified)
+
+    def data_response(self, request, last_modified):
+        """Reads data and returns the response, or '304 Not Modified' if
+            its ETag is not changed.
+
+            Args:
+                last_modified: A timestamp or None.
+        """
+        parts, content_type = self.get_content(
+            request.GET.get('format', 'json'))
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part)
+        etag = quote_etag(digest.hexdigest())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(
+                b''.join(parts), content_type=content_type)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        last_modified = _timestamp(self.get_last_modified())
+        response = self.unmodified_response(request, last_modified)
+        if response is not None:
+            return response
+        return self.data_response(request, last_modified)
+
+
+def _timestamp(value):
+    """Returns a datetime as a timestamp, None stays None."""
+    if value is None:
+        return None
+    return calendar.timegm(value.utctimetuple())
+
+###############################################################################
+
+
+class AsyncChartDataView(ChartDataView):
+    """Serves data of a chart like ChartDataView, from async queries.
+        (for ASGI deployments, async views need Django 4.1+)
+
+        Subclasses implement 'get_sources' and return awaitables (like
+        calls of django_c3.sources.aqueryset_data) that each one returns
+        data of a line, step or bar chart. They are awaited concurrently
+        with asyncio.gather and are merged into one data (see
+        sources.merge_data). aqueryset_data runs each query in a thread
+        with its own database connection, so the response takes as long as
+        the slowest query, not the sum of them. (awaitables that run sync
+        code with thread_sensitive=True, like async ORM of Django, still
+        run one after another.) For other charts, override 'aget_data'.
+
+        eg:
+            class ShopData(AsyncChartDataView):
+                x_is_category = True
+
+                def get_sources(self):
+                    return [
+                        aqueryset_data(
+                            Order.objects.all(), 'day', 'total',
+                            aggregate=Sum),
+                        aqueryset_data(
+                            Refund.objects.all(), 'day', 'amount',
+                            aggregate=Sum),
+                    ]
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if not ASYNC_VIEWS:
+            # older versions return the coroutine of 'get' as response.
+            raise ImproperlyConfigured(
+                '%s needs Django 4.1+, use ChartDataView.' % cls.__name__)
+        return super().as_view(**initkwargs)
+
+    def get_sources(self):
+        """Returns a list of awaitables, each one returns data of chart."""
+        raise NotImplementedError(
+            'Subclasses of AsyncChartDataView must implement get_sources().')
+
+    async def aget_data(self):
+        """Returns data of chart, sources are awaited concurrently."""
+        return sources.merge_data(await asyncio.gather(*self.get_sources()))
+
+    async def aget_last_modified(self):
+        """Returns last modification time of data (a datetime) or None."""
+        return None
+
+    def get_data(self):
+        # data is read by 'aget_data' before the response is created.
+        return self.data
+
+    async def get(self, request, *args, **kwargs):
+        last_modified = _timestamp(await self.aget_last_modified())
+        response = self.unmodified_response(request, last_modified)
+        if response is not None:
+            return response
+        self.data = await self.aget_data()
+        return self.data_response(request, last_modified)
+
+###############################################################################
+
+
+class ChartStreamView(View):
+    """Sends new points of a line or step chart as Server-Sent Events.
+
+        Subclasses implement 'get_points', it's called every 'interval'
+        seconds and each batch of points is sent as one event and appended
+        to chart with C3 'flow' API. Under ASGI (Django 4.2+) events are
+        sent by an async generator, that awaits 'get_points' and sleeps
+        without blocking the event loop; under WSGI a generator that
+        blocks its worker thread is used. Response is closed after 'timeout'
+        seconds (to not hold a worker forever), browser connects again and
+        sends the last cursor in 'Last-Event-ID' header.
+
+        eg:
+            class SalesStream(ChartStreamView):
+                x_is_category = True
+
+                def get_points(self, cursor):
+                    sales = Sale.objects.filter(id__gt=cursor or 0)
+                    last = sales.order_by('-id').values_list('id').first()
+                    data = queryset_data(sales, 'day', 'total')
+                    return data, last[0] if last else cursor
+
+            # in template
+            {% line '#chart' sales x_is_category=True
+                stream_url='/charts/sales/stream/' %}
+
+        Attributes:
+            interval: Seconds between two calls of 'get_points'.
+            timeout: Seconds that a response is open.
+            retry: Milliseconds that browser waits before connecting again.
+    """
+    interval = 1
+    timeout = 60
+    retry = 1000
+
+    def get_points(self, cursor):
+        """Returns points that are added after cursor.
+
+            It can be a coroutine function (async def), then it's awaited.
+
+            Args:
+                cursor: Cursor that is returned by previous call, or value
+                    of 'Last-Event-ID' header (a string) or None for the
+                    first call.
+
+            Returns:
+                A tuple of (data, cursor), data is like 'data' argument of
+                line and step tags (or None if there is no new point) and
+                cursor is passed to next call.
+        """
+        raise NotImplementedError(
+            'Subclasses of ChartStreamView must implement get_points().')
+
+    def _points(self, cursor):
+        if asyncio.iscoroutinefunction(self.get_points):
+            from asgiref.sync import async_to_sync
+            return async_to_sync(self.get_points)(cursor)
+        return self.get_points(cursor)
+
+    async def _apoints(self, cursor):
+        if asyncio.iscoroutinefunction(self.get_points):
+            return await self.get_points(cursor)
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(self.get_points)(cursor)
+
+    def _event(self, encoder, data, cursor):
+        """Returns the event of new points, or a comment if data is None."""
+        if data is None:
+            # keeps connection open through proxies.
+            return ': keep-alive\n\n'
+        data = adapters.chart_data(data)
+        return 'id: %s\ndata: %s\n\n' % (
+            '' if cursor is None else cursor,
+            encoder(serialization.flow_columns(data)))
+
+    def events(self, cursor):
+        """Yields events of the response, for WSGI."""
+        yield 'retry: %d\n\n' % self.retry
+        encoder = _encoder()
+        end = time.monotonic() + self.timeout
+        while True:
+            data, cursor = self._points(cursor)
+            yield self._event(encoder, data, cursor)
+            if time.monotonic() + self.interval >= end:
+                return
+            time.sleep(self.interval)
+
+    async def aevents(self, cursor):
+        """Yields events of the response, for ASGI. It waits without
+            blocking the event loop.
+        """
+        yield 'retry: %d\n\n' % self.retry
+        encoder = _encoder()
+        end = time.monotonic() + self.timeout
+        while True:
+            data, cursor = await self._apoints(cursor)
+            yield self._event(encoder, data, cursor)
+            if time.monotonic() + self.interval >= end:
+                return
+            await asyncio.sleep(self.interval)
+
+    def get(self, request, *args, **kwargs):
+        cursor = request.META.get('HTTP_LAST_EVENT_ID')
+        if ASYNC_STREAMING and ASGIRequest is not None and isinstance(
+                request, ASGIRequest):
+            events = self.aevents(cursor)
+        else:
+            events = self.events(cursor)
+        response = StreamingHttpResponse(
+            events, content_type='text/event-stream')
+        response['X-Accel-Buffering'] = 'no'
+        patch_cache_control(response, no_cache=True)
+        return response